@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Capstone.settings')
+# ASGI 서버로 띄울 때만 map 의 비동기 엔드포인트(/map/traffic-lights/async/...)를 연결
+os.environ.setdefault('ASYNC_VIEWS_ENABLED', 'True')
 
 application = get_asgi_application()
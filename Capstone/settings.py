@@ -51,6 +51,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'map.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -148,4 +149,83 @@ SIMPLE_JWT = {
     "UPDATE_LAST_LOGIN": True,
 
     "TOKEN_BLACKLIST_ENABLED": True,
-}
\ No newline at end of file
+}
+
+# Map
+MAP_DATA_VERSION_FILE = BASE_DIR / 'map' / 'data' / '.version'
+SIGNAL_CYCLE_VERSION_FILE = BASE_DIR / 'map' / 'data' / '.cycles-version'
+MAP_LOCATION_CSV = BASE_DIR / 'map' / 'data' / 'location.csv'
+MAP_SPATIAL_CELL_DEG = config('MAP_SPATIAL_CELL_DEG', default=0.01, cast=float)
+# nearby 조회 방식: 'index' (프로세스 메모리 공간 인덱스) 또는 'db' (위경도 복합 인덱스로 DB 에서 범위 조회)
+MAP_NEARBY_BACKEND = config('MAP_NEARBY_BACKEND', default='index')
+# 세그먼트 횡단보도 -> 신호등 매칭 반경 (m, 기본값은 제한 없음)
+SEGMENT_LIGHT_MATCH_RADIUS = config('SEGMENT_LIGHT_MATCH_RADIUS', default=float('inf'), cast=float)
+# 타일/bbox 조회: 한 응답의 신호등이 MAP_TILE_MAX_POINTS 개를 넘으면 2^MAP_TILE_CLUSTER_DEPTH 분할 타일 단위로 묶음
+MAP_TILE_MAX_POINTS = config('MAP_TILE_MAX_POINTS', default=500, cast=int)
+MAP_TILE_CLUSTER_DEPTH = config('MAP_TILE_CLUSTER_DEPTH', default=3, cast=int)
+MAP_TILE_CACHE_SIZE = config('MAP_TILE_CACHE_SIZE', default=1024, cast=int)
+MAP_TILE_MAX_AGE = config('MAP_TILE_MAX_AGE', default=300, cast=int)
+
+# V2X 신호 피드 폴링 (모든 요청이 공유 스냅샷을 읽음)
+V2X_POLL_ENABLED = config('V2X_POLL_ENABLED', default=True, cast=bool)
+V2X_POLL_INTERVAL = config('V2X_POLL_INTERVAL', default=2.0, cast=float)
+# 신호 상태 배치 조회: 한 번에 조회할 수 있는 교차로 수, 전송 시각이 이 초보다 오래되면 stale 표시
+V2X_BATCH_MAX_IDS = config('V2X_BATCH_MAX_IDS', default=200, cast=int)
+V2X_STALE_AFTER = config('V2X_STALE_AFTER', default=10.0, cast=float)
+# 신호 스트리밍(SSE): 연결 유지 주석 간격(초), 남은 시간이 예상 카운트다운과 이 초 넘게 어긋나면 다시 전송
+V2X_STREAM_HEARTBEAT = config('V2X_STREAM_HEARTBEAT', default=15.0, cast=float)
+V2X_STREAM_DRIFT_SEC = config('V2X_STREAM_DRIFT_SEC', default=1.0, cast=float)
+
+# 나이대/성별 보행 속도 추천값(SpeedRecommendation) 캐시 (초)
+SPEED_RECOMMENDATION_CACHE_TIMEOUT = config('SPEED_RECOMMENDATION_CACHE_TIMEOUT', default=3600, cast=int)
+
+# TMAP 도보 경로 요청 timeout(초), 한 요청에서 searchOption 을 동시에 보낼 최대 스레드 수
+TMAP_TIMEOUT = config('TMAP_TIMEOUT', default=5.0, cast=float)
+TMAP_MAX_WORKERS = config('TMAP_MAX_WORKERS', default=8, cast=int)
+
+# 외부 API(TMAP, V2X) 커넥션 풀 / 재시도
+UPSTREAM_POOL_CONNECTIONS = config('UPSTREAM_POOL_CONNECTIONS', default=10, cast=int)
+UPSTREAM_POOL_MAXSIZE = config('UPSTREAM_POOL_MAXSIZE', default=20, cast=int)
+UPSTREAM_RETRIES = config('UPSTREAM_RETRIES', default=2, cast=int)
+UPSTREAM_BACKOFF = config('UPSTREAM_BACKOFF', default=0.2, cast=float)
+UPSTREAM_BACKOFF_JITTER = config('UPSTREAM_BACKOFF_JITTER', default=0.2, cast=float)
+# 비동기 엔드포인트(map/async_views.py) 연결 여부: Capstone/asgi.py 가 켬
+# (WSGI 에서는 요청마다 새 이벤트 루프가 만들어져 aiohttp 세션이 재사용되지 않고, SSE 는 워커를 계속 점유하므로 끔)
+ASYNC_VIEWS_ENABLED = config('ASYNC_VIEWS_ENABLED', default=False, cast=bool)
+# 비동기 엔드포인트(map/async_views.py)용 클라이언트의 외부 API 별 최대 동시 연결 수
+UPSTREAM_ASYNC_MAX_CONNECTIONS = config('UPSTREAM_ASYNC_MAX_CONNECTIONS', default=200, cast=int)
+
+# 신호 반영 경로 순위: 한 요청에서 비교할 수 있는 TMAP searchOption 수
+ROUTE_RANKING_MAX_OPTIONS = config('ROUTE_RANKING_MAX_OPTIONS', default=4, cast=int)
+
+# TMAP 경로 응답 캐시 (출발/도착 좌표를 격자로 맞춰 키로 사용)
+ROUTE_CACHE_ENABLED = config('ROUTE_CACHE_ENABLED', default=True, cast=bool)
+ROUTE_CACHE_BACKEND = config('ROUTE_CACHE_BACKEND', default='locmem')  # 'locmem' 또는 'django'
+ROUTE_CACHE_ALIAS = config('ROUTE_CACHE_ALIAS', default='default')
+ROUTE_CACHE_GRID_M = config('ROUTE_CACHE_GRID_M', default=10.0, cast=float)
+ROUTE_CACHE_TTL = config('ROUTE_CACHE_TTL', default=600, cast=int)
+ROUTE_CACHE_MAX_ENTRIES = config('ROUTE_CACHE_MAX_ENTRIES', default=1000, cast=int)
+
+# 로컬 보행 그래프 (build_pedestrian_graph 로 생성): TMAP 실패 시 대체 경로 / prefer 면 TMAP 대신 사용
+PEDESTRIAN_GRAPH_MODE = config('PEDESTRIAN_GRAPH_MODE', default='fallback')  # 'off', 'fallback', 'prefer'
+PEDESTRIAN_GRAPH_PATH = config('PEDESTRIAN_GRAPH_PATH', default=str(BASE_DIR / 'map' / 'data' / 'pedestrian_graph.bin'))
+# 출발/도착 좌표를 그래프 노드에 붙이는 최대 거리 (m), 보행 속도 기본값 (m/s)
+PEDESTRIAN_GRAPH_SNAP_RADIUS = config('PEDESTRIAN_GRAPH_SNAP_RADIUS', default=50.0, cast=float)
+PEDESTRIAN_GRAPH_SPEED = config('PEDESTRIAN_GRAPH_SPEED', default=1.1, cast=float)
+# TMAP 응답 경로 geometry 를 쌓아둘 파일 (비어 있으면 기록 안 함), build_pedestrian_graph --geometry-log 로 사용
+PEDESTRIAN_GRAPH_GEOMETRY_LOG = config('PEDESTRIAN_GRAPH_GEOMETRY_LOG', default='')
+
+# 출발 시각 최적화: 출발을 미룰 수 있는 최대 시간(초), 한 요청에서 비교할 출발 시각 후보 수
+DEPARTURE_MAX_OFFSET = config('DEPARTURE_MAX_OFFSET', default=600.0, cast=float)
+DEPARTURE_MAX_CANDIDATES = config('DEPARTURE_MAX_CANDIDATES', default=1000, cast=int)
+
+# 신호 이력 저장소 (비어 있으면 사용 안 함): 시간 파티션별 압축 열 파일, infer_signal_cycles 가 주기 추정에 사용
+V2X_HISTORY_DIR = config('V2X_HISTORY_DIR', default='')
+# 웹 프로세스의 공유 폴러도 이력을 기록할지 (보통은 record_signal_history 명령 하나로 기록)
+V2X_HISTORY_RECORD = config('V2X_HISTORY_RECORD', default=False, cast=bool)
+# 버퍼가 이 행 수를 넘거나 첫 행이 이 초보다 오래되면 파일로 씀 (종료 시에도 남은 행을 씀)
+V2X_HISTORY_FLUSH_ROWS = config('V2X_HISTORY_FLUSH_ROWS', default=500000, cast=int)
+V2X_HISTORY_FLUSH_INTERVAL = config('V2X_HISTORY_FLUSH_INTERVAL', default=60.0, cast=float)
+
+# /metrics (Prometheus 형식 지표) 노출 여부 (인증이 없으므로 내부망에서 수집할 때만 켬)
+METRICS_ENABLED = config('METRICS_ENABLED', default=False, cast=bool)
@@ -16,11 +16,13 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
+from map.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('member/', include('member.urls')),
     path('map/', include('map.urls')), 
+    path('metrics', metrics_view, name='metrics'),
 
 ]
 
@@ -1,4 +1,5 @@
 from django.contrib import admin
-from .models import TrafficLight
+from .models import TrafficLight, SignalCycle
 
 admin.site.register(TrafficLight)
+admin.site.register(SignalCycle)
@@ -0,0 +1,190 @@
+import gzip
+import hashlib
+import json
+import struct
+import threading
+
+import numpy as np
+from django.http import HttpResponse
+
+from .dataversion import get_data_version
+
+try:
+    import brotli
+except ImportError:  # brotli 는 선택 설치 (없으면 gzip 만 사용)
+    brotli = None
+
+JSON_CONTENT_TYPE = "application/json"
+BINARY_CONTENT_TYPE = "application/octet-stream"
+
+# 바이너리 포맷: 헤더(magic, 버전, 개수) 뒤에 열(column) 단위 배열 (little-endian)
+#   int32[n] itst_id | float64[n] latitude | float64[n] longitude | uint32[n+1] 이름 offset | UTF-8 이름
+BINARY_MAGIC = b"TLB1"
+BINARY_HEADER = struct.Struct("<4sQI")
+
+
+def pack_traffic_lights(ids, names, lats, lons, version=0):
+    encoded = [name.encode("utf-8") for name in names]
+    offsets = np.zeros(len(encoded) + 1, dtype="<u4")
+    np.cumsum([len(name) for name in encoded], out=offsets[1:])
+    return b"".join([
+        BINARY_HEADER.pack(BINARY_MAGIC, version, len(encoded)),
+        np.asarray(ids, dtype="<i4").tobytes(),
+        np.asarray(lats, dtype="<f8").tobytes(),
+        np.asarray(lons, dtype="<f8").tobytes(),
+        offsets.tobytes(),
+        *encoded,
+    ])
+
+
+def unpack_traffic_lights(data):
+    """pack_traffic_lights 의 역변환 (테스트/클라이언트 참고용), [{itst_id, name, latitude, longitude}, ...]"""
+    magic, version, n = BINARY_HEADER.unpack_from(data)
+    if magic != BINARY_MAGIC:
+        raise ValueError("Not a traffic light snapshot")
+    pos = BINARY_HEADER.size
+    ids = np.frombuffer(data, dtype="<i4", count=n, offset=pos)
+    lats = np.frombuffer(data, dtype="<f8", count=n, offset=pos + 4 * n)
+    lons = np.frombuffer(data, dtype="<f8", count=n, offset=pos + 12 * n)
+    offsets = np.frombuffer(data, dtype="<u4", count=n + 1, offset=pos + 20 * n)
+    names = data[pos + 24 * n + 4:]
+    return [
+        {
+            "itst_id": int(ids[i]),
+            "name": names[offsets[i]:offsets[i + 1]].decode("utf-8"),
+            "latitude": float(lats[i]),
+            "longitude": float(lons[i]),
+        }
+        for i in range(n)
+    ]
+
+
+class EncodedBody:
+    """
+    미리 인코딩해둔 응답 본문 하나 (Content-Encoding 별 본문 + ETag)
+    - 압축본은 해당 인코딩으로 처음 요청될 때 만들어 재사용
+    """
+
+    def __init__(self, body, content_type):
+        self.content_type = content_type
+        digest = hashlib.sha1(body).hexdigest()[:20]
+        self.encodings = ("identity", "gzip", "br") if brotli is not None else ("identity", "gzip")
+        self.etags = {encoding: f'"{digest}-{encoding}"' for encoding in self.encodings}
+        self.bodies = {"identity": body}
+
+    def body(self, encoding):
+        data = self.bodies.get(encoding)
+        if data is None:
+            identity = self.bodies["identity"]
+            data = brotli.compress(identity) if encoding == "br" else gzip.compress(identity, compresslevel=9, mtime=0)
+            self.bodies[encoding] = data
+        return data
+
+    def precompress(self):
+        for encoding in self.encodings:
+            self.body(encoding)
+        return self
+
+
+class TrafficLightArtifact:
+    """
+    /traffic-lights/all/ 응답을 데이터 버전마다 한 번만 만들어둔 것
+    - json: TrafficLightSerializer(many=True) 결과와 같은 JSON
+    - binary: 열 단위 packed 배열 (pack_traffic_lights)
+    """
+
+    def __init__(self, lights, version=0):
+        self.version = version
+        self.count = len(lights)
+        body = json.dumps(lights, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+        self.json = EncodedBody(body, JSON_CONTENT_TYPE).precompress()
+        self.binary = EncodedBody(
+            pack_traffic_lights(
+                [light["itst_id"] for light in lights],
+                [light["name"] for light in lights],
+                [light["latitude"] for light in lights],
+                [light["longitude"] for light in lights],
+                version=version,
+            ),
+            BINARY_CONTENT_TYPE,
+        ).precompress()
+
+    @classmethod
+    def from_db(cls, version=0):
+        from .models import TrafficLight
+
+        lights = [
+            {"itst_id": itst_id, "name": name, "latitude": lat, "longitude": lon}
+            for itst_id, name, lat, lon in TrafficLight.objects.values_list(
+                "itst_id", "name", "latitude", "longitude"
+            ).iterator()
+        ]
+        return cls(lights, version=version)
+
+
+def accepted_encodings(accept_encoding):
+    """Accept-Encoding 헤더에서 q=0 이 아닌 인코딩 이름 집합"""
+    encodings = set()
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        encodings.add(name.strip().lower())
+    return encodings
+
+
+def serve_encoded(request, encoded, cache_control="no-cache"):
+    """
+    미리 만든 본문 중 클라이언트가 받을 수 있는 가장 작은 인코딩으로 응답
+    - If-None-Match 가 ETag 와 같으면 본문 없이 304
+    """
+    accepted = accepted_encodings(request.headers.get("Accept-Encoding"))
+    encoding = "identity"
+    for candidate in ("br", "gzip"):
+        if candidate in encoded.encodings and (candidate in accepted or "*" in accepted):
+            encoding = candidate
+            break
+    etag = encoded.etags[encoding]
+
+    if_none_match = request.headers.get("If-None-Match", "")
+    if etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(encoded.body(encoding), content_type=encoded.content_type)
+        if encoding != "identity":
+            response["Content-Encoding"] = encoding
+    response["ETag"] = etag
+    response["Vary"] = "Accept-Encoding"
+    response["Cache-Control"] = cache_control
+    return response
+
+
+_artifact = None
+_artifact_lock = threading.Lock()
+
+
+def get_traffic_light_artifact():
+    """프로세스 공용 응답 본문 반환 (데이터 버전이 바뀌었으면 다시 생성)"""
+    global _artifact
+    version = get_data_version()
+    artifact = _artifact
+    if artifact is not None and artifact.version == version:
+        return artifact
+
+    with _artifact_lock:
+        if _artifact is None or _artifact.version != version:
+            _artifact = TrafficLightArtifact.from_db(version=version)
+        return _artifact
+
+
+def invalidate_traffic_light_artifact():
+    global _artifact
+    with _artifact_lock:
+        _artifact = None
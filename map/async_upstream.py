@@ -0,0 +1,82 @@
+import asyncio
+import random
+import threading
+import time
+import weakref
+
+import aiohttp
+from django.conf import settings
+
+from .upstream import stats
+
+# 이벤트 루프마다 외부 API 별 ClientSession 하나 (ClientSession 은 생성된 루프에서만 사용 가능)
+# ASGI 서버는 루프 하나를 계속 쓰므로 세션도 계속 재사용됨 (그래서 비동기 엔드포인트는 ASGI 에서만 연결)
+_sessions = weakref.WeakKeyDictionary()
+_sessions_lock = threading.Lock()
+
+
+def build_session():
+    """
+    keep-alive 커넥션 풀을 쓰는 비동기 세션
+    - 동시 연결은 UPSTREAM_ASYNC_MAX_CONNECTIONS 개까지 (넘으면 풀에서 대기)
+    """
+    connector = aiohttp.TCPConnector(limit=getattr(settings, "UPSTREAM_ASYNC_MAX_CONNECTIONS", 200))
+    return aiohttp.ClientSession(connector=connector)
+
+
+def get_session(name):
+    loop = asyncio.get_running_loop()
+    with _sessions_lock:
+        sessions = _sessions.get(loop)
+        if sessions is None:
+            sessions = _sessions[loop] = {}
+        session = sessions.get(name)
+        if session is None or session.closed:
+            session = sessions[name] = build_session()
+    return session
+
+
+async def fetch(name, method, url, timeout=5, **kwargs):
+    """
+    공용 비동기 세션으로 외부 API 를 호출해 응답 본문(bytes) 반환 후 소요시간 기록 (upstream.request 의 비동기 버전)
+    - 4xx/5xx 응답은 aiohttp.ClientResponseError, 그 밖의 실패는 aiohttp.ClientError
+    - timeout 초가 지나면 TimeoutError, 호출한 쪽이 취소하면 asyncio.CancelledError
+    - 연결 실패만 지터가 들어간 지수 백오프로 UPSTREAM_RETRIES 번 재시도
+    """
+    retries = getattr(settings, "UPSTREAM_RETRIES", 2)
+    backoff = getattr(settings, "UPSTREAM_BACKOFF", 0.2)
+    jitter = getattr(settings, "UPSTREAM_BACKOFF_JITTER", 0.2)
+
+    started = time.perf_counter()
+    error = True
+    try:
+        for attempt in range(retries + 1):
+            try:
+                async with get_session(name).request(
+                    method, url, timeout=aiohttp.ClientTimeout(total=timeout), raise_for_status=True, **kwargs
+                ) as response:
+                    content = await response.read()
+                    error = False
+                    return content
+            except aiohttp.ClientConnectorError:
+                if attempt == retries:
+                    raise
+                await asyncio.sleep(backoff * (2 ** attempt) + random.uniform(0, jitter))
+    finally:
+        stats.record(name, time.perf_counter() - started, error=error)
+
+
+async def get(name, url, **kwargs):
+    return await fetch(name, "GET", url, **kwargs)
+
+
+async def post(name, url, **kwargs):
+    return await fetch(name, "POST", url, **kwargs)
+
+
+async def close_sessions():
+    """현재 이벤트 루프의 세션 정리 (벤치마크 등에서 루프를 끝내기 전에 호출)"""
+    with _sessions_lock:
+        sessions = _sessions.pop(asyncio.get_running_loop(), {})
+    for session in sessions.values():
+        await session.close()
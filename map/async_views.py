@@ -0,0 +1,117 @@
+import json
+
+import aiohttp
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+
+from . import async_upstream, upstream
+from .tmap import ROUTE_OPTIONS
+from .graph import afetch_routes_with_local_fallback
+from .signalhub import get_signal_hub
+from .v2x import aget_signal_snapshot, get_signal_statuses
+from .views import V2X_SIGNAL_PHASE_URL, build_route_response, parse_its_ids
+
+# ASGI(uvicorn 등)로 띄웠을 때 외부 API 를 기다리는 동안 워커를 점유하지 않는 비동기 엔드포인트 (ASYNC_VIEWS_ENABLED 일 때만 연결)
+# 응답 형식은 같은 이름의 동기 뷰(map/views.py)와 같음
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, safe=False, json_dumps_params={"ensure_ascii": False})
+
+
+class AsyncV2XSignalTestView(View):
+    async def get(self, request):
+        page = request.GET.get("pageNo", "1")
+        rows = request.GET.get("numOfRows", "10")
+        itst_id = request.GET.get("itstId")
+
+        params = {
+            "apikey": settings.V2X_API_KEY,
+            "type": "json",
+            "pageNo": page,
+            "numOfRows": rows,
+        }
+        if itst_id:
+            params["itstId"] = itst_id
+
+        try:
+            url = getattr(settings, "V2X_SIGNAL_PHASE_URL", V2X_SIGNAL_PHASE_URL)
+            content = await async_upstream.get(upstream.V2X, url, params=params, timeout=20)
+            return json_response(json.loads(content))
+        except TimeoutError:
+            return json_response({"error": "요청 시간이 초과되었습니다."}, status=504)
+        except (aiohttp.ClientError, ValueError) as e:
+            return json_response({"error": "Failed to fetch V2X data", "details": str(e)}, status=500)
+
+
+class AsyncTmapRouteView(View):
+    async def get(self, request):
+        startX = request.GET.get("startX")
+        startY = request.GET.get("startY")
+        endX = request.GET.get("endX")
+        endY = request.GET.get("endY")
+
+        if not all([startX, startY, endX, endY]):
+            return json_response({"error": "Missing startX, startY, endX, or endY"}, status=400)
+
+        # 추천/대안 경로를 asyncio.gather 로 동시에 요청 (한쪽이 실패해도 나머지는 반환)
+        results = await afetch_routes_with_local_fallback(startX, startY, endX, endY, list(ROUTE_OPTIONS.values()))
+        body, status = build_route_response(results)
+        return json_response(body, status=status)
+
+
+class AsyncSignalStatusView(View):
+    async def get(self, request):
+        its_id = request.GET.get("itsId")
+        if not its_id:
+            return json_response({"error": "Missing 'itsId' parameter"}, status=400)
+
+        try:
+            snapshot = await aget_signal_snapshot()
+            result = get_signal_statuses([its_id], snapshot=snapshot)[0]
+        except (requests.RequestException, aiohttp.ClientError, TimeoutError, ValueError) as e:
+            return json_response({"error": "API 호출 중 오류가 발생했습니다.", "details": str(e)}, status=500)
+
+        if not result:
+            return json_response({"error": "ITS ID에 해당하는 데이터를 찾을 수 없습니다."}, status=404)
+
+        return json_response(result)
+
+
+class AsyncSignalStreamView(View):
+    """
+    구독한 교차로의 신호 변화를 Server-Sent Events 로 전달 (ASGI 전용)
+    - 처음에 전체 상태(event: snapshot), 이후 색이 바뀌거나 카운트다운이 어긋난 방향만(event: signal)
+    - 모든 스트림이 공유 폴러의 스냅샷 하나를 사용 (구독자가 늘어도 외부 피드 호출 수는 그대로)
+    """
+
+    async def get(self, request):
+        # bbox 로 조회하면 처음 한 번 DB 에서 타일 인덱스를 만들 수 있어 스레드에서 처리
+        its_ids, error = await sync_to_async(parse_its_ids)(request.GET)
+        if error:
+            return json_response({"error": error}, status=400)
+
+        hub = get_signal_hub()
+        if await hub.ready() is None:
+            return json_response({"error": "V2X 신호 스냅샷이 아직 준비되지 않았습니다."}, status=503)
+
+        heartbeat = getattr(settings, "V2X_STREAM_HEARTBEAT", 15.0)
+
+        async def stream():
+            subscription, initial = hub.subscribe(its_ids)
+            try:
+                yield b"retry: 3000\n\n" + initial
+                while True:
+                    events = await subscription.next(heartbeat)
+                    # 보낼 변경분이 없으면 연결 유지용 주석
+                    yield b"".join(events) if events else b": keepalive\n\n"
+            finally:
+                hub.unsubscribe(subscription)
+
+        response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
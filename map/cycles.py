@@ -0,0 +1,222 @@
+import threading
+import time
+
+import numpy as np
+
+from .dataversion import get_data_version
+
+# 현재 보행 신호 상태 코드
+PHASE_UNKNOWN = 0
+PHASE_GREEN = 1
+PHASE_RED = 2
+
+_PHASE_CODES = {"green": PHASE_GREEN, "red": PHASE_RED}
+
+
+class SignalCycleTable:
+    """
+    SignalCycle 전체를 itst_id 로 정렬한 배열로 올려둔 주기 테이블
+    - lookup 은 np.searchsorted 로 여러 교차로를 한 번에 조회
+    - offset: 초록불이 시작되는 Unix 시각 mod 주기 (이력에서 추정한 교차로만, 없으면 NaN)
+    """
+
+    def __init__(self, ids, green, red, offset=None, version=0):
+        order = np.argsort(np.asarray(ids, dtype=np.int64), kind="stable")
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+        self.green = np.asarray(green, dtype=float)[order]
+        self.red = np.asarray(red, dtype=float)[order]
+        if offset is None:
+            self.offset = np.full(len(self.ids), np.nan)
+        else:
+            # None(측정값이라 위상 정보 없음)은 NaN
+            self.offset = np.array([np.nan if value is None else value for value in offset], dtype=float)[order]
+        for array in (self.ids, self.green, self.red, self.offset):
+            array.flags.writeable = False
+        self.version = version
+
+    @classmethod
+    def from_db(cls, version=0):
+        from .models import SignalCycle
+
+        rows = list(SignalCycle.objects.values_list("itst_id", "green_sec", "red_sec", "offset_sec").iterator())
+        ids, green, red, offset = zip(*rows) if rows else ((), (), (), ())
+        return cls(ids, green, red, offset, version=version)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def lookup(self, its_ids):
+        """
+        교차로들의 (green, red) 주기 배열 반환
+        - 주기 정보가 없거나 id 가 숫자가 아니면 해당 위치는 NaN
+        """
+        green, red, _ = self.lookup_schedule(its_ids)
+        return green, red
+
+    def lookup_schedule(self, its_ids):
+        """교차로들의 (green, red, offset) 배열 반환 (lookup + 주기 시작 위상, 없으면 NaN)"""
+        green = np.full(len(its_ids), np.nan)
+        red = np.full(len(its_ids), np.nan)
+        offset = np.full(len(its_ids), np.nan)
+        keys = np.full(len(its_ids), -1, dtype=np.int64)
+        for i, its_id in enumerate(its_ids):
+            try:
+                keys[i] = int(str(its_id).strip())
+            except (TypeError, ValueError):
+                pass
+        if not len(self.ids):
+            return green, red, offset
+
+        pos = np.minimum(np.searchsorted(self.ids, keys), len(self.ids) - 1)
+        found = self.ids[pos] == keys
+        green[found] = self.green[pos[found]]
+        red[found] = self.red[pos[found]]
+        offset[found] = self.offset[pos[found]]
+        return green, red, offset
+
+
+def signal_phase(signal_status):
+    """
+    신호 상태(SignalStatusView 결과)에서 계산에 쓸 (상태 코드, 남은 시간)
+    - 방향 순서대로 처음 나오는 green/red 신호 사용, 없으면 (PHASE_UNKNOWN, NaN)
+    """
+    for s in signal_status.get("signals", []):
+        phase = _PHASE_CODES.get(s.get("signalColor"))
+        if phase is not None:
+            remaining = s.get("remainingSeconds")
+            if remaining is None:
+                return PHASE_UNKNOWN, np.nan
+            return phase, remaining
+    return PHASE_UNKNOWN, np.nan
+
+
+def scheduled_phases(phase, remaining, green, red, offset, now=None):
+    """
+    실시간 신호 상태를 모르는 교차로는 주기 시작 위상(offset)으로 지금(now, Unix 초)의 상태/남은 시간을 채움
+    - 반환: (phase, remaining) 배열, 실시간 상태가 있거나 offset/주기를 모르면 그대로
+    - 이후 대기시간 계산(crossing_waits, cycle_waits 등)은 실시간 상태와 똑같이 처리
+    """
+    phase = np.array(phase, dtype=np.int64, ndmin=1)
+    remaining = np.array(remaining, dtype=float, ndmin=1)
+    green = np.asarray(green, dtype=float)
+    red = np.asarray(red, dtype=float)
+    offset = np.asarray(offset, dtype=float)
+    now = now if now is not None else time.time()
+
+    cycle = green + red
+    fill = (phase == PHASE_UNKNOWN) & ~np.isnan(offset) & ~np.isnan(cycle) & (cycle > 0)
+    if not fill.any():
+        return phase, remaining
+    with np.errstate(invalid="ignore"):
+        # 주기 안의 위치 (0 = 초록불 시작)
+        position = np.mod(now - offset, cycle)
+    is_green = position < green
+    phase[fill] = np.where(is_green, PHASE_GREEN, PHASE_RED)[fill]
+    remaining[fill] = np.where(is_green, green - position, cycle - position)[fill]
+    return phase, remaining
+
+
+def crossing_waits(arrival_sec, phase, remaining, green, red):
+    """
+    횡단보도 대기시간 일괄 계산 (모든 인자는 같은 shape 로 broadcast 되는 배열)
+    - 초록불이 도착 시각까지 남아 있으면 0
+    - 아니면 (빨간불이면 남은 시간) + 초록불 주기
+    - 상태를 모르거나 주기 정보가 없으면 0
+    """
+    arrival_sec = np.asarray(arrival_sec, dtype=float)
+    phase = np.asarray(phase)
+    remaining = np.asarray(remaining, dtype=float)
+    green = np.asarray(green, dtype=float)
+    red = np.asarray(red, dtype=float)
+
+    known = (phase != PHASE_UNKNOWN) & ~np.isnan(remaining) & ~np.isnan(green) & ~np.isnan(red)
+    passes = (phase == PHASE_GREEN) & (remaining >= arrival_sec)
+    wait = np.where(phase == PHASE_RED, remaining, 0.0) + green
+    return np.where(known & ~passes, wait, 0.0)
+
+
+def route_waits(walk_arrival_sec, phase, remaining, green, red):
+    """
+    경로상 횡단보도들의 대기시간 계산 (앞 횡단보도 대기시간만큼 이후 도착 시각이 늦어짐)
+    - walk_arrival_sec: 대기 없이 걸었을 때 각 횡단보도 도착 시각, shape (..., 횡단보도 수)
+      (앞쪽 차원은 출발 시각 후보 등 여러 경우를 한 번에 계산할 때 사용)
+    - 반환: 같은 shape 의 대기시간 배열
+    """
+    walk_arrival_sec = np.asarray(walk_arrival_sec, dtype=float)
+
+    # 도착이 늦어질수록 대기시간은 줄지 않으므로, 앞쪽 대기시간 누적값을 반영해 다시 계산하는 것을
+    # 결과가 바뀌지 않을 때까지 반복하면 앞에서부터 하나씩 계산한 결과와 같아짐
+    # (보통 초록불을 놓치는 횡단보도 수 + 1 번 안에 끝남)
+    delayed = np.zeros_like(walk_arrival_sec)
+    while True:
+        waits = crossing_waits(walk_arrival_sec + delayed, phase, remaining, green, red)
+        next_delayed = np.zeros_like(waits)
+        np.cumsum(waits[..., :-1], axis=-1, out=next_delayed[..., 1:])
+        if np.array_equal(next_delayed, delayed):
+            return waits
+        delayed = next_delayed
+
+
+def cycle_waits(arrival_sec, phase, remaining, green, red):
+    """
+    신호가 초록 green 초 / 빨강 red 초로 계속 반복된다고 보고 도착 시각의 대기시간 계산 (broadcast)
+    - 현재 신호와 남은 시간으로 주기 안의 위치를 맞춘 뒤, 초록불 구간에 도착하면 0, 빨간불 구간이면 다음 초록불까지
+    - 도착이 늦어지면 빨간불 대기가 줄어들 수 있음 (crossing_waits 는 놓친 초록불 다음 주기까지 기다린다고만 봄)
+    - 상태를 모르거나 주기 정보가 없으면 0
+    """
+    arrival_sec = np.asarray(arrival_sec, dtype=float)
+    phase = np.asarray(phase)
+    remaining = np.asarray(remaining, dtype=float)
+    green = np.asarray(green, dtype=float)
+    red = np.asarray(red, dtype=float)
+
+    known = (phase != PHASE_UNKNOWN) & ~np.isnan(remaining) & ~np.isnan(green) & ~np.isnan(red)
+    cycle = green + red
+    # 지금 켜져 있거나 다음에 켜질 초록불이 끝나는 시각 -> 도착 시각의 주기 내 위치 (0 = 초록불 시작)
+    green_end = np.where(phase == PHASE_GREEN, remaining, remaining + green)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        position = np.mod(arrival_sec - (green_end - green), cycle)
+        return np.where(known & (position > green), cycle - position, 0.0)
+
+
+def departure_waits(walk_arrival_sec, offsets_sec, phase, remaining, green, red):
+    """
+    출발 시각 후보(지금부터 offsets_sec 초 뒤)별 경로상 횡단보도 대기시간 (cycle_waits 기준)
+    - walk_arrival_sec: 지금 출발해 대기 없이 걸었을 때 각 횡단보도 도착 시각, shape (횡단보도 수,)
+    - 반환: shape (출발 시각 수, 횡단보도 수)
+    - 횡단보도 순서대로 진행하되 각 횡단보도는 모든 출발 시각을 한 번에 계산
+    """
+    walk_arrival_sec = np.asarray(walk_arrival_sec, dtype=float)
+    offsets_sec = np.asarray(offsets_sec, dtype=float)
+    phase, remaining, green, red = np.broadcast_arrays(phase, remaining, green, red)
+
+    waits = np.zeros((len(offsets_sec), len(walk_arrival_sec)))
+    delayed = np.zeros(len(offsets_sec))
+    for i, arrival in enumerate(walk_arrival_sec):
+        waits[:, i] = cycle_waits(offsets_sec + arrival + delayed, phase[i], remaining[i], green[i], red[i])
+        delayed += waits[:, i]
+    return waits
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_signal_cycle_table():
+    """프로세스 공용 주기 테이블 반환 (신호 주기 데이터 버전이 바뀌었으면 다시 로드)"""
+    global _table
+    version = get_data_version("cycles")
+    table = _table
+    if table is not None and table.version == version:
+        return table
+
+    with _table_lock:
+        if _table is None or _table.version != version:
+            _table = SignalCycleTable.from_db(version=version)
+        return _table
+
+
+def invalidate_signal_cycle_table():
+    global _table
+    with _table_lock:
+        _table = None
@@ -0,0 +1,38 @@
+import os
+import time
+from pathlib import Path
+from django.conf import settings
+
+# 데이터 종류 -> (버전 파일 설정 이름, 기본 파일 이름)
+# map: 신호등 데이터 (공간 인덱스, 타일, 사전 계산 결과, 교차로 이름표), cycles: 신호 주기 테이블
+VERSION_FILES = {
+    "map": ("MAP_DATA_VERSION_FILE", ".version"),
+    "cycles": ("SIGNAL_CYCLE_VERSION_FILE", ".cycles-version"),
+}
+
+
+def get_version_file(name="map"):
+    setting, filename = VERSION_FILES[name]
+    return Path(getattr(
+        settings, setting,
+        Path(__file__).resolve().parent / "data" / filename,
+    ))
+
+
+def get_data_version(name="map"):
+    """
+    데이터 버전 (버전 파일의 mtime)
+    - import_traffic_lights (map), import_signal_cycles / infer_signal_cycles (cycles) 실행 시 갱신되며,
+      워커 프로세스들은 이 값으로 캐시 무효화 여부를 판단
+    """
+    try:
+        return os.stat(get_version_file(name)).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def bump_data_version(name="map"):
+    path = get_version_file(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(str(time.time_ns()))
+    return get_data_version(name)
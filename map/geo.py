@@ -0,0 +1,77 @@
+from math import radians, degrees, cos, sin, sqrt, atan2, asin, pi
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    R = EARTH_RADIUS_M
+    dlat = radians(lat2 - lat1)
+    dlon = radians(lon2 - lon1)
+    a = sin(dlat / 2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2)**2
+    c = 2 * atan2(sqrt(a), sqrt(1 - a))
+    return R * c
+
+
+def bounding_box(lat, lon, radius):
+    """
+    (lat, lon) 에서 radius(m) 안의 모든 점을 포함하는 위경도 범위 (min_lat, max_lat, min_lon, max_lon)
+    - haversine 과 같은 지구 반지름 기준, 극 근처를 포함하면 경도는 전체 범위
+    """
+    angular = radius / EARTH_RADIUS_M
+    dlat = degrees(angular)
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if angular >= pi / 2 or max_lat >= 90 or min_lat <= -90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+    dlon = degrees(asin(min(1.0, sin(angular) / cos(radians(lat)))))
+    return min_lat, max_lat, lon - dlon, lon + dlon
+
+
+def as_array(values):
+    """연속(contiguous) float64 배열로 변환"""
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def lonlat_arrays(coords):
+    """GeoJSON 좌표 목록 [[lon, lat], ...] -> (lats, lons) 배열"""
+    points = as_array(coords).reshape(-1, 2)
+    return np.ascontiguousarray(points[:, 1]), np.ascontiguousarray(points[:, 0])
+
+
+def _haversine_rad(lat1, lon1, lat2, lon2):
+    # 입력은 라디안, numpy 브로드캐스팅 규칙을 따름 (스칼라 haversine 과 같은 식)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS_M * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def haversine_one_to_many(lat, lon, lats, lons):
+    """한 지점에서 여러 지점까지의 거리(m) 배열"""
+    return _haversine_rad(
+        np.radians(lat), np.radians(lon),
+        np.radians(as_array(lats)), np.radians(as_array(lons)),
+    )
+
+
+def haversine_many_to_many(lats1, lons1, lats2, lons2):
+    """거리 행렬(m), shape = (len(lats1), len(lats2))"""
+    lat1 = np.radians(as_array(lats1))[:, None]
+    lon1 = np.radians(as_array(lons1))[:, None]
+    lat2 = np.radians(as_array(lats2))[None, :]
+    lon2 = np.radians(as_array(lons2))[None, :]
+    return _haversine_rad(lat1, lon1, lat2, lon2)
+
+
+def haversine_consecutive(lats, lons):
+    """연속한 두 점 사이 거리(m) 배열, 길이 n - 1"""
+    lat = np.radians(as_array(lats))
+    lon = np.radians(as_array(lons))
+    return _haversine_rad(lat[:-1], lon[:-1], lat[1:], lon[1:])
+
+
+def polyline_length(coords):
+    """GeoJSON 좌표 목록 [[lon, lat], ...] 의 총 길이(m)"""
+    if len(coords) < 2:
+        return 0.0
+    lats, lons = lonlat_arrays(coords)
+    return float(haversine_consecutive(lats, lons).sum())
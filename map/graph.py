@@ -0,0 +1,548 @@
+import asyncio
+import heapq
+import json
+import os
+import struct
+import threading
+import xml.etree.ElementTree as ET
+from math import cos, radians, sqrt
+from pathlib import Path
+
+import numpy as np
+import requests
+from django.conf import settings
+
+from .cycles import PHASE_GREEN, PHASE_UNKNOWN, crossing_waits, get_signal_cycle_table, scheduled_phases, signal_phase
+from .geo import EARTH_RADIUS_M, haversine
+from .spatial import GridIndex
+from .v2x import build_signal_status, get_signal_snapshot
+
+# 파일 포맷: 헤더(magic, 노드 수, 방향 간선 수) 뒤에 8바이트 단위로 정렬한 열(column) 배열 (little-endian)
+#   float64[n] lat | float64[n] lon | int64[n+1] indptr | int32[m] indices | float32[m] length
+#   | int32[m] light(itst_id, 없으면 -1) | uint8[m] kind
+GRAPH_MAGIC = b"PGR1"
+GRAPH_HEADER = struct.Struct("<4sIQQ")
+GRAPH_COLUMNS = (
+    ("lats", "<f8", "nodes"),
+    ("lons", "<f8", "nodes"),
+    ("indptr", "<i8", "indptr"),
+    ("indices", "<i4", "edges"),
+    ("lengths", "<f4", "edges"),
+    ("lights", "<i4", "edges"),
+    ("kinds", "u1", "edges"),
+)
+
+EDGE_WALK = 0
+EDGE_CROSSWALK = 1
+
+# 좌표를 소수점 6자리(약 0.1m)로 맞춰 같은 좌표는 같은 노드로 봄
+NODE_PRECISION = 6
+# 횡단보도 간선 중점에서 이 거리(m) 안의 가장 가까운 신호등을 해당 횡단보도 신호로 연결
+CROSSWALK_LIGHT_RADIUS_M = 30
+
+# TMAP facilityType 15 = 횡단보도
+TMAP_CROSSWALK_FACILITY = "15"
+
+# OSM 에서 보행 가능한 도로로 보는 highway 값
+OSM_PEDESTRIAN_HIGHWAYS = {
+    "footway", "pedestrian", "path", "steps", "living_street", "residential", "service",
+    "unclassified", "tertiary", "secondary", "primary", "crossing", "corridor",
+}
+
+
+def is_crosswalk_feature(properties):
+    return str(properties.get("facilityType", "")) == TMAP_CROSSWALK_FACILITY or "횡단보도" in properties.get("description", "")
+
+
+def route_geometry(tmap_data):
+    """TMAP 응답의 LineString 목록 [(좌표 목록, 횡단보도 여부), ...]"""
+    lines = []
+    for feature in tmap_data.get("features", []):
+        geometry = feature.get("geometry", {})
+        if geometry.get("type") != "LineString" or len(geometry.get("coordinates", [])) < 2:
+            continue
+        lines.append((geometry["coordinates"], is_crosswalk_feature(feature.get("properties", {}))))
+    return lines
+
+
+_geometry_log_lock = threading.Lock()
+
+
+def record_route_geometry(tmap_data):
+    """
+    TMAP 응답의 LineString 을 PEDESTRIAN_GRAPH_GEOMETRY_LOG 에 한 줄씩 추가 (설정이 없으면 아무것도 안 함)
+    - build_pedestrian_graph 명령이 이 파일로 보행 그래프를 만듦
+    """
+    path = getattr(settings, "PEDESTRIAN_GRAPH_GEOMETRY_LOG", "")
+    if not path:
+        return
+    lines = route_geometry(tmap_data)
+    if not lines:
+        return
+    record = json.dumps({"lines": [{"coordinates": coords, "crosswalk": crosswalk} for coords, crosswalk in lines]})
+    try:
+        with _geometry_log_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(record + "\n")
+    except OSError as e:
+        print(f"[WARN] 경로 geometry 기록 실패: {e}")
+
+
+class PedestrianGraphBuilder:
+    """LineString 들을 이어 붙여 보행 그래프(무방향)를 만드는 빌더"""
+
+    def __init__(self, precision=NODE_PRECISION):
+        self.precision = precision
+        self.node_ids = {}
+        self.lats = []
+        self.lons = []
+        self.edges = {}
+
+    def node(self, lat, lon):
+        key = (round(lat, self.precision), round(lon, self.precision))
+        node = self.node_ids.get(key)
+        if node is None:
+            node = self.node_ids[key] = len(self.lats)
+            self.lats.append(key[0])
+            self.lons.append(key[1])
+        return node
+
+    def add_line(self, coords, crosswalk=False):
+        """GeoJSON 좌표 목록 [[lon, lat], ...] 을 간선들로 추가 (같은 간선이 횡단보도로 한 번이라도 나오면 횡단보도)"""
+        previous = None
+        for lon, lat in coords:
+            node = self.node(lat, lon)
+            if previous is not None and previous != node:
+                key = (previous, node) if previous < node else (node, previous)
+                self.edges[key] = self.edges.get(key, False) or crosswalk
+            previous = node
+
+    def add_tmap_route(self, tmap_data):
+        for coords, crosswalk in route_geometry(tmap_data):
+            self.add_line(coords, crosswalk)
+
+    def add_geometry_log(self, path):
+        """record_route_geometry 로 쌓은 파일 읽기, 반환: 읽은 경로 수"""
+        count = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                for item in json.loads(line)["lines"]:
+                    self.add_line(item["coordinates"], item.get("crosswalk", False))
+                count += 1
+        return count
+
+    def add_osm(self, path):
+        """
+        OSM XML 추출본(.osm)의 보행 가능한 way 추가, 반환: 추가한 way 수
+        - footway=crossing 또는 highway=crossing 인 way 는 횡단보도
+        """
+        coords = {}
+        count = 0
+        for _, element in ET.iterparse(path, events=("end",)):
+            if element.tag == "node":
+                coords[element.get("id")] = (float(element.get("lon")), float(element.get("lat")))
+                element.clear()
+            elif element.tag == "way":
+                tags = {tag.get("k"): tag.get("v") for tag in element.findall("tag")}
+                if tags.get("highway") in OSM_PEDESTRIAN_HIGHWAYS and tags.get("foot") != "no":
+                    line = [coords[ref.get("ref")] for ref in element.findall("nd") if ref.get("ref") in coords]
+                    crosswalk = tags.get("footway") == "crossing" or tags.get("highway") == "crossing"
+                    self.add_line(line, crosswalk)
+                    count += 1
+                element.clear()
+        return count
+
+    def build(self, lights=None, light_radius=CROSSWALK_LIGHT_RADIUS_M):
+        """
+        CSR 배열로 된 PedestrianGraph 생성
+        - lights: [{"itst_id", "latitude", "longitude"}, ...], 횡단보도 간선을 가장 가까운 신호등과 연결
+        """
+        lats = np.asarray(self.lats, dtype=np.float64)
+        lons = np.asarray(self.lons, dtype=np.float64)
+        pairs = np.asarray(list(self.edges.keys()), dtype=np.int64).reshape(-1, 2)
+        crosswalk = np.asarray(list(self.edges.values()), dtype=bool)
+
+        lat1, lon1 = np.radians(lats[pairs[:, 0]]), np.radians(lons[pairs[:, 0]])
+        lat2, lon2 = np.radians(lats[pairs[:, 1]]), np.radians(lons[pairs[:, 1]])
+        a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        lengths = EARTH_RADIUS_M * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+        edge_lights = np.full(len(pairs), -1, dtype=np.int32)
+        if lights and crosswalk.any():
+            index = GridIndex([light["latitude"] for light in lights], [light["longitude"] for light in lights])
+            at = np.flatnonzero(crosswalk)
+            mid_lats = (lats[pairs[at, 0]] + lats[pairs[at, 1]]) / 2
+            mid_lons = (lons[pairs[at, 0]] + lons[pairs[at, 1]]) / 2
+            _, nearest = index.nearest_many(mid_lats, mid_lons, light_radius)
+            found = nearest >= 0
+            edge_lights[at[found]] = [int(lights[i]["itst_id"]) for i in nearest[found]]
+
+        # 양방향 간선을 출발 노드 순으로 정렬해 CSR 로 만듦
+        sources = np.concatenate((pairs[:, 0], pairs[:, 1]))
+        targets = np.concatenate((pairs[:, 1], pairs[:, 0]))
+        order = np.argsort(sources, kind="stable")
+        indptr = np.zeros(len(lats) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(lats)), out=indptr[1:])
+        return PedestrianGraph(
+            lats, lons, indptr,
+            targets[order].astype(np.int32),
+            np.tile(lengths, 2)[order].astype(np.float32),
+            np.tile(edge_lights, 2)[order],
+            np.tile(np.where(crosswalk, EDGE_CROSSWALK, EDGE_WALK).astype(np.uint8), 2)[order],
+        )
+
+
+class PedestrianGraph:
+    """
+    CSR(compressed sparse row) 보행 그래프
+    - 노드 u 의 간선은 indices/lengths/lights/kinds[indptr[u]:indptr[u + 1]]
+    - 파일로 저장하면 np.memmap 으로 바로 열어 워커 시작 시 파싱/복사 없이 사용
+    """
+
+    def __init__(self, lats, lons, indptr, indices, lengths, lights, kinds, mtime=None):
+        self.lats = lats
+        self.lons = lons
+        self.indptr = indptr
+        self.indices = indices
+        self.lengths = lengths
+        self.lights = lights
+        self.kinds = kinds
+        self.mtime = mtime
+        self._grid = None
+        self._grid_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.lats)
+
+    @property
+    def edge_count(self):
+        return len(self.indices) // 2
+
+    def save(self, path):
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(GRAPH_HEADER.pack(GRAPH_MAGIC, 0, len(self.lats), len(self.indices)))
+            for name, dtype, _ in GRAPH_COLUMNS:
+                data = np.ascontiguousarray(getattr(self, name), dtype=dtype).tobytes()
+                f.write(data + b"\0" * (-len(data) % 8))
+        # 다른 워커가 읽는 중인 파일을 덮어쓰지 않도록 새 파일로 교체
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """파일을 메모리 매핑해 그래프 생성 (배열은 읽기 전용 mmap 뷰)"""
+        # np.memmap 조각을 그대로 쓰면 슬라이싱마다 memmap 객체가 생겨 느리므로 일반 ndarray 뷰로 사용 (mmap 은 유지)
+        data = np.memmap(path, dtype=np.uint8, mode="r").view(np.ndarray)
+        magic, _, n, m = GRAPH_HEADER.unpack_from(data)
+        if magic != GRAPH_MAGIC:
+            raise ValueError(f"Not a pedestrian graph file: {path}")
+        counts = {"nodes": n, "indptr": n + 1, "edges": m}
+        pos = GRAPH_HEADER.size + (-GRAPH_HEADER.size % 8)
+        arrays = {}
+        for name, dtype, count in GRAPH_COLUMNS:
+            size = np.dtype(dtype).itemsize * counts[count]
+            arrays[name] = data[pos:pos + size].view(dtype)
+            pos += size + (-size % 8)
+        return cls(**arrays, mtime=os.stat(path).st_mtime_ns)
+
+    @property
+    def grid(self):
+        if self._grid is None:
+            with self._grid_lock:
+                if self._grid is None:
+                    self._grid = GridIndex(self.lats, self.lons, cell_deg=0.002)
+        return self._grid
+
+    def snap(self, lat, lon, radius):
+        """radius(m) 안의 가장 가까운 노드 (노드, 거리), 없으면 None"""
+        found = self.grid.nearest(lat, lon, radius)
+        if found is None:
+            return None
+        dist, node = found
+        return node, dist
+
+    def neighbors(self, node):
+        """노드의 간선 목록 [(간선 위치, 이웃 노드, 길이, 신호등 id), ...] (CSR 배열에서 바로 읽음)"""
+        start, end = int(self.indptr[node]), int(self.indptr[node + 1])
+        return zip(
+            range(start, end),
+            self.indices[start:end].tolist(),
+            self.lengths[start:end].tolist(),
+            self.lights[start:end].tolist(),
+        )
+
+    def shortest_path(self, source, target, speed, wait=None):
+        """
+        source -> target 최소 소요시간 경로 (A*), 반환: (노드 목록, 간선 위치 목록, 도착 시각) 또는 None
+        - 간선 비용 = 길이 / speed + (횡단보도 신호가 있으면) wait(itst_id, 횡단보도 도착 시각)
+        - 대기시간은 도착 시각에 따라 달라지지만(time-dependent) 늦게 도착해서 더 일찍 건너는 경우는 없으므로
+          도착 시각을 라벨로 쓰는 A* 가 그대로 성립
+        - 휴리스틱: 목적지까지 직선거리 / speed (대기시간은 0 이상이라 과대추정하지 않음)
+        """
+        neighbors = self.neighbors
+        goal_lat, goal_lon = float(self.lats[target]), float(self.lons[target])
+        # 작은 영역이므로 등장방형 근사로 직선거리 계산 (위도 차이에 따른 오차를 감안해 0.99 배로 낮춰 잡음)
+        meters_lat = radians(1) * EARTH_RADIUS_M * 0.99
+        meters_lon = meters_lat * cos(radians(goal_lat))
+
+        def heuristic(node):
+            dlat = (float(self.lats[node]) - goal_lat) * meters_lat
+            dlon = (float(self.lons[node]) - goal_lon) * meters_lon
+            return sqrt(dlat * dlat + dlon * dlon) / speed
+
+        arrival = {source: 0.0}
+        previous = {}
+        done = set()
+        heap = [(heuristic(source), 0.0, source)]
+        while heap:
+            _, time_sec, node = heapq.heappop(heap)
+            if node in done:
+                continue
+            if node == target:
+                break
+            done.add(node)
+            for k, neighbor, length, light in neighbors(node):
+                if neighbor in done:
+                    continue
+                cost = length / speed
+                if light >= 0 and wait is not None:
+                    cost += wait(light, time_sec)
+                candidate = time_sec + cost
+                if candidate < arrival.get(neighbor, float("inf")):
+                    arrival[neighbor] = candidate
+                    previous[neighbor] = (node, k)
+                    heapq.heappush(heap, (candidate + heuristic(neighbor), candidate, neighbor))
+        else:
+            return None
+
+        nodes, edges = [target], []
+        while nodes[-1] != source:
+            node, edge = previous[nodes[-1]]
+            nodes.append(node)
+            edges.append(edge)
+        return nodes[::-1], edges[::-1], arrival[target]
+
+
+def signal_wait_function(snapshot=None, cycle_table=None):
+    """
+    (itst_id, 도착 시각) -> 대기시간 함수 (V2X 스냅샷의 현재 신호 + 신호 주기로 예측, crossing_waits 와 같은 계산)
+    - 교차로별로 처음 쓸 때 (이 시각까지는 초록불로 통과, 그 뒤 도착하면 대기시간) 을 계산해 두고 재사용
+    - 스냅샷에 없는 교차로는 추정한 주기 위상(offset)이 있으면 그것으로 예측
+    """
+    cycle_table = cycle_table or get_signal_cycle_table()
+    params = {}
+
+    def wait(its_id, arrival_sec):
+        found = params.get(its_id)
+        if found is None:
+            item = snapshot.get(its_id) if snapshot is not None else None
+            phase, remaining = signal_phase(build_signal_status(item, None)) if item else (PHASE_UNKNOWN, np.nan)
+            green, red, offset = cycle_table.lookup_schedule([its_id])
+            phases, remainings = scheduled_phases([phase], [remaining], green, red, offset)
+            phase, remaining = int(phases[0]), float(remainings[0])
+            # 통과 가능 시각을 넘겨 도착한 경우의 대기시간 (상태/주기를 모르면 0)
+            missed = float(crossing_waits(np.inf, phase, remaining, green[0], red[0]))
+            pass_until = remaining if phase == PHASE_GREEN and missed else -np.inf
+            found = params[its_id] = (pass_until, missed)
+        pass_until, missed = found
+        return 0.0 if arrival_sec <= pass_until else missed
+
+    return wait
+
+
+def path_to_route(graph, start, end, nodes, edges, speed, option):
+    """
+    그래프 경로를 TMAP 도보 경로 응답 형식(FeatureCollection)으로 변환
+    - 같은 종류의 간선끼리 LineString 하나로 묶고, 횡단보도 앞에는 TMAP 처럼 안내 Point 추가
+    """
+    features = [{
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [start[1], start[0]]},
+        "properties": {"index": 0, "description": "출발", "pointType": "SP"},
+    }]
+    total_distance = 0.0
+    runs = []
+    for node, edge in zip(nodes[:-1], edges):
+        kind = int(graph.kinds[edge])
+        if not runs or runs[-1]["kind"] != kind:
+            runs.append({"kind": kind, "coords": [[float(graph.lons[node]), float(graph.lats[node])]], "distance": 0.0})
+        runs[-1]["coords"].append([float(graph.lons[graph.indices[edge]]), float(graph.lats[graph.indices[edge]])])
+        runs[-1]["distance"] += float(graph.lengths[edge])
+
+    # 출발/도착 지점과 가장 가까운 노드 사이는 직선으로 이어 붙임
+    first = [float(graph.lons[nodes[0]]), float(graph.lats[nodes[0]])]
+    last = [float(graph.lons[nodes[-1]]), float(graph.lats[nodes[-1]])]
+    head = haversine(start[0], start[1], first[1], first[0])
+    tail = haversine(end[0], end[1], last[1], last[0])
+    if not runs:
+        runs.append({"kind": EDGE_WALK, "coords": [first], "distance": 0.0})
+    if head > 0:
+        runs[0]["coords"].insert(0, [start[1], start[0]])
+        runs[0]["distance"] += head
+    if tail > 0:
+        runs[-1]["coords"].append([end[1], end[0]])
+        runs[-1]["distance"] += tail
+
+    for run in runs:
+        crosswalk = run["kind"] == EDGE_CROSSWALK
+        if crosswalk:
+            features.append({
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": run["coords"][0]},
+                "properties": {"index": len(features), "description": "횡단보도", "pointType": "GP"},
+            })
+        total_distance += run["distance"]
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "LineString", "coordinates": run["coords"]},
+            "properties": {
+                "index": len(features),
+                "description": "횡단보도" if crosswalk else "보행자도로",
+                "facilityType": TMAP_CROSSWALK_FACILITY if crosswalk else "11",
+                "distance": round(run["distance"]),
+                "time": round(run["distance"] / speed),
+            },
+        })
+
+    features.append({
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [end[1], end[0]]},
+        "properties": {
+            "index": len(features),
+            "description": "도착",
+            "pointType": "EP",
+            "totalDistance": round(total_distance),
+            "totalTime": round(total_distance / speed),
+        },
+    })
+    return {"type": "FeatureCollection", "features": features, "source": "local", "searchOption": option}
+
+
+def local_pedestrian_routes(startX, startY, endX, endY, options, graph=None, speed=None, snapshot=None, cycle_table=None):
+    """
+    로컬 보행 그래프로 fetch_pedestrian_routes 와 같은 형식의 결과 생성
+    - searchOption 0, 4 (추천): 횡단보도 신호 대기를 반영한 최소 시간 경로
+    - 그 밖의 옵션 (최단 등): 최단 거리 경로
+    - 그래프가 없거나 출발/도착지가 그래프 범위 밖이거나 경로가 없으면 None
+    """
+    graph = graph if graph is not None else get_pedestrian_graph()
+    if graph is None or not len(graph):
+        return None
+    try:
+        start = (float(startY), float(startX))
+        end = (float(endY), float(endX))
+    except (TypeError, ValueError):
+        return None
+
+    radius = getattr(settings, "PEDESTRIAN_GRAPH_SNAP_RADIUS", 50)
+    source = graph.snap(*start, radius)
+    target = graph.snap(*end, radius)
+    if source is None or target is None:
+        return None
+
+    speed = speed or getattr(settings, "PEDESTRIAN_GRAPH_SPEED", 1.1)
+    wait = None
+    if any(option in ("0", "4") for option in options):
+        if snapshot is None:
+            try:
+                snapshot = get_signal_snapshot()
+            except requests.RequestException as e:
+                print(f"[WARN] V2X 신호 스냅샷 조회 실패, 신호 대기 없이 계산: {e}")
+        wait = signal_wait_function(snapshot, cycle_table)
+
+    results = {}
+    paths = {}
+    for option in options:
+        fastest = option in ("0", "4")
+        if fastest not in paths:
+            paths[fastest] = graph.shortest_path(source[0], target[0], speed, wait if fastest else None)
+        path = paths[fastest]
+        if path is None:
+            return None
+        nodes, edges, _ = path
+        results[option] = {"data": path_to_route(graph, start, end, nodes, edges, speed, option)}
+    return results
+
+
+def fetch_routes_with_local_fallback(startX, startY, endX, endY, options, fetch_routes=None):
+    """
+    PEDESTRIAN_GRAPH_MODE 에 따라 로컬 그래프와 TMAP(fetch_routes, 기본 fetch_pedestrian_routes) 결과를 조합
+    - off: TMAP 만 사용
+    - fallback (기본): TMAP 이 실패한 옵션만 로컬 그래프 결과로 대체
+    - prefer: 로컬 그래프가 범위를 덮으면 TMAP 을 호출하지 않음
+    """
+    if fetch_routes is None:
+        from .tmap import fetch_pedestrian_routes as fetch_routes
+
+    mode = getattr(settings, "PEDESTRIAN_GRAPH_MODE", "fallback")
+    if mode == "prefer":
+        local = local_pedestrian_routes(startX, startY, endX, endY, options)
+        if local is not None:
+            return local
+
+    results = fetch_routes(startX, startY, endX, endY, options=options)
+    failed = [option for option in options if "error" in results[option]]
+    if mode != "off" and failed:
+        local = local_pedestrian_routes(startX, startY, endX, endY, failed)
+        if local is not None:
+            results.update(local)
+    return results
+
+
+async def afetch_routes_with_local_fallback(startX, startY, endX, endY, options):
+    """fetch_routes_with_local_fallback 의 비동기 버전 (로컬 그래프 탐색은 스레드에서 실행)"""
+    from .tmap import afetch_pedestrian_routes
+
+    mode = getattr(settings, "PEDESTRIAN_GRAPH_MODE", "fallback")
+    if mode == "prefer":
+        local = await asyncio.to_thread(local_pedestrian_routes, startX, startY, endX, endY, options)
+        if local is not None:
+            return local
+
+    results = await afetch_pedestrian_routes(startX, startY, endX, endY, options=options)
+    failed = [option for option in options if "error" in results[option]]
+    if mode != "off" and failed:
+        local = await asyncio.to_thread(local_pedestrian_routes, startX, startY, endX, endY, failed)
+        if local is not None:
+            results.update(local)
+    return results
+
+
+_graph = None
+_graph_lock = threading.Lock()
+
+
+def get_graph_path():
+    return Path(getattr(
+        settings, "PEDESTRIAN_GRAPH_PATH",
+        Path(__file__).resolve().parent / "data" / "pedestrian_graph.bin",
+    ))
+
+
+def get_pedestrian_graph():
+    """
+    프로세스 공용 보행 그래프 (파일이 없으면 None)
+    - 파일 mtime 이 바뀌면(build_pedestrian_graph 재실행) 다시 매핑
+    """
+    global _graph
+    path = get_graph_path()
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    graph = _graph
+    if graph is not None and graph.mtime == mtime:
+        return graph
+
+    with _graph_lock:
+        if _graph is None or _graph.mtime != mtime:
+            _graph = PedestrianGraph.load(path)
+        return _graph
+
+
+def invalidate_pedestrian_graph():
+    global _graph
+    with _graph_lock:
+        _graph = None
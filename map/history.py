@@ -0,0 +1,366 @@
+import atexit
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .v2x import SIGNAL_DIRECTIONS
+
+# 보행 신호 상태 코드 (*PdsgStatNm)
+STATUS_NONE = 0
+STATUS_STOP = 1
+STATUS_PROTECTED = 2
+STATUS_PERMISSIVE = 3
+STATUS_OTHER = 4
+
+# 열(column) 이름과 저장 dtype
+HISTORY_COLUMNS = {
+    "t": np.int64,          # 피드 전송 시각 trsmUtcTime (ms)
+    "its_id": np.int32,
+    "direction": np.uint8,  # SIGNAL_DIRECTIONS 의 위치
+    "status": np.uint8,     # STATUS_*
+    "remaining": np.int32,  # *PdsgRmdrCs (0.1초 단위, 없으면 -1)
+}
+# 청크 안에서 (itstId, 방향, 시각) 순으로 정렬한 뒤 앞 값과의 차이로 저장하는 열 (1Hz 카운트다운은 차이가 거의 일정해 잘 압축됨)
+DELTA_COLUMNS = ("t", "remaining")
+# 청크 안의 row group 크기 (행, 교차로 경계에서 나눔)
+ROW_GROUP_ROWS = 65536
+
+DIRECTION_CODES = {direction: code for code, direction in enumerate(SIGNAL_DIRECTIONS)}
+
+
+def status_code(raw_status):
+    if not raw_status:
+        return STATUS_NONE
+    raw_status = raw_status.lower()
+    if "stop" in raw_status:
+        return STATUS_STOP
+    if "protected" in raw_status:
+        return STATUS_PROTECTED
+    if "permissive" in raw_status:
+        return STATUS_PERMISSIVE
+    return STATUS_OTHER
+
+
+def snapshot_rows(items):
+    """피드 item 목록 -> 방향별 신호 한 행씩 (t, its_id, direction, status, remaining) 리스트 (신호 없는 방향은 제외)"""
+    rows = []
+    for item in items:
+        t = item.get("trsmUtcTime")
+        try:
+            its_id = int(str(item.get("itstId", "")).strip())
+        except ValueError:
+            continue
+        if t is None:
+            continue
+        for direction, code in DIRECTION_CODES.items():
+            status = status_code(item.get(f"{direction}PdsgStatNm"))
+            if status == STATUS_NONE:
+                continue
+            remaining = item.get(f"{direction}PdsgRmdrCs")
+            rows.append((t, its_id, code, status, -1 if remaining is None else remaining))
+    return rows
+
+
+def partition_name(t_ms):
+    """시각(ms)이 속한 시간 파티션 디렉터리 (UTC, YYYY-MM-DD/HH)"""
+    return datetime.fromtimestamp(t_ms / 1000, tz=timezone.utc).strftime("%Y-%m-%d/%H")
+
+
+class PhaseHistoryStore:
+    """
+    V2X 신호 이력을 시간 파티션별 압축 열 파일(.npz)로 쌓는 append-only 저장소
+    - root/YYYY-MM-DD/HH/<첫 시각>-<pid>-<번호>.npz, 한 번 쓴 파일은 바꾸지 않음 (여러 프로세스가 같은 root 에 써도 됨)
+    - 청크는 (itstId, 방향, 시각) 순으로 정렬해 row group 단위로 열마다 압축, 교차로 일부만 읽으면 해당 row group 만 해제
+    - 메모리 버퍼가 flush_rows 행을 넘거나, 버퍼의 첫 행이 flush_interval 초보다 오래됐거나, 시간 파티션이 바뀌면 파일로 씀
+    - 같은 교차로의 같은 전송 시각은 한 번만 기록
+    """
+
+    def __init__(self, root, flush_rows=None, flush_interval=None):
+        self.root = Path(root)
+        self.flush_rows = flush_rows or getattr(settings, "V2X_HISTORY_FLUSH_ROWS", 500000)
+        self.flush_interval = flush_interval or getattr(settings, "V2X_HISTORY_FLUSH_INTERVAL", 60.0)
+        self.buffer = []
+        self.buffered = 0
+        self.buffered_since = None
+        self.partition = None
+        self.last_seen = {}
+        self.written_rows = 0
+        self.written_bytes = 0
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def record_snapshot(self, snapshot):
+        """SignalSnapshot 의 교차로 중 전송 시각이 바뀐 것만 기록 (SignalFeedPoller 리스너로 사용)"""
+        items = [
+            item for its_id, item in snapshot.items.items()
+            if item.get("trsmUtcTime") is not None and self.last_seen.get(its_id) != item["trsmUtcTime"]
+        ]
+        for item in items:
+            self.last_seen[str(item.get("itstId", "")).strip()] = item["trsmUtcTime"]
+        rows = snapshot_rows(items)
+        if rows:
+            self.append(np.array(rows, dtype=np.int64).T)
+        return len(rows)
+
+    def append(self, columns):
+        """열 배열 (t, its_id, direction, status, remaining) 추가 (각각 같은 길이)"""
+        columns = [np.asarray(column) for column in columns]
+        if not len(columns[0]):
+            return
+        with self._lock:
+            # 시간 파티션이 바뀌는 지점에서 나눠서 씀
+            partitions = np.asarray(columns[0]) // 3600000
+            boundaries = np.flatnonzero(partitions[1:] != partitions[:-1]) + 1
+            for part in zip(*(np.split(column, boundaries) for column in columns)):
+                hour = int(part[0][0]) // 3600000
+                if self.partition is not None and hour != self.partition:
+                    self._flush()
+                self.partition = hour
+                if not self.buffered:
+                    self.buffered_since = time.monotonic()
+                self.buffer.append(part)
+                self.buffered += len(part[0])
+                if self.buffered >= self.flush_rows or time.monotonic() - self.buffered_since >= self.flush_interval:
+                    self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self.buffered:
+            return
+        columns = {
+            name: np.concatenate([part[i] for part in self.buffer]).astype(np.int64)
+            for i, name in enumerate(HISTORY_COLUMNS)
+        }
+        self.buffer, self.buffered = [], 0
+
+        order = np.lexsort((columns["t"], columns["direction"], columns["its_id"]))
+        columns = {name: values[order] for name, values in columns.items()}
+
+        # 교차로 경계에서 약 ROW_GROUP_ROWS 행씩 row group 으로 나눠 열마다 따로 압축
+        # (교차로 일부만 읽을 때 필요한 row group 만 압축 해제)
+        its_id = columns["its_id"]
+        starts = np.flatnonzero(np.diff(its_id, prepend=-1))
+        groups = [0]
+        for start in starts:
+            if start - groups[-1] >= ROW_GROUP_ROWS:
+                groups.append(int(start))
+        bounds = groups + [len(its_id)]
+
+        arrays = {
+            "ids": its_id[starts].astype(np.int32),
+            "groups": np.array([(its_id[lo], its_id[hi - 1]) for lo, hi in zip(bounds[:-1], bounds[1:])], dtype=np.int32),
+            "t_max": np.int64(columns["t"].max()),
+        }
+        for g, (lo, hi) in enumerate(zip(bounds[:-1], bounds[1:])):
+            for name, dtype in HISTORY_COLUMNS.items():
+                values = columns[name][lo:hi]
+                if name in DELTA_COLUMNS:
+                    values = np.diff(values, prepend=0)
+                arrays[f"{name}.{g}"] = values.astype(dtype)
+
+        t_min = int(columns["t"].min())
+        directory = self.root / partition_name(t_min)
+        directory.mkdir(parents=True, exist_ok=True)
+        self._seq += 1
+        path = directory / f"{t_min}-{os.getpid()}-{self._seq}.npz"
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        # 읽는 쪽이 쓰다 만 파일을 보지 않도록 다 쓴 뒤 이름 변경
+        os.replace(tmp, path)
+        self.written_rows += len(its_id)
+        self.written_bytes += path.stat().st_size
+
+    def chunks(self, start_ms=None, end_ms=None):
+        """[start_ms, end_ms) 와 겹칠 수 있는 청크 파일 (파티션 디렉터리 이름으로 먼저 거름)"""
+        start_hour = partition_name(start_ms) if start_ms is not None else None
+        end_hour = partition_name(end_ms) if end_ms is not None else None
+        paths = []
+        for day in sorted(self.root.glob("????-??-??")):
+            for hour in sorted(day.iterdir()):
+                name = f"{day.name}/{hour.name}"
+                if (start_hour and name < start_hour) or (end_hour and name > end_hour):
+                    continue
+                paths.extend(sorted(hour.glob("*.npz")))
+        return paths
+
+    def its_ids(self, start_ms=None, end_ms=None):
+        """기간 안에 이력이 있는 itstId 목록 (청크별 id 목록만 읽음)"""
+        ids = set()
+        for path in self.chunks(start_ms, end_ms):
+            with np.load(path) as chunk:
+                if start_ms is None or int(chunk["t_max"]) >= start_ms:
+                    ids.update(chunk["ids"].tolist())
+        return sorted(ids)
+
+    def read(self, start_ms=None, end_ms=None, its_ids=None):
+        """
+        [start_ms, end_ms) 기간의 이력을 열 배열 dict 로 반환 (its_ids 를 주면 해당 교차로만)
+        - 청크 순서대로 이어 붙이므로 전체 정렬은 보장하지 않음
+        """
+        wanted = np.asarray(sorted({int(its_id) for its_id in its_ids}), dtype=np.int64) if its_ids is not None else None
+        parts = {name: [] for name in HISTORY_COLUMNS}
+        for path in self.chunks(start_ms, end_ms):
+            with np.load(path) as chunk:
+                if start_ms is not None and int(chunk["t_max"]) < start_ms:
+                    continue
+                for g, (first, last) in enumerate(chunk["groups"].tolist()):
+                    if wanted is not None:
+                        lo = np.searchsorted(wanted, first)
+                        if lo == len(wanted) or wanted[lo] > last:
+                            continue
+                    columns = {}
+                    for name in HISTORY_COLUMNS:
+                        values = chunk[f"{name}.{g}"].astype(np.int64)
+                        columns[name] = np.cumsum(values) if name in DELTA_COLUMNS else values
+
+                    mask = np.ones(len(columns["t"]), dtype=bool)
+                    if wanted is not None:
+                        mask &= np.isin(columns["its_id"], wanted)
+                    if start_ms is not None:
+                        mask &= columns["t"] >= start_ms
+                    if end_ms is not None:
+                        mask &= columns["t"] < end_ms
+                    for name in HISTORY_COLUMNS:
+                        parts[name].append(columns[name][mask])
+        return {
+            name: np.concatenate(values) if values else np.empty(0, dtype=np.int64)
+            for name, values in parts.items()
+        }
+
+    def stats(self):
+        return {
+            "root": str(self.root),
+            "buffered_rows": self.buffered,
+            "written_rows": self.written_rows,
+            "written_bytes": self.written_bytes,
+        }
+
+
+def infer_cycles(history, min_phases=3, max_gap_ms=5000):
+    """
+    신호 이력에서 교차로별 보행 신호 주기 추정
+    - 방향별로 같은 색이 이어지는 구간(phase)마다 끝나는 시각(= 전송 시각 + 남은 시간)의 중앙값을 구하고,
+      바로 앞 구간이 반대 색이고 사이에 이력이 끊기지 않았으면 끝 시각 차이를 그 구간의 길이로 봄
+    - 교차로마다 초록/빨강 구간이 각각 min_phases 개 이상인 방향 중 가장 많이 관측된 방향의
+      구간 길이 중앙값을 green_sec / red_sec 로 사용
+    - offset_sec: 초록불이 시작되는 시각을 (Unix 시각 mod 주기) 로 나타낸 값 (원형 평균)
+    - 반환: [{"itst_id", "green_sec", "red_sec", "offset_sec", "phases", "direction"}, ...]
+    """
+    status = np.asarray(history["status"])
+    keep = (status != STATUS_NONE) & (status != STATUS_OTHER) & (np.asarray(history["remaining"]) >= 0)
+    frame = pd.DataFrame({
+        "its_id": np.asarray(history["its_id"])[keep],
+        "direction": np.asarray(history["direction"])[keep],
+        "t": np.asarray(history["t"])[keep],
+        "green": status[keep] != STATUS_STOP,
+        "end": np.asarray(history["t"])[keep] + np.asarray(history["remaining"])[keep] * 100,
+    })
+    if frame.empty:
+        return []
+    # 여러 프로세스가 같은 피드를 기록했을 수 있으므로 중복 제거
+    frame = frame.drop_duplicates(["its_id", "direction", "t"]).sort_values(["its_id", "direction", "t"], kind="stable")
+
+    # 같은 (교차로, 방향) 안에서 색이 바뀌거나 이력이 끊긴 곳마다 새 구간
+    same_series = (frame["its_id"].diff() == 0) & (frame["direction"].diff() == 0)
+    gap = frame["t"].diff() > max_gap_ms
+    frame["phase"] = (~same_series | gap | (frame["green"] != frame["green"].shift())).cumsum()
+
+    phases = frame.groupby("phase").agg(
+        its_id=("its_id", "first"), direction=("direction", "first"), green=("green", "first"),
+        first_t=("t", "min"), last_t=("t", "max"), end=("end", "median"),
+    )
+    previous = phases.shift()
+    complete = (
+        (phases["its_id"] == previous["its_id"]) & (phases["direction"] == previous["direction"])
+        & (phases["green"] != previous["green"]) & (phases["first_t"] - previous["last_t"] <= max_gap_ms)
+    )
+    phases["duration"] = (phases["end"] - previous["end"]) / 1000
+    phases = phases[complete & (phases["duration"] > 0)]
+    if phases.empty:
+        return []
+
+    durations = phases.groupby(["its_id", "direction", "green"])["duration"].agg(["median", "count"]).unstack("green")
+    durations = durations.dropna()
+    durations = durations[(durations[("count", True)] >= min_phases) & (durations[("count", False)] >= min_phases)]
+
+    results = []
+    for its_id, rows in durations.groupby(level="its_id"):
+        counts = rows[("count", True)] + rows[("count", False)]
+        direction = counts.idxmax()[1]
+        row = rows.loc[(its_id, direction)]
+        green_sec, red_sec = float(row[("median", True)]), float(row[("median", False)])
+        cycle = green_sec + red_sec
+
+        # 초록불 시작 시각 = 초록 구간 끝 시각 - 초록 길이, 주기 안의 위치를 원형 평균
+        greens = phases[(phases["its_id"] == its_id) & (phases["direction"] == direction) & phases["green"]]
+        starts = ((greens["end"] / 1000 - green_sec) % cycle) / cycle * 2 * np.pi
+        offset = float(np.arctan2(np.sin(starts).mean(), np.cos(starts).mean()) % (2 * np.pi) / (2 * np.pi) * cycle)
+
+        results.append({
+            "itst_id": int(its_id),
+            "green_sec": round(green_sec, 1),
+            "red_sec": round(red_sec, 1),
+            "offset_sec": round(offset, 1),
+            "phases": int(counts.max()),
+            "direction": SIGNAL_DIRECTIONS[int(direction)],
+        })
+    return results
+
+
+def infer_store_cycles(store, start_ms=None, end_ms=None, min_phases=3, batch_size=100):
+    """
+    저장소의 교차로를 batch_size 개씩 읽어 infer_cycles (기간 전체 이력을 한 번에 메모리에 올리지 않음)
+    - 반환: (추정 결과 목록, 읽은 행 수)
+    """
+    its_ids = store.its_ids(start_ms, end_ms)
+    cycles, rows = [], 0
+    for i in range(0, len(its_ids), batch_size):
+        history = store.read(start_ms, end_ms, its_ids=its_ids[i:i + batch_size])
+        rows += len(history["t"])
+        cycles.extend(infer_cycles(history, min_phases=min_phases))
+    return cycles, rows
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_phase_history():
+    """
+    프로세스 공용 이력 저장소 (V2X_HISTORY_DIR 이 없으면 None)
+    - 프로세스가 종료될 때(재시작/배포) 버퍼에 남은 행도 파일로 씀
+    """
+    global _store
+    root = getattr(settings, "V2X_HISTORY_DIR", "")
+    if not root:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = PhaseHistoryStore(root)
+                atexit.register(_store.flush)
+    return _store
+
+
+def attach_phase_history(poller):
+    """V2X_HISTORY_RECORD 이면 폴러의 새 스냅샷마다 이력 저장소에 기록"""
+    store = get_phase_history()
+    if store is not None and getattr(settings, "V2X_HISTORY_RECORD", False):
+        poller.add_listener(store.record_snapshot)
+    return store
+
+
+def history_window(days, now=None):
+    """최근 days 일의 (start_ms, end_ms)"""
+    end_ms = int((now if now is not None else time.time()) * 1000)
+    return end_ms - int(days * 86400000), end_ms
@@ -0,0 +1,1020 @@
+import asyncio
+import datetime
+import json
+import os
+import random
+import ssl
+import tempfile
+import tracemalloc
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+import numpy as np
+import requests
+from django.conf import settings
+from django.test import Client, RequestFactory, override_settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from map.geo import haversine, haversine_one_to_many, haversine_consecutive
+from map.spatial import GridIndex, TrafficLightIndex, nearby_from_db
+from map.registry import get_intersection_registry
+from map.v2x import SignalSnapshot, get_signal_poller
+from map import async_upstream, metrics, upstream
+from map.async_views import AsyncSignalStreamView, AsyncTmapRouteView
+from map.signalhub import close_signal_hub, get_signal_hub
+from map.views import SignalStatusBatchView, SignalStatusView, TmapRouteView
+from map.segmenter import RouteSegmenter
+from map.ranking import departure_profile, rank_routes, route_signal_inputs
+from map.cycles import SignalCycleTable, crossing_waits, route_waits
+from map.artifact import TrafficLightArtifact, serve_encoded
+from map.tiles import TileIndex, lonlat_to_tile
+from map.history import STATUS_PROTECTED, STATUS_STOP, PhaseHistoryStore, infer_store_cycles
+from map.graph import PedestrianGraph, PedestrianGraphBuilder, local_pedestrian_routes, signal_wait_function
+from map.models import TrafficLight
+from map.serializers import TrafficLightSerializer
+from rest_framework.renderers import JSONRenderer
+from map.tmap import ROUTE_OPTIONS, FeatureStream, fetch_pedestrian_route, fetch_pedestrian_routes, parse_route_stream
+
+# 서울 영역 (합성 데이터 생성용)
+SEOUL_LAT = (37.42, 37.70)
+SEOUL_LON = (126.76, 127.18)
+
+
+def random_points(n, seed=0):
+    rng = random.Random(seed)
+    lats = [rng.uniform(*SEOUL_LAT) for _ in range(n)]
+    lons = [rng.uniform(*SEOUL_LON) for _ in range(n)]
+    return lats, lons
+
+
+class StubServer(ThreadingHTTPServer):
+    # 동시 요청 수백 개를 받아도 연결이 거절되지 않도록 listen backlog 를 늘림
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def start_stub_server(handler, certfile=None):
+    """로컬 스텁 업스트림 서버 (벤치마크 전용), 반환: (server, base_url)"""
+    server = StubServer(("127.0.0.1", 0), handler)
+    scheme = "http"
+    if certfile:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certfile)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = "https"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"{scheme}://127.0.0.1:{server.server_address[1]}"
+
+
+def self_signed_cert(directory):
+    """127.0.0.1 용 자체 서명 인증서 (key + cert 를 한 PEM 파일로)"""
+    import ipaddress
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name).issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now).not_valid_after(now + datetime.timedelta(days=1))
+        .add_extension(x509.SubjectAlternativeName([x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]), critical=False)
+        .sign(key, hashes.SHA256())
+    )
+    path = Path(directory) / "stub.pem"
+    path.write_bytes(
+        key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption())
+        + cert.public_bytes(serialization.Encoding.PEM)
+    )
+    return str(path)
+
+
+def json_stub_handler(payload):
+    body = json.dumps(payload).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+class InFlight:
+    """동시에 처리 중인 요청 수와 그 최댓값"""
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.current -= 1
+
+
+def tmap_stub_handler(delay_sec, in_flight=None):
+    in_flight = in_flight or InFlight()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            with in_flight:
+                time.sleep(delay_sec)
+            body = json.dumps({"type": "FeatureCollection", "features": []}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def signal_feed_stub_handler(n, hits):
+    """
+    시간에 따라 신호가 바뀌는 V2X 피드 스텁 (교차로 n 개, itstId = "0" ~ str(n - 1))
+    - 교차로마다 주기/녹색 시간/시작 위치가 달라 폴링할 때마다 일부 교차로의 색이 바뀜
+    - hits: 받은 요청 수를 세는 리스트 (hits[0])
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            hits[0] += 1
+            now = time.time()
+            items = []
+            for i in range(n):
+                cycle, green = 60 + i % 30, 20 + i % 10
+                position = (now + i * 7) % cycle
+                if position < green:
+                    status, remaining = "protected-Movement-Allowed", green - position
+                else:
+                    status, remaining = "stop-And-Remain", cycle - position
+                items.append({"itstId": str(i), "trsmUtcTime": int(now * 1000),
+                              "ntPdsgStatNm": status, "ntPdsgRmdrCs": int(remaining * 10)})
+            body = json.dumps(items).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def synthetic_tmap_body(features, points_per_line=50, seed=0):
+    """TMAP 도보 경로 형식의 합성 응답 바이트 (끝에 NUL 포함)"""
+    rng = random.Random(seed)
+    lon, lat = 127.0, 37.5
+    items = []
+    for i in range(features):
+        coords = []
+        for _ in range(points_per_line):
+            lon += rng.uniform(-1e-4, 1e-4)
+            lat += rng.uniform(-1e-4, 1e-4)
+            coords.append([round(lon, 7), round(lat, 7)])
+        items.append({"type": "Feature", "geometry": {"type": "LineString", "coordinates": coords},
+                      "properties": {"index": i, "description": "보행자도로, 50m", "distance": 50, "time": 36}})
+    return (json.dumps({"type": "FeatureCollection", "features": items}, ensure_ascii=False) + "\x00").encode()
+
+
+def peak_memory(func):
+    """func 실행 중 최대 할당량(bytes)"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+class Command(BaseCommand):
+    help = 'Run map performance benchmarks on synthetic data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenario', type=str, help='Benchmark scenario name (e.g. nearby)')
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000],
+                            help='Dataset sizes to benchmark')
+        parser.add_argument('--repeat', type=int, default=200, help='Number of timed runs per size')
+
+    def handle(self, *args, **options):
+        scenario = getattr(self, f"bench_{options['scenario'].replace('-', '_')}", None)
+        if scenario is None:
+            raise CommandError(f"Unknown scenario: {options['scenario']}")
+        scenario(options['sizes'], options['repeat'])
+
+    def report(self, label, samples):
+        self.stdout.write(
+            f"{label:<40} p50={percentile(samples, 50):9.3f}ms  p99={percentile(samples, 99):9.3f}ms"
+        )
+
+    def bench_nearby(self, sizes, repeat):
+        """반경 500m 검색: 전체 스캔 vs GridIndex"""
+        rng = random.Random(1)
+        for n in sizes:
+            lats, lons = random_points(n)
+            start = time.perf_counter()
+            index = GridIndex(lats, lons)
+            self.stdout.write(f"[n={n}] index build {(time.perf_counter() - start) * 1000:.1f}ms")
+
+            queries = [(rng.uniform(*SEOUL_LAT), rng.uniform(*SEOUL_LON)) for _ in range(repeat)]
+            it = iter(queries * 2)
+
+            def linear():
+                lat, lon = next(it)
+                return [i for i in range(n) if haversine(lat, lon, lats[i], lons[i]) <= 500]
+
+            def indexed():
+                lat, lon = next(it)
+                return index.within(lat, lon, 500)
+
+            # 전체 스캔은 대용량에서 너무 느리므로 반복 횟수를 줄임
+            self.report(f"[n={n}] linear scan", timed(linear, max(1, min(repeat, 2_000_000 // n))))
+            it = iter(queries)
+            self.report(f"[n={n}] grid index", timed(indexed, repeat))
+
+    def bench_haversine(self, sizes, repeat):
+        """스칼라 haversine 루프 vs numpy 커널 (one-to-many, 연속 구간 길이)"""
+        for n in sizes:
+            lats, lons = random_points(n)
+            lat, lon = 37.5665, 126.9780
+            repeat_scalar = max(1, min(repeat, 2_000_000 // n))
+
+            scalar = [haversine(lat, lon, lats[i], lons[i]) for i in range(n)]
+            vector = haversine_one_to_many(lat, lon, lats, lons)
+            error = max(abs(a - b) for a, b in zip(scalar, vector))
+            self.stdout.write(f"[n={n}] one-to-many max abs error {error:.3e} m")
+
+            self.report(f"[n={n}] one-to-many scalar",
+                        timed(lambda: [haversine(lat, lon, lats[i], lons[i]) for i in range(n)], repeat_scalar))
+            self.report(f"[n={n}] one-to-many numpy",
+                        timed(lambda: haversine_one_to_many(lat, lon, lats, lons), repeat))
+            self.report(f"[n={n}] polyline scalar",
+                        timed(lambda: sum(haversine(lats[i], lons[i], lats[i + 1], lons[i + 1])
+                                          for i in range(n - 1)), repeat_scalar))
+            self.report(f"[n={n}] polyline numpy",
+                        timed(lambda: haversine_consecutive(lats, lons).sum(), repeat))
+
+    def synthetic_route(self, crossings):
+        """등록된 교차로들을 잇는 합성 도보 경로 (좌표, 교차로 목록)"""
+        registry = get_intersection_registry()
+        order = sorted(range(len(registry)), key=lambda i: (registry.grid.lats[i], registry.grid.lons[i]))[:crossings]
+        coords, crossing_points = [], []
+        prev = None
+        for i in order:
+            lat, lng = float(registry.grid.lats[i]), float(registry.grid.lons[i])
+            if prev:
+                # 교차로 사이를 20개 좌표로 보간
+                coords.extend([prev[1] + (lng - prev[1]) * t / 20, prev[0] + (lat - prev[0]) * t / 20] for t in range(20))
+            prev = (lat, lng)
+            crossing_points.append({"lat": lat, "lng": lng, "description": "횡단보도"})
+        coords.append([prev[1], prev[0]])
+        return coords, crossing_points
+
+    def synthetic_feed(self):
+        registry = get_intersection_registry()
+        now = int(time.time() * 1000)
+        return [
+            {"itstId": its_id, "trsmUtcTime": now, "ntPdsgStatNm": "protected-Movement-Allowed", "ntPdsgRmdrCs": 300}
+            for its_id in registry.ids
+        ]
+
+    def bench_estimated_time(self, sizes, repeat):
+        """RouteEstimatedTimeView 의 TMAP 이후 처리 (구간 분할 + 신호 조회 + 소요시간), sizes = 교차로 수"""
+        from map.views import RouteEstimatedTimeView
+
+        view = RouteEstimatedTimeView()
+        get_signal_poller().snapshot = SignalSnapshot(self.synthetic_feed())
+        with override_settings(V2X_POLL_ENABLED=False, V2X_POLL_INTERVAL=3600):
+            for crossings in sizes:
+                coords, crossing_points = self.synthetic_route(crossings)
+
+                def run():
+                    segments = view.create_segments(coords, crossing_points)
+                    statuses = view.get_signal_status_list(crossing_points)
+                    return view.calculate_total_expected_time(segments, statuses, 1.39)
+
+                self.report(f"[crossings={crossings}] estimated time", timed(run, repeat))
+
+    def bench_tmap_options(self, sizes, repeat):
+        """추천/대안 경로 순차 요청 vs 동시 요청, sizes = 스텁 서버 응답 지연(ms)"""
+        options = list(ROUTE_OPTIONS.values())
+        for delay_ms in sizes:
+            server, base_url = start_stub_server(tmap_stub_handler(delay_ms / 1000))
+            args = ("127.0", "37.5", "127.1", "37.6")
+            with override_settings(TMAP_PEDESTRIAN_URL=f"{base_url}/tmap/routes/pedestrian?version=1"):
+                self.report(f"[delay={delay_ms}ms] sequential",
+                            timed(lambda: [fetch_pedestrian_route(*args, option=o) for o in options], repeat))
+                self.report(f"[delay={delay_ms}ms] concurrent",
+                            timed(lambda: fetch_pedestrian_routes(*args, options=options), repeat))
+            server.shutdown()
+
+    def bench_upstream_pool(self, sizes, repeat):
+        """로컬 TLS 스텁에 대해 요청마다 새 연결(requests.get) vs 공용 keep-alive 세션, sizes = 응답 item 수"""
+        with tempfile.TemporaryDirectory() as directory:
+            certfile = self_signed_cert(directory)
+            for n in sizes:
+                server, base_url = start_stub_server(json_stub_handler([{"itstId": str(i)} for i in range(n)]), certfile)
+                url = f"{base_url}/feed"
+                self.report(f"[items={n}] new connection per call",
+                            timed(lambda: requests.get(url, verify=certfile, timeout=5).json(), repeat))
+                self.report(f"[items={n}] pooled keep-alive session",
+                            timed(lambda: upstream.get("bench", url, verify=certfile, timeout=5).json(), repeat))
+                server.shutdown()
+            self.stdout.write(f"upstream stats: {upstream.upstream_stats()}")
+
+    def bench_tmap_parse(self, sizes, repeat):
+        """TMAP 응답 파싱: 전체 문자열 + replace + json.loads vs 스트리밍 파서, sizes = LineString feature 수"""
+        for n in sizes:
+            body = synthetic_tmap_body(n)
+            chunks = lambda: (body[i:i + 64 * 1024] for i in range(0, len(body), 64 * 1024))
+
+            def whole():
+                return json.loads(body.decode("utf-8").replace('\x00', ''))
+
+            def streamed():
+                return parse_route_stream(chunks())
+
+            def iterate_only():
+                for _ in FeatureStream(chunks()):
+                    pass
+
+            self.stdout.write(f"[features={n}] body {len(body) / 1024 / 1024:.2f}MB")
+            for label, func in (("json.loads(text)", whole), ("stream -> list", streamed), ("stream iterate", iterate_only)):
+                self.report(f"[features={n}] {label}", timed(func, repeat))
+                self.stdout.write(f"{'':<40} peak={peak_memory(func) / 1024 / 1024:.2f}MB")
+
+    def bench_light_match(self, sizes, repeat):
+        """경로 2개 x 횡단보도 50개를 가장 가까운 신호등과 매칭: 지점별 전체 스캔 vs 일괄 인덱스 매칭"""
+        rng = random.Random(2)
+        for n in sizes:
+            lats, lons = random_points(n)
+            index = TrafficLightIndex([
+                {"itst_id": i, "name": str(i), "latitude": lat, "longitude": lon}
+                for i, (lat, lon) in enumerate(zip(lats, lons))
+            ])
+            points = [(rng.uniform(*SEOUL_LAT), rng.uniform(*SEOUL_LON)) for _ in range(2 * 50)]
+
+            def scan():
+                return [int(haversine_one_to_many(lat, lon, index.grid.lats, index.grid.lons).argmin()) for lat, lon in points]
+
+            def batched():
+                return index.match(points)
+
+            assert [light["itst_id"] for light in batched()] == scan()
+            self.report(f"[lights={n}] per-crossing full scan", timed(scan, repeat))
+            self.report(f"[lights={n}] batched index match", timed(batched, repeat))
+
+    def bench_segmenter(self, sizes, repeat):
+        """경로 좌표 n개 + 횡단보도 20개 구간 나누기: 교차로마다 재탐색/재합산 vs 누적 거리 1회 계산"""
+        rng = random.Random(3)
+        for n in sizes:
+            lat, lon = rng.uniform(*SEOUL_LAT), rng.uniform(*SEOUL_LON)
+            coords = []
+            for _ in range(n):
+                lat += rng.uniform(-1e-4, 1e-4)
+                lon += rng.uniform(-1e-4, 1e-4)
+                coords.append([lon, lat])
+            picks = sorted(rng.sample(range(1, n - 1), min(20, n - 2)))
+            crossings = [{"lat": coords[i][1], "lng": coords[i][0]} for i in picks]
+
+            def rescan():
+                segments, last = [], 0
+                for cross in crossings:
+                    for i in range(last, len(coords)):
+                        if haversine(cross["lat"], cross["lng"], coords[i][1], coords[i][0]) < 30:
+                            part = coords[last:i + 1]
+                            segments.append(sum(
+                                haversine(a[1], a[0], b[1], b[0]) for a, b in zip(part[:-1], part[1:])
+                            ))
+                            last = i + 1
+                            break
+                    else:
+                        break
+                return segments
+
+            def single_pass():
+                segmenter = RouteSegmenter(coords)
+                return [seg["distance_m"] for seg in segmenter.split(segmenter.snap_crossings(crossings))]
+
+            samples = timed(single_pass, repeat)
+            self.report(f"[coords={n}] per-crossing rescan", timed(rescan, repeat))
+            self.report(f"[coords={n}] single-pass segmenter", samples)
+            self.stdout.write(f"[coords={n}] single-pass throughput: {1000 * repeat / sum(samples):.1f} routes/sec")
+
+    def bench_crossing_delay(self, sizes, repeat):
+        """횡단보도 n개 대기시간: 교차로마다 주기 조회 + 계산 vs 주기 테이블 일괄 조회 + 벡터 계산"""
+        rng = random.Random(4)
+        for n in sizes:
+            table = SignalCycleTable(range(n), [rng.uniform(20, 60) for _ in range(n)], [rng.uniform(60, 150) for _ in range(n)])
+            cycles = {its_id: (green, red) for its_id, green, red in zip(table.ids.tolist(), table.green, table.red)}
+            its_ids = [rng.randrange(n) for _ in range(n)]
+            phases = [rng.choice([1, 2]) for _ in range(n)]
+            remaining = [rng.uniform(0, 120) for _ in range(n)]
+            walk_arrival = [60.0 * (k + 1) for k in range(n)]
+
+            def per_crossing():
+                waits, delayed = [], 0.0
+                for its_id, phase, left, arrival in zip(its_ids, phases, remaining, walk_arrival):
+                    green, red = cycles[its_id]
+                    waits.append(float(crossing_waits(arrival + delayed, phase, left, green, red)))
+                    delayed += waits[-1]
+                return waits
+
+            def batched():
+                green, red = table.lookup(its_ids)
+                return route_waits(walk_arrival, phases, remaining, green, red)
+
+            assert batched().tolist() == per_crossing()
+            self.report(f"[crossings={n}] per-crossing evaluation", timed(per_crossing, repeat))
+            self.report(f"[crossings={n}] batched evaluation", timed(batched, repeat))
+
+    def write_traffic_light_csv(self, path, n, seed=0, rename_every=0):
+        lats, lons = random_points(n, seed=seed)
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            f.write("itstId,itstNm,mapCtptIntLat,mapCtptIntLot\n")
+            for i, (lat, lon) in enumerate(zip(lats, lons)):
+                name = f"교차로{i}" + ("*" if rename_every and i % rename_every == 0 else "")
+                f.write(f"{i},{name},{lat!r},{lon!r}\n")
+
+    def bench_database(self, directory, alias="bench"):
+        """directory 안에 임시 SQLite DB 를 만들어 alias 로 등록하고 map 마이그레이션 적용"""
+        databases = dict(connections.settings)
+        databases[alias] = {"ENGINE": "django.db.backends.sqlite3", "NAME": str(Path(directory) / f"{alias}.sqlite3")}
+        connections.settings[alias] = connections.configure_settings(databases)[alias]
+        call_command("migrate", "map", database=alias, verbosity=0)
+        return connections[alias]
+
+    def bench_import(self, sizes, repeat):
+        """임시 SQLite DB 에 신호등 CSV n 행 가져오기: 행마다 update_or_create vs --bulk (처음/변경 없음/1% 변경)"""
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(MAP_DATA_VERSION_FILE=Path(directory) / ".version"):
+            self.bench_database(directory)
+
+            def run(csv_path, *args):
+                started = time.perf_counter()
+                with open(os.devnull, "w") as devnull:
+                    call_command("import_traffic_lights", csv_path, *args, database="bench", stdout=devnull)
+                return time.perf_counter() - started
+
+            def report_rate(label, n, elapsed):
+                self.stdout.write(f"{label:<40} {elapsed:9.2f}s  {n / elapsed:10.0f} rows/sec")
+
+            for n in sizes:
+                csv_path = str(Path(directory) / f"lights_{n}.csv")
+                changed_path = str(Path(directory) / f"lights_{n}_changed.csv")
+                self.write_traffic_light_csv(csv_path, n)
+                self.write_traffic_light_csv(changed_path, n, rename_every=100)
+
+                # 행마다 update_or_create 는 큰 n 에서 너무 오래 걸리므로 작은 경우만 측정
+                if n <= 10000:
+                    report_rate(f"[rows={n}] per-row update_or_create", n, run(csv_path))
+                connections["bench"].cursor().execute("DELETE FROM map_trafficlight")
+
+                for label, path in (("fresh", csv_path), ("unchanged", csv_path), ("1% changed", changed_path)):
+                    report_rate(f"[rows={n}] bulk ({label})", n, run(path, "--bulk", "--chunk-size", "5000"))
+                connections["bench"].cursor().execute("DELETE FROM map_trafficlight")
+            connections["bench"].close()
+
+    def bench_all_lights(self, sizes, repeat):
+        """/traffic-lights/all/ 본문 만들기: 요청마다 DRF 직렬화 vs 미리 만든 본문 (gzip, 304) 응답"""
+        factory = RequestFactory()
+        for n in sizes:
+            lats, lons = random_points(n)
+            lights = [
+                {"itst_id": i, "name": f"교차로{i}", "latitude": lat, "longitude": lon}
+                for i, (lat, lon) in enumerate(zip(lats, lons))
+            ]
+            objects = [TrafficLight(**light) for light in lights]
+            artifact = TrafficLightArtifact(lights)
+            plain = factory.get("/traffic-lights/all/")
+            gzipped = factory.get("/traffic-lights/all/", HTTP_ACCEPT_ENCODING="gzip")
+            revalidate = factory.get("/traffic-lights/all/", HTTP_ACCEPT_ENCODING="gzip",
+                                     HTTP_IF_NONE_MATCH=artifact.json.etags["gzip"])
+
+            def serialize():
+                return JSONRenderer().render(TrafficLightSerializer(objects, many=True).data)
+
+            assert serve_encoded(plain, artifact.json).content == serialize()
+            self.stdout.write(f"[lights={n}] build artifact once: {timed(lambda: TrafficLightArtifact(lights), 1)[0]:.1f}ms, "
+                              f"json={len(artifact.json.bodies['identity'])}B gzip={len(artifact.json.bodies['gzip'])}B "
+                              f"binary={len(artifact.binary.bodies['identity'])}B binary+gzip={len(artifact.binary.bodies['gzip'])}B")
+            for label, func in (
+                ("DRF serializer per request", serialize),
+                ("precomputed json", lambda: serve_encoded(plain, artifact.json)),
+                ("precomputed json+gzip", lambda: serve_encoded(gzipped, artifact.json)),
+                ("If-None-Match -> 304", lambda: serve_encoded(revalidate, artifact.json)),
+            ):
+                samples = timed(func, repeat)
+                self.report(f"[lights={n}] {label}", samples)
+                self.stdout.write(f"{'':<40} ~{1000 / percentile(samples, 50):.0f} req/sec")
+
+    def bench_tiles(self, sizes, repeat):
+        """서울 중심 타일/bbox 응답: 줌별 본문 크기와 생성 시간 (캐시 없음 vs 타일 캐시)"""
+        for n in sizes:
+            lats, lons = random_points(n)
+            lights = [
+                {"itst_id": i, "name": f"교차로{i}", "latitude": lat, "longitude": lon}
+                for i, (lat, lon) in enumerate(zip(lats, lons))
+            ]
+            started = time.perf_counter()
+            index = TileIndex(lights, cache_size=0)
+            self.stdout.write(f"[lights={n}] build tile index: {(time.perf_counter() - started) * 1000:.1f}ms")
+            cached = TileIndex(lights)
+            center = (sum(SEOUL_LAT) / 2, sum(SEOUL_LON) / 2)
+
+            for z in (8, 11, 14, 17):
+                x, y = (int(v) for v in lonlat_to_tile(*center, z))
+                size = len(index.tile(z, x, y).bodies["identity"])
+                self.report(f"[lights={n}] tile z={z} ({size}B)", timed(lambda: index.tile(z, x, y), repeat))
+                cached.tile(z, x, y)
+                self.report(f"[lights={n}] tile z={z} cached", timed(lambda: cached.tile(z, x, y), repeat))
+
+            for span in (0.01, 0.1, 1.0):
+                south, west = center[0] - span / 2, center[1] - span / 2
+                size = len(index.bbox(south, west, south + span, west + span).bodies["identity"])
+                self.report(f"[lights={n}] bbox {span}deg ({size}B)",
+                            timed(lambda: index.bbox(south, west, south + span, west + span), repeat))
+
+    def bench_nearby_db(self, sizes, repeat):
+        """임시 SQLite DB 에서 반경 500m 조회: 전체 스캔 vs bbox 조건 (복합 인덱스 없음/있음), 쿼리 플랜 출력"""
+        rng = random.Random(5)
+        with tempfile.TemporaryDirectory() as directory:
+            connection = self.bench_database(directory)
+            for n in sizes:
+                lats, lons = random_points(n)
+                TrafficLight.objects.using("bench").all().delete()
+                TrafficLight.objects.using("bench").bulk_create(
+                    (TrafficLight(itst_id=i, name=str(i), latitude=lat, longitude=lon)
+                     for i, (lat, lon) in enumerate(zip(lats, lons))),
+                    batch_size=5000,
+                )
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE")
+                queries = [(rng.uniform(*SEOUL_LAT), rng.uniform(*SEOUL_LON)) for _ in range(repeat)]
+                query = iter(queries * 3)
+
+                def full_scan():
+                    lat, lon = next(query)
+                    rows = list(TrafficLight.objects.using("bench").values_list("itst_id", "latitude", "longitude"))
+                    dists = haversine_one_to_many(lat, lon, [row[1] for row in rows], [row[2] for row in rows])
+                    return int((dists <= 500).sum())
+
+                def bbox_query():
+                    return len(nearby_from_db(*next(query), 500, using="bench"))
+
+                # nearby_from_db 와 같은 형태의 쿼리
+                sql, params = TrafficLight.objects.using("bench").filter(
+                    latitude__range=(37.5, 37.51), longitude__range=(127.0, 127.01)
+                ).order_by("itst_id").values_list("itst_id", "name", "latitude", "longitude").query.sql_with_params()
+
+                def plan():
+                    with connection.cursor() as cursor:
+                        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+                        return " / ".join(row[-1] for row in cursor.fetchall())
+
+                if n <= 100000:
+                    self.report(f"[rows={n}] full table scan + distance", timed(full_scan, repeat))
+                with connection.cursor() as cursor:
+                    cursor.execute("DROP INDEX map_trafficlight_lat_lon_idx")
+                self.stdout.write(f"[rows={n}] plan without index: {plan()}")
+                self.report(f"[rows={n}] bbox filter, no index", timed(bbox_query, repeat))
+                with connection.cursor() as cursor:
+                    cursor.execute("CREATE INDEX map_trafficlight_lat_lon_idx ON map_trafficlight (latitude, longitude)")
+                    cursor.execute("ANALYZE")
+                self.stdout.write(f"[rows={n}] plan with index: {plan()}")
+                self.report(f"[rows={n}] bbox filter, lat/lon index", timed(bbox_query, repeat))
+            connection.close()
+
+    def bench_async_load(self, sizes, repeat):
+        """
+        TMAP 응답이 200ms 걸릴 때 동시 요청 N 개 처리 시간, sizes = 동시 요청 수
+        - sync: 동기 TmapRouteView 를 스레드 4개(gunicorn sync 워커 4개 가정)로 처리
+        - async: AsyncTmapRouteView 를 이벤트 루프 하나에서 asyncio.gather 로 처리
+        - peak upstream = 스텁 서버가 동시에 받고 있던 요청 수 최댓값
+        """
+        workers = 4
+        factory = RequestFactory()
+        request = factory.get("/map/traffic-lights/tmap-route/", {
+            "startX": "127.0", "startY": "37.5", "endX": "127.1", "endY": "37.6",
+        })
+        sync_view = TmapRouteView.as_view()
+        async_view = AsyncTmapRouteView.as_view()
+
+        def run_sync(n):
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(lambda _: sync_view(request), range(n)))
+
+        async def run_async(n):
+            try:
+                return await asyncio.gather(*(async_view(request) for _ in range(n)))
+            finally:
+                await async_upstream.close_sessions()
+
+        for n in sizes:
+            in_flight = InFlight()
+            server, base_url = start_stub_server(tmap_stub_handler(0.2, in_flight))
+            with override_settings(
+                TMAP_PEDESTRIAN_URL=f"{base_url}/tmap/routes/pedestrian?version=1", ROUTE_CACHE_ENABLED=False
+            ):
+                for label, run in (
+                    (f"sync, {workers} workers", lambda: run_sync(n)),
+                    ("async, one event loop", lambda: asyncio.run(run_async(n))),
+                ):
+                    in_flight.peak = 0
+                    started = time.perf_counter()
+                    responses = run()
+                    elapsed = time.perf_counter() - started
+                    failed = sum(response.status_code != 200 for response in responses)
+                    self.stdout.write(
+                        f"[requests={n}] {label:<24} {elapsed:7.2f}s  {n / elapsed:8.1f} req/s  "
+                        f"peak upstream={in_flight.peak:4d}  failed={failed}"
+                    )
+            server.shutdown()
+
+    def bench_signal_batch(self, sizes, repeat):
+        """교차로 N 개 신호 상태: 단건 엔드포인트 N 번 vs 배치 엔드포인트 1 번, sizes = 교차로 수 (예: 1 10 100)"""
+        factory = RequestFactory()
+        feed = self.synthetic_feed()
+        get_signal_poller().snapshot = SignalSnapshot(feed)
+        single_view = SignalStatusView.as_view()
+        batch_view = SignalStatusBatchView.as_view()
+        with override_settings(V2X_POLL_ENABLED=False, V2X_POLL_INTERVAL=3600, V2X_BATCH_MAX_IDS=max(sizes)):
+            for n in sizes:
+                its_ids = [str(item["itstId"]) for item in feed[:n]]
+                singles = [factory.get("/map/traffic-lights/signal-status/", {"itsId": its_id}) for its_id in its_ids]
+                batch = factory.get("/map/traffic-lights/signal-status/batch/", {"itsIds": ",".join(its_ids)})
+                self.report(f"[ids={n}] single endpoint x{n}",
+                            timed(lambda: [single_view(request).render() for request in singles], repeat))
+                self.report(f"[ids={n}] batch endpoint", timed(lambda: batch_view(batch).render(), repeat))
+
+    def bench_signal_stream(self, sizes, repeat):
+        """
+        신호 스트리밍 soak: 구독자 N 명(교차로 5개씩 구독)이 시간에 따라 바뀌는 로컬 피드 스텁을 repeat 초 동안 구독
+        - sizes = 구독자 수 (예: 1000), 피드는 0.5초마다 폴링
+        - 외부 피드 호출 수, 전달 이벤트/바이트, 스냅샷 -> 구독자 전달 지연, 이벤트 루프 지연 출력
+        """
+        interval, intersections, per_client = 0.5, 500, 5
+        duration = min(repeat, 60)
+        factory = RequestFactory()
+        view = AsyncSignalStreamView.as_view()
+        poller = get_signal_poller()
+
+        async def soak(n):
+            rng = random.Random(n)
+            hub = get_signal_hub()
+            delivered = {"events": 0, "bytes": 0, "deltas": 0}
+            latencies, loop_lags = [], []
+
+            async def subscriber():
+                its_ids = ",".join(str(i) for i in rng.sample(range(intersections), per_client))
+                response = await view(factory.get("/map/traffic-lights/async/signal-stream/", {"itsIds": its_ids}))
+                async for chunk in response.streaming_content:
+                    delivered["bytes"] += len(chunk)
+                    delivered["events"] += chunk.count(b"event: ")
+                    if b"event: signal" in chunk:
+                        delivered["deltas"] += chunk.count(b"event: signal")
+                        latencies.append((time.perf_counter() - hub.last_published_at) * 1000)
+
+            async def ticker():
+                while True:
+                    started = time.perf_counter()
+                    await asyncio.sleep(0.05)
+                    loop_lags.append((time.perf_counter() - started - 0.05) * 1000)
+
+            tasks = [asyncio.ensure_future(subscriber()) for _ in range(n)] + [asyncio.ensure_future(ticker())]
+            await asyncio.sleep(duration)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            remaining = hub.stats()["subscriptions"]
+            published = hub.published
+            close_signal_hub()
+            return delivered, latencies, loop_lags, published, remaining
+
+        hits = [0]
+        server, base_url = start_stub_server(signal_feed_stub_handler(intersections, hits))
+        poller.stop()
+        poller.snapshot = None
+        poller.interval = interval
+        try:
+            with override_settings(V2X_SIGNAL_FEED_URL=f"{base_url}/feed", V2X_STREAM_HEARTBEAT=5.0):
+                for n in sizes:
+                    hits[0] = 0
+                    delivered, latencies, loop_lags, published, remaining = asyncio.run(soak(n))
+                    self.stdout.write(
+                        f"[subscribers={n}, {duration}s] upstream feed calls={hits[0]} "
+                        f"(per-client polling would be {n * int(duration / interval)}), snapshots published={published}"
+                    )
+                    self.stdout.write(
+                        f"  events={delivered['events']} deltas={delivered['deltas']} bytes={delivered['bytes']} "
+                        f"subscriptions left after disconnect={remaining}"
+                    )
+                    if latencies:
+                        self.report("  snapshot -> subscriber latency", latencies)
+                    self.report("  event loop lag", loop_lags)
+        finally:
+            poller.stop()
+            server.shutdown()
+
+    def synthetic_tmap_route(self, crossings, reverse=False):
+        """synthetic_route 를 TMAP 응답 형식(LineString + 횡단보도 Point)으로 바꾼 것"""
+        coords, crossing_points = self.synthetic_route(crossings)
+        if reverse:
+            coords, crossing_points = coords[::-1], crossing_points[::-1]
+        features = [{"type": "Feature", "geometry": {"type": "LineString", "coordinates": coords},
+                     "properties": {"description": "보행자도로", "time": len(coords)}}]
+        features += [
+            {"type": "Feature", "geometry": {"type": "Point", "coordinates": [point["lng"], point["lat"]]},
+             "properties": {"description": f"{i} 에서 횡단보도 후 직진"}}
+            for i, point in enumerate(crossing_points)
+        ]
+        return {"type": "FeatureCollection", "features": features}
+
+    def bench_route_ranking(self, sizes, repeat):
+        """TMAP 경로 2개(추천/대안)를 같은 신호 스냅샷으로 채점/정렬, sizes = 경로당 횡단보도 수, 초당 채점 경로 수 출력"""
+        get_signal_poller().snapshot = SignalSnapshot(self.synthetic_feed())
+        with override_settings(V2X_POLL_ENABLED=False, V2X_POLL_INTERVAL=3600):
+            for crossings in sizes:
+                results = {
+                    "0": {"data": self.synthetic_tmap_route(crossings)},
+                    "10": {"data": self.synthetic_tmap_route(crossings, reverse=True)},
+                }
+                samples = timed(lambda: rank_routes(results, 1.39), repeat)
+                self.report(f"[crossings={crossings}] rank 2 routes", samples)
+                self.stdout.write(f"{'':<40} {2 * 1000 / percentile(samples, 50):9.1f} routes/sec (p50)")
+
+    def synthetic_grid_graph(self, side, spacing_m=40, crosswalk_every=5):
+        """
+        side x side 격자 보행 그래프 빌더 + 신호등 목록 (crosswalk_every 번째 세로 간선마다 신호 있는 횡단보도)
+        - 신호등 itst_id 는 1 부터, 신호는 합성 피드로 절반은 초록/절반은 빨강
+        """
+        lat0, lon0 = 37.55, 126.95
+        dlat = spacing_m / 111320.0
+        dlon = dlat / 0.792
+        builder = PedestrianGraphBuilder()
+        lights = []
+        for row in range(side):
+            builder.add_line([[lon0 + col * dlon, lat0 + row * dlat] for col in range(side)])
+        for col in range(side):
+            for row in range(side - 1):
+                crosswalk = (row + col) % crosswalk_every == 0
+                line = [[lon0 + col * dlon, lat0 + row * dlat], [lon0 + col * dlon, lat0 + (row + 1) * dlat]]
+                builder.add_line(line, crosswalk)
+                if crosswalk:
+                    lights.append({"itst_id": len(lights) + 1, "latitude": lat0 + (row + 0.5) * dlat,
+                                   "longitude": lon0 + col * dlon})
+        now = int(time.time() * 1000)
+        feed = [
+            {"itstId": str(light["itst_id"]), "trsmUtcTime": now,
+             "ntPdsgStatNm": "protected-Movement-Allowed" if light["itst_id"] % 2 else "stop-And-Remain",
+             "ntPdsgRmdrCs": 50 + light["itst_id"] % 300}
+            for light in lights
+        ]
+        cycles = SignalCycleTable([light["itst_id"] for light in lights], [30.0] * len(lights), [60.0] * len(lights))
+        return builder, lights, SignalSnapshot(feed), cycles
+
+    def bench_local_route(self, sizes, repeat):
+        """
+        로컬 보행 그래프: 빌드 / 파일 저장 / mmap 로드 시간과 경로 탐색 지연시간, sizes = 격자 한 변의 노드 수
+        - 경로 탐색은 임의의 출발/도착 쌍, 최단 거리(신호 무시) vs 신호 대기 반영 최소 시간 (A*)
+        """
+        rng = random.Random(22)
+        with tempfile.TemporaryDirectory() as directory:
+            for side in sizes:
+                builder, lights, snapshot, cycles = self.synthetic_grid_graph(side)
+                started = time.perf_counter()
+                graph = builder.build(lights)
+                build_ms = (time.perf_counter() - started) * 1000
+
+                path = os.path.join(directory, f"graph_{side}.bin")
+                started = time.perf_counter()
+                graph.save(path)
+                save_ms = (time.perf_counter() - started) * 1000
+                load_samples = timed(lambda: PedestrianGraph.load(path), min(repeat, 50))
+                loaded = PedestrianGraph.load(path)
+                self.stdout.write(
+                    f"[side={side}] {len(graph)} nodes, {graph.edge_count} edges, "
+                    f"{os.path.getsize(path) / 1024:.1f} KiB: build {build_ms:.1f}ms, save {save_ms:.1f}ms"
+                )
+                self.report(f"[side={side}] mmap load", load_samples)
+
+                pairs = [(rng.randrange(len(loaded)), rng.randrange(len(loaded))) for _ in range(repeat)]
+                wait = signal_wait_function(snapshot, cycles)
+                queries = iter(pairs * 2)
+                self.report(f"[side={side}] shortest (no waits)",
+                            timed(lambda: loaded.shortest_path(*next(queries), 1.1), repeat))
+                self.report(f"[side={side}] fastest (signal waits)",
+                            timed(lambda: loaded.shortest_path(*next(queries), 1.1, wait), repeat))
+
+                # 응답 생성까지 포함한 전체 (추천 + 최단 옵션)
+                def local_routes():
+                    source, target = pairs[rng.randrange(len(pairs))]
+                    return local_pedestrian_routes(
+                        float(loaded.lons[source]), float(loaded.lats[source]),
+                        float(loaded.lons[target]), float(loaded.lats[target]),
+                        list(ROUTE_OPTIONS.values()), graph=loaded, snapshot=snapshot, cycle_table=cycles,
+                    )
+                self.report(f"[side={side}] local_pedestrian_routes", timed(local_routes, repeat))
+
+    def bench_departure_time(self, sizes, repeat):
+        """출발 시각 0 ~ 180초 (1초 간격) 비교, sizes = 경로의 횡단보도 수 (경로 준비 포함 / 출발 시각 계산만)"""
+        get_signal_poller().snapshot = SignalSnapshot(self.synthetic_feed())
+        offsets = np.arange(0, 181.0)
+        with override_settings(V2X_POLL_ENABLED=False, V2X_POLL_INTERVAL=3600):
+            for crossings in sizes:
+                tmap_data = self.synthetic_tmap_route(crossings)
+                _, distances, statuses = route_signal_inputs(tmap_data)
+                cycles = SignalCycleTable(
+                    [status.get("itstId", -1) for status in statuses], [30.0] * len(statuses), [90.0] * len(statuses)
+                )
+
+                def full():
+                    _, distances, statuses = route_signal_inputs(tmap_data)
+                    return departure_profile(distances, statuses, 1.39, offsets, cycle_table=cycles)
+
+                self.report(f"[crossings={crossings}] route + 181 departures", timed(full, repeat))
+                self.report(f"[crossings={crossings}] 181 departures only",
+                            timed(lambda: departure_profile(distances, statuses, 1.39, offsets, cycle_table=cycles), repeat))
+
+    def synthetic_phase_history(self, intersections, seconds, start_s, seed=24):
+        """
+        교차로 intersections 개, 방향 2개의 1Hz 신호 이력을 1분 단위 열 배열로 생성 (제너레이터)
+        - 반환: (분 단위 열 배열 제너레이터, 실제 green/red/offset 배열)
+        """
+        rng = np.random.default_rng(seed)
+        its_ids = np.arange(1, intersections + 1)
+        green = rng.integers(20, 60, intersections).astype(float)
+        red = rng.integers(40, 140, intersections).astype(float)
+        offset = rng.uniform(0, 1, intersections) * (green + red)
+
+        def batches():
+            for minute in range(0, seconds, 60):
+                t = np.arange(start_s + minute, start_s + min(minute + 60, seconds))
+                columns = []
+                for direction, shift in ((0, 0.0), (1, 7.0)):
+                    cycle = green + red
+                    position = np.mod(t[:, None] - (offset + shift), cycle)
+                    is_green = position < green
+                    remaining = np.where(is_green, green - position, cycle - position)
+                    columns.append((
+                        np.repeat(t * 1000, intersections),
+                        np.tile(its_ids, len(t)),
+                        np.full(len(t) * intersections, direction),
+                        np.where(is_green, STATUS_PROTECTED, STATUS_STOP).ravel(),
+                        np.round(remaining * 10).astype(np.int64).ravel(),
+                    ))
+                yield [np.concatenate(parts) for parts in zip(*columns)]
+
+        return batches(), (its_ids, green, red, offset)
+
+    def bench_phase_history(self, sizes, repeat):
+        """
+        신호 이력 저장소: 교차로 1000개 x 2방향 1Hz 이력 sizes 시간 분량 기록 / 조회 / 주기 추정
+        - 한 달(30일) 분량의 크기와 기록 시간은 측정한 행당 값으로 환산해서 출력
+        """
+        intersections = 1000
+        month_rows = intersections * 2 * 30 * 86400
+        start_s = 1760000000 - 1760000000 % 3600
+        for hours in sizes:
+            with tempfile.TemporaryDirectory() as directory:
+                store = PhaseHistoryStore(directory, flush_rows=1000000)
+                batches, (its_ids, green, red, offset) = self.synthetic_phase_history(intersections, hours * 3600, start_s)
+                rows = 0
+                started = time.perf_counter()
+                for columns in batches:
+                    store.append(columns)
+                    rows += len(columns[0])
+                store.flush()
+                elapsed = time.perf_counter() - started
+                size = store.stats()["written_bytes"]
+                self.stdout.write(
+                    f"[hours={hours}] {rows} rows in {elapsed:.2f}s ({rows / elapsed:,.0f} rows/s), "
+                    f"{size / rows:.2f} bytes/row, {len(store.chunks())} chunks"
+                )
+                self.stdout.write(
+                    f"{'':<40} 1 month x {intersections} intersections: {month_rows * size / rows / 2 ** 30:.2f} GiB, "
+                    f"ingest {month_rows * elapsed / rows / 60:.1f} min"
+                )
+
+                end_ms = (start_s + hours * 3600) * 1000
+                queries = min(repeat, 20)
+                self.report(f"[hours={hours}] read 1 intersection (all)",
+                            timed(lambda: store.read(start_s * 1000, end_ms, its_ids=[500]), queries))
+                self.report(f"[hours={hours}] read all, last 10 min",
+                            timed(lambda: store.read(end_ms - 600000, end_ms), queries))
+
+                started = time.perf_counter()
+                cycles, _ = infer_store_cycles(store, start_s * 1000, end_ms)
+                elapsed = time.perf_counter() - started
+                inferred = {cycle["itst_id"]: cycle for cycle in cycles}
+                exact = sum(
+                    1 for its_id, g, r in zip(its_ids, green, red)
+                    if its_id in inferred and abs(inferred[its_id]["green_sec"] - g) <= 1
+                    and abs(inferred[its_id]["red_sec"] - r) <= 1
+                )
+                self.stdout.write(
+                    f"[hours={hours}] infer_store_cycles {elapsed:.2f}s: {len(cycles)}/{intersections} inferred, "
+                    f"{exact} within 1s of the true green/red"
+                )
+
+        # 실제 기록 경로: 피드 스냅샷(교차로 1000개) 한 번을 행으로 바꿔 버퍼에 추가
+        with tempfile.TemporaryDirectory() as directory:
+            store = PhaseHistoryStore(directory)
+            now = int(time.time() * 1000)
+            snapshots = [
+                SignalSnapshot([
+                    {"itstId": str(i), "trsmUtcTime": now + k * 1000, "ntPdsgStatNm": "stop-And-Remain",
+                     "ntPdsgRmdrCs": 300, "etPdsgStatNm": "protected-Movement-Allowed", "etPdsgRmdrCs": 120}
+                    for i in range(intersections)
+                ])
+                for k in range(repeat)
+            ]
+            snapshots = iter(snapshots)
+            self.report(f"record_snapshot ({intersections} intersections)",
+                        timed(lambda: store.record_snapshot(next(snapshots)), repeat))
+
+    def bench_metrics(self, sizes, repeat):
+        """
+        지표 수집 오버헤드: observe 한 번 비용 (스레드 수 = sizes), MetricsMiddleware 유무에 따른 요청 지연시간, /metrics 생성 시간
+        """
+        histogram = metrics.Histogram("bench_observe_seconds", "benchmark only", ("view",))
+        child = histogram.labels("bench")
+        per_thread = 100000
+        for threads in sizes:
+            def work():
+                for i in range(per_thread):
+                    child.observe(i * 1e-6)
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                for future in [executor.submit(work) for _ in range(threads)]:
+                    future.result()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"[threads={threads}] observe: {elapsed / (threads * per_thread) * 1e9:.0f} ns/call "
+                f"(wall, {threads * per_thread / elapsed:,.0f} calls/s)"
+            )
+        _, count, _ = child.snapshot()
+        self.stdout.write(f"{'':<40} recorded {count} of {sum(sizes) * per_thread} observations")
+        metrics.REGISTRY.remove(histogram)
+
+        get_signal_poller().snapshot = SignalSnapshot(self.synthetic_feed())
+        url = "/map/traffic-lights/signal-status/batch/?itsIds=1229"
+        base = [name for name in settings.MIDDLEWARE if name != "map.metrics.MetricsMiddleware"]
+        with override_settings(V2X_POLL_ENABLED=False, V2X_POLL_INTERVAL=3600, ALLOWED_HOSTS=["*"]):
+            for label, middleware in (("without metrics", base), ("with metrics", ["map.metrics.MetricsMiddleware", *base])):
+                with override_settings(MIDDLEWARE=middleware):
+                    client = Client()
+                    client.get(url)
+                    self.report(f"signal-status/batch {label}", timed(lambda: client.get(url), repeat))
+
+        self.report("render /metrics", timed(metrics.render_metrics, min(repeat, 200)))
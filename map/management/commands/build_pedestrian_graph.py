@@ -0,0 +1,56 @@
+import json
+import os
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from map.graph import PedestrianGraphBuilder, get_graph_path, invalidate_pedestrian_graph
+from map.spatial import get_traffic_light_index
+
+class Command(BaseCommand):
+    help = 'Build the local pedestrian graph file from recorded TMAP geometry, GeoJSON routes and/or an OSM extract'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--geometry-log', type=str,
+                            help='Route geometry log written by record_route_geometry (default: PEDESTRIAN_GRAPH_GEOMETRY_LOG)')
+        parser.add_argument('--geojson', type=str, nargs='*', default=[], help='Saved TMAP route responses (GeoJSON)')
+        parser.add_argument('--osm', type=str, help='OSM XML extract (.osm)')
+        parser.add_argument('--output', type=str, help='Output file (default: PEDESTRIAN_GRAPH_PATH)')
+        parser.add_argument('--no-lights', action='store_true', help='Do not link crosswalks to traffic lights')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        builder = PedestrianGraphBuilder()
+
+        geometry_log = options['geometry_log'] or getattr(settings, 'PEDESTRIAN_GRAPH_GEOMETRY_LOG', '')
+        if geometry_log and os.path.exists(geometry_log):
+            self.stdout.write(f"geometry log: {builder.add_geometry_log(geometry_log)} routes")
+        elif options['geometry_log']:
+            raise CommandError(f"Geometry log not found: {geometry_log}")
+
+        for path in options['geojson']:
+            with open(path, encoding='utf-8') as f:
+                builder.add_tmap_route(json.load(f))
+        if options['geojson']:
+            self.stdout.write(f"geojson: {len(options['geojson'])} files")
+
+        if options['osm']:
+            self.stdout.write(f"osm: {builder.add_osm(options['osm'])} ways")
+
+        if not builder.edges:
+            raise CommandError("No pedestrian edges found in the given sources.")
+
+        lights = None if options['no_lights'] else get_traffic_light_index().lights
+        graph = builder.build(lights)
+
+        output = options['output'] or get_graph_path()
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        graph.save(output)
+        # 이 프로세스의 캐시도 비움 (다른 워커는 파일 mtime 이 바뀐 것을 보고 다시 매핑)
+        invalidate_pedestrian_graph()
+
+        crosswalks = int((graph.kinds == 1).sum()) // 2
+        linked = int((graph.lights >= 0).sum()) // 2
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(graph)} nodes, {graph.edge_count} edges ({crosswalks} crosswalks, {linked} linked to traffic lights), "
+            f"{os.path.getsize(output) / 1024:.1f} KiB written to {output} in {time.perf_counter() - started:.2f}s"
+        ))
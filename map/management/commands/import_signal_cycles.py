@@ -0,0 +1,45 @@
+import csv
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from map.models import SignalCycle
+from map.dataversion import bump_data_version
+from map.cycles import invalidate_signal_cycle_table
+
+class Command(BaseCommand):
+    help = 'Import pedestrian signal cycles (itstId, greenSec, redSec) from a CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_file', type=str, help='Path to the signal cycle CSV file')
+
+    def handle(self, *args, **options):
+        file_path = options['csv_file']
+        cycles = {}
+
+        with open(file_path, newline='', encoding='utf-8-sig') as csvfile:
+            reader = csv.DictReader(csvfile)
+            for row in reader:
+                try:
+                    itst_id = int(row['itstId'])
+                    green_sec = float(row['greenSec'])
+                    red_sec = float(row['redSec'])
+                    if green_sec <= 0 or red_sec <= 0:
+                        raise ValueError("cycle durations must be positive")
+                    cycles[itst_id] = SignalCycle(itst_id=itst_id, green_sec=green_sec, red_sec=red_sec, source='measured')
+                except Exception as e:
+                    self.stderr.write(f"Error importing row {row}: {e}")
+
+        # 한 트랜잭션에서 일괄 upsert (같은 itstId 가 여러 번 나오면 마지막 행 사용)
+        with transaction.atomic():
+            SignalCycle.objects.bulk_create(
+                cycles.values(),
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['itst_id'],
+                update_fields=['green_sec', 'red_sec', 'offset_sec', 'source'],
+            )
+
+        # 워커들의 주기 테이블만 새 데이터로 다시 로드되도록 신호 주기 버전 갱신 (신호등 캐시는 그대로)
+        bump_data_version("cycles")
+        invalidate_signal_cycle_table()
+
+        self.stdout.write(self.style.SUCCESS(f"{len(cycles)} signal cycles imported successfully."))
@@ -1,37 +1,138 @@
 import csv
+import time
+from itertools import islice
 from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
 from map.models import TrafficLight
+from map.dataversion import bump_data_version
+from map.spatial import invalidate_traffic_light_index
+from map.registry import invalidate_intersection_registry
+from map.artifact import invalidate_traffic_light_artifact
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
 
 class Command(BaseCommand):
     help = 'Import traffic lights from location.csv file'
 
     def add_arguments(self, parser):
         parser.add_argument('csv_file', type=str, help='Path to the location.csv file')
+        parser.add_argument('--bulk', action='store_true',
+                            help='Upsert rows in chunks with bulk_create inside a single transaction')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows per chunk in bulk mode')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report rows that would be created/updated (implies --bulk)')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database alias to import into')
 
     def handle(self, *args, **options):
-        file_path = options['csv_file']
-        created_count = 0
+        started = time.perf_counter()
+        if options['bulk'] or options['dry_run']:
+            rows, changed, summary = self.import_bulk(options)
+        else:
+            rows, changed, summary = self.import_rows(options)
+
+        if changed and not options['dry_run']:
+            # 워커들의 메모리 캐시(공간 인덱스 등)가 새 데이터로 다시 만들어지도록 버전 갱신
+            bump_data_version()
+            invalidate_traffic_light_index()
+            invalidate_intersection_registry()
+            invalidate_traffic_light_artifact()
 
+        elapsed = time.perf_counter() - started
+        rate = rows / elapsed if elapsed > 0 else 0.0
+        self.stdout.write(self.style.SUCCESS(f"{summary} ({rows} rows in {elapsed:.2f}s, {rate:.0f} rows/sec)"))
+
+    def read_rows(self, file_path):
+        """CSV 를 한 줄씩 읽어 (itst_id, name, lat, lon) 반환, 잘못된 행은 건너뜀"""
         with open(file_path, newline='', encoding='utf-8-sig') as csvfile:
             reader = csv.DictReader(csvfile)
             for row in reader:
                 try:
-                    itst_id = int(row['itstId'])
-                    name = row['itstNm']
-                    lat = float(row['mapCtptIntLat'])
-                    lon = float(row['mapCtptIntLot'])
-
-                    obj, created = TrafficLight.objects.update_or_create(
-                        itst_id=itst_id,
-                        defaults={
-                            'name': name,
-                            'latitude': lat,
-                            'longitude': lon,
-                        }
-                    )
-                    if created:
-                        created_count += 1
+                    yield int(row['itstId']), row['itstNm'], float(row['mapCtptIntLat']), float(row['mapCtptIntLot'])
                 except Exception as e:
                     self.stderr.write(f"Error importing row {row}: {e}")
 
-        self.stdout.write(self.style.SUCCESS(f"{created_count} traffic lights imported successfully."))
+    def import_rows(self, options):
+        file_path = options['csv_file']
+        database = options['database']
+        rows = 0
+        created_count = 0
+
+        for itst_id, name, lat, lon in self.read_rows(file_path):
+            rows += 1
+            try:
+                obj, created = TrafficLight.objects.using(database).update_or_create(
+                    itst_id=itst_id,
+                    defaults={
+                        'name': name,
+                        'latitude': lat,
+                        'longitude': lon,
+                    }
+                )
+                if created:
+                    created_count += 1
+            except Exception as e:
+                self.stderr.write(f"Error importing row {itst_id}: {e}")
+
+        return rows, rows > 0, f"{created_count} traffic lights imported successfully."
+
+    def import_bulk(self, options):
+        """
+        chunk 단위로 기존 행과 (name, lat, lon) 값을 비교해 바뀐 행만 bulk upsert
+        - 전체를 한 트랜잭션으로 처리 (중간에 실패하면 아무것도 반영되지 않음)
+        - dry-run 이면 생성/변경될 행만 출력하고 DB 는 건드리지 않음
+        """
+        database = options['database']
+        dry_run = options['dry_run']
+        manager = TrafficLight.objects.using(database)
+        rows = created_count = updated_count = unchanged_count = 0
+
+        with transaction.atomic(using=database):
+            for chunk in chunked(self.read_rows(options['csv_file']), options['chunk_size']):
+                rows += len(chunk)
+                # 같은 chunk 안에서 같은 itstId 가 여러 번 나오면 마지막 행 사용
+                incoming = {itst_id: (name, lat, lon) for itst_id, name, lat, lon in chunk}
+                existing = {
+                    itst_id: (name, lat, lon)
+                    for itst_id, name, lat, lon in manager.filter(itst_id__in=incoming).values_list(
+                        'itst_id', 'name', 'latitude', 'longitude'
+                    )
+                }
+
+                changed = []
+                for itst_id, values in incoming.items():
+                    old = existing.get(itst_id)
+                    if old == values:
+                        unchanged_count += 1
+                        continue
+                    if old is None:
+                        created_count += 1
+                    else:
+                        updated_count += 1
+                    if dry_run:
+                        self.stdout.write(self.format_diff(itst_id, old, values))
+                    else:
+                        name, lat, lon = values
+                        changed.append(TrafficLight(itst_id=itst_id, name=name, latitude=lat, longitude=lon))
+
+                if changed:
+                    manager.bulk_create(
+                        changed,
+                        batch_size=options['chunk_size'],
+                        update_conflicts=True,
+                        unique_fields=['itst_id'],
+                        update_fields=['name', 'latitude', 'longitude'],
+                    )
+
+        prefix = "[dry-run] would import" if dry_run else "Imported"
+        summary = f"{prefix} {created_count} new, {updated_count} updated, {unchanged_count} unchanged traffic lights."
+        return rows, created_count + updated_count > 0, summary
+
+    def format_diff(self, itst_id, old, new):
+        if old is None:
+            return f"+ {itst_id}: {new[0]} ({new[1]}, {new[2]})"
+        return f"~ {itst_id}: {old[0]} ({old[1]}, {old[2]}) -> {new[0]} ({new[1]}, {new[2]})"
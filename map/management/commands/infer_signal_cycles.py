@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from map.models import SignalCycle
+from map.dataversion import bump_data_version
+from map.cycles import invalidate_signal_cycle_table
+from map.history import PhaseHistoryStore, history_window, infer_store_cycles
+
+class Command(BaseCommand):
+    help = 'Infer pedestrian signal cycles (green/red durations and offsets) from the signal phase history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', type=str, help='History directory (default: V2X_HISTORY_DIR)')
+        parser.add_argument('--days', type=float, default=7, help='Use the most recent N days of history')
+        parser.add_argument('--min-phases', type=int, default=3,
+                            help='Minimum number of complete green and red phases per intersection')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Number of intersections to load into memory at once')
+        parser.add_argument('--overwrite-measured', action='store_true',
+                            help='Also replace cycles that were measured/imported by hand')
+        parser.add_argument('--dry-run', action='store_true', help='Print the inferred cycles without saving')
+
+    def handle(self, *args, **options):
+        root = options['dir'] or getattr(settings, 'V2X_HISTORY_DIR', '')
+        if not root:
+            raise CommandError("Set V2X_HISTORY_DIR or pass --dir.")
+
+        start_ms, end_ms = history_window(options['days'])
+        cycles, rows = infer_store_cycles(
+            PhaseHistoryStore(root), start_ms, end_ms, min_phases=options['min_phases'], batch_size=options['batch_size']
+        )
+        self.stdout.write(f"{rows} history rows, {len(cycles)} intersections inferred")
+
+        if options['dry_run']:
+            for cycle in cycles:
+                self.stdout.write(
+                    f"{cycle['itst_id']}: green {cycle['green_sec']}s / red {cycle['red_sec']}s, "
+                    f"offset {cycle['offset_sec']}s ({cycle['phases']} phases, {cycle['direction']})"
+                )
+            return
+
+        # 직접 측정한 주기는 기본적으로 그대로 둠
+        if not options['overwrite_measured']:
+            measured = set(SignalCycle.objects.filter(source='measured').values_list('itst_id', flat=True))
+            cycles = [cycle for cycle in cycles if cycle['itst_id'] not in measured]
+
+        with transaction.atomic():
+            SignalCycle.objects.bulk_create(
+                [
+                    SignalCycle(
+                        itst_id=cycle['itst_id'], green_sec=cycle['green_sec'], red_sec=cycle['red_sec'],
+                        offset_sec=cycle['offset_sec'], source='inferred',
+                    )
+                    for cycle in cycles
+                ],
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['itst_id'],
+                update_fields=['green_sec', 'red_sec', 'offset_sec', 'source'],
+            )
+
+        # 워커들의 주기 테이블만 새 데이터로 다시 로드되도록 신호 주기 버전 갱신 (신호등 캐시는 그대로)
+        bump_data_version("cycles")
+        invalidate_signal_cycle_table()
+
+        self.stdout.write(self.style.SUCCESS(f"{len(cycles)} signal cycles updated."))
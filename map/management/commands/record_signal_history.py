@@ -0,0 +1,42 @@
+import signal
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from map.history import PhaseHistoryStore
+from map.v2x import SignalFeedPoller
+
+class Command(BaseCommand):
+    help = 'Poll the V2X signal feed and append every snapshot to the signal phase history store'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', type=str, help='History directory (default: V2X_HISTORY_DIR)')
+        parser.add_argument('--interval', type=float, default=1.0, help='Polling interval in seconds')
+        parser.add_argument('--duration', type=float, help='Stop after this many seconds (default: run until stopped)')
+
+    def handle(self, *args, **options):
+        root = options['dir'] or getattr(settings, 'V2X_HISTORY_DIR', '')
+        if not root:
+            raise CommandError("Set V2X_HISTORY_DIR or pass --dir.")
+
+        store = PhaseHistoryStore(root)
+        poller = SignalFeedPoller(options['interval'])
+        poller.add_listener(store.record_snapshot)
+
+        stopping = []
+        signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+        started = time.monotonic()
+        poller.start()
+        try:
+            while not stopping and (options['duration'] is None or time.monotonic() - started < options['duration']):
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            poller.stop()
+            # 버퍼에 남은 행까지 파일로 씀
+            store.flush()
+
+        stats = store.stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['written_rows']} rows ({stats['written_bytes'] / 1024:.1f} KiB) written to {root}"
+        ))
@@ -0,0 +1,351 @@
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+
+# 초 단위 지연시간 버킷 (Prometheus 기본값과 같음)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 요청당 DB 쿼리 수 버킷
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class _Shards:
+    """
+    스레드마다 따로 쌓는 값 배열 (기록할 때 잠금 없음)
+    - 스레드가 처음 기록할 때만 잠금을 잡고 자기 배열을 등록, 내보낼 때 모든 스레드 배열을 합산
+    - 합산 중에 다른 스레드가 기록 중이면 그 값은 다음 수집에 반영됨 (Prometheus 수집에는 충분)
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def get(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = [0] * self.size
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def total(self):
+        with self._lock:
+            shards = list(self._shards)
+        totals = [0] * self.size
+        for shard in shards:
+            for i, value in enumerate(shard):
+                totals[i] += value
+        return totals
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # 버킷별 개수 + (+Inf) + 합계
+        self._shards = _Shards(len(buckets) + 2)
+
+    def observe(self, value):
+        shard = self._shards.get()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self):
+        """(버킷 상한별 누적 개수, 개수, 합계)"""
+        totals = self._shards.total()
+        cumulative, running = [], 0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, totals[-1]
+
+
+class _CounterChild:
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount=1):
+        self._shards.get()[0] += amount
+
+    def value(self):
+        return self._shards.total()[0]
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.get(values)
+                if child is None:
+                    child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _label_text(self, values, extra=None):
+        pairs = list(zip(self.labelnames, values))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in pairs) + "}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class Histogram(_Metric):
+    """레이블별 히스토그램 (observe 는 잠금 없이 스레드별 배열에 기록)"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _render_child(self, values, child):
+        cumulative, count, total = child.snapshot()
+        bounds = [format_value(bound) for bound in self.buckets] + ["+Inf"]
+        lines = [
+            f"{self.name}_bucket{self._label_text(values, ('le', bound))} {value}"
+            for bound, value in zip(bounds, cumulative)
+        ]
+        lines.append(f"{self.name}_sum{self._label_text(values)} {format_value(total)}")
+        lines.append(f"{self.name}_count{self._label_text(values)} {count}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{self._label_text(values)} {format_value(child.value())}"]
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+REGISTRY = []
+# 수집할 때 호출해서 값을 읽는 게이지/카운터 (캐시 통계 등): 함수 -> [(이름, 종류, 설명, [(레이블 dict, 값), ...]), ...]
+COLLECTORS = []
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "View latency in seconds", ("view", "method", "status")
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "Database queries per request", ("view",), buckets=QUERY_COUNT_BUCKETS
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_duration_seconds", "Database time per request in seconds", ("view",)
+)
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds", "Upstream (TMAP/V2X) call latency in seconds", ("upstream",)
+)
+UPSTREAM_ERRORS = Counter("upstream_errors_total", "Failed upstream (TMAP/V2X) calls", ("upstream",))
+
+
+def observe_upstream(name, elapsed, error=False):
+    """외부 API 호출 한 번 기록 (upstream.stats.record 에서 호출)"""
+    UPSTREAM_LATENCY.labels(name).observe(elapsed)
+    if error:
+        UPSTREAM_ERRORS.labels(name).inc()
+
+
+def register_collector(collector):
+    COLLECTORS.append(collector)
+    return collector
+
+
+def render_metrics():
+    """Prometheus text exposition 형식의 전체 지표"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    for collector in COLLECTORS:
+        try:
+            families = collector()
+        except Exception as e:
+            print(f"[WARN] 지표 수집 실패 ({collector.__name__}): {e}")
+            continue
+        for name, kind, documentation, samples in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(f'{key}="{escape_label(v)}"' for key, v in labels.items())
+                lines.append(f"{name}{{{label_text}}} {format_value(value)}" if label_text else f"{name} {format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+@register_collector
+def cache_metrics():
+    """경로 캐시 / 타일 캐시 조회 결과별 횟수와 항목 수"""
+    from .routecache import get_route_cache
+    from .tiles import tile_cache_stats
+
+    route = get_route_cache().stats()
+    tile = tile_cache_stats() or {"hits": 0, "misses": 0, "entries": 0}
+
+    def known(samples):
+        # 경로 캐시가 Django 캐시 백엔드면 항목 수 / 교체 횟수를 알 수 없으므로 0 대신 생략
+        return [(labels, value) for labels, value in samples if value is not None]
+
+    return [
+        ("cache_lookups_total", "counter", "Cache lookups by result", [
+            ({"cache": "route", "result": "hit"}, route["hits"]),
+            ({"cache": "route", "result": "miss"}, route["misses"]),
+            ({"cache": "route", "result": "collapsed"}, route["collapsed"]),
+            ({"cache": "tile", "result": "hit"}, tile["hits"]),
+            ({"cache": "tile", "result": "miss"}, tile["misses"]),
+        ]),
+        ("cache_entries", "gauge", "Entries currently cached", known([
+            ({"cache": "route"}, route["entries"]),
+            ({"cache": "tile"}, tile["entries"]),
+        ])),
+        ("cache_evictions_total", "counter", "Cache evictions", known([({"cache": "route"}, route["evictions"])])),
+    ]
+
+
+@register_collector
+def signal_feed_metrics():
+    """공유 V2X 스냅샷 나이 (폴러가 아직 스냅샷을 받지 못했으면 생략)"""
+    from .v2x import get_signal_poller
+
+    snapshot = get_signal_poller().snapshot
+    if snapshot is None:
+        return []
+    families = [("v2x_snapshot_age_seconds", "gauge", "Seconds since the shared V2X snapshot was fetched",
+                 [({}, round(snapshot.age(), 3))])]
+    feed_age = snapshot.feed_age()
+    if feed_age is not None:
+        families.append(("v2x_feed_age_seconds", "gauge", "Seconds since the newest V2X transmission time",
+                         [({}, round(feed_age, 3))]))
+    return families
+
+
+# 현재 요청의 DB 쿼리 [횟수, 누적 시간] (sync_to_async 로 넘어간 스레드에도 전달됨)
+_request_queries = contextvars.ContextVar("request_queries", default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    """모든 DB 연결에 붙이는 execute_wrapper: 요청 처리 중이면 쿼리 수/시간 누적"""
+    counter = _request_queries.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        counter[0] += 1
+        counter[1] += time.perf_counter() - started
+
+
+def install_query_counter(sender, connection, **kwargs):
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+def install_query_counters():
+    """이 스레드에서 이미 만들어진 DB 연결에도 execute_wrapper 를 붙임 (새 연결은 connection_created 에서 붙임)"""
+    for connection in connections.all(initialized_only=True):
+        install_query_counter(None, connection)
+
+
+connection_created.connect(install_query_counter)
+
+
+def view_label(request):
+    """지표 레이블용 view 이름 (URL 패턴 이름, 없으면 경로 패턴), URL 이 매칭되지 않았으면 unmatched"""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.view_name or match.route
+
+
+class MetricsMiddleware:
+    """
+    요청마다 view 지연시간, DB 쿼리 수/시간을 히스토그램에 기록 (sync/async 둘 다 지원)
+    - 스트리밍 응답(SSE)은 응답 객체를 돌려줄 때까지의 시간만 잼
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        install_query_counters()
+        counter = [0, 0.0]
+        token = _request_queries.set(counter)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        self.record(request, response, time.perf_counter() - started, counter)
+        return response
+
+    async def __acall__(self, request):
+        # sync_to_async 로 실행되는 view 는 같은 스레드(thread_sensitive)의 연결을 쓰므로 거기에도 붙임
+        await sync_to_async(install_query_counters)()
+        counter = [0, 0.0]
+        token = _request_queries.set(counter)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        self.record(request, response, time.perf_counter() - started, counter)
+        return response
+
+    def record(self, request, response, elapsed, counter):
+        view = view_label(request)
+        REQUEST_LATENCY.labels(view, request.method, str(response.status_code)).observe(elapsed)
+        REQUEST_DB_QUERIES.labels(view).observe(counter[0])
+        REQUEST_DB_SECONDS.labels(view).observe(counter[1])
+
+
+def metrics_view(request):
+    """/metrics: 이 프로세스의 지표 (워커가 여러 개면 워커별로 수집), METRICS_ENABLED 일 때만 노출"""
+    if not getattr(settings, "METRICS_ENABLED", False):
+        return HttpResponse(status=404)
+    return HttpResponse(render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.7 on 2026-10-17 10:00
+
+from django.db import migrations, models
+
+
+# 직접 측정한 주기 (기존 calculate_crossing_delay 에 하드코딩되어 있던 값)
+MEASURED_CYCLES = [
+    (1229, 41, 110),  # 서울중랑우체국
+]
+
+
+def seed_measured_cycles(apps, schema_editor):
+    SignalCycle = apps.get_model('map', 'SignalCycle')
+    for itst_id, green_sec, red_sec in MEASURED_CYCLES:
+        SignalCycle.objects.update_or_create(
+            itst_id=itst_id,
+            defaults={'green_sec': green_sec, 'red_sec': red_sec},
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('map', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SignalCycle',
+            fields=[
+                ('itst_id', models.IntegerField(primary_key=True, serialize=False)),
+                ('green_sec', models.FloatField()),
+                ('red_sec', models.FloatField()),
+            ],
+        ),
+        migrations.RunPython(seed_measured_cycles, migrations.RunPython.noop),
+    ]
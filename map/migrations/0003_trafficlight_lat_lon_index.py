@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-17 13:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('map', '0002_signalcycle'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trafficlight',
+            index=models.Index(fields=['latitude', 'longitude'], name='map_trafficlight_lat_lon_idx'),
+        ),
+    ]
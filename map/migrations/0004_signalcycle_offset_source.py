@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-17 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('map', '0003_trafficlight_lat_lon_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='signalcycle',
+            name='offset_sec',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='signalcycle',
+            name='source',
+            field=models.CharField(default='measured', max_length=16),
+        ),
+    ]
@@ -6,5 +6,24 @@ class TrafficLight(models.Model):
     latitude = models.FloatField()
     longitude = models.FloatField()
 
+    class Meta:
+        indexes = [
+            # 위경도 범위(bbox) 조회용 복합 인덱스
+            models.Index(fields=['latitude', 'longitude'], name='map_trafficlight_lat_lon_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.itst_id} - {self.name}"
+
+class SignalCycle(models.Model):
+    """교차로별 보행 신호 주기 (초)"""
+    itst_id = models.IntegerField(primary_key=True)
+    green_sec = models.FloatField()
+    red_sec = models.FloatField()
+    # 초록불이 시작되는 시각 = Unix 시각 mod (green_sec + red_sec) 가 이 값일 때 (이력에서 추정한 경우만)
+    offset_sec = models.FloatField(null=True, blank=True)
+    # measured: 직접 측정/CSV 로 넣은 값, inferred: infer_signal_cycles 가 이력에서 추정한 값
+    source = models.CharField(max_length=16, default='measured')
+
     def __str__(self):
-        return f"{self.itst_id} - {self.name}"
\ No newline at end of file
+        return f"{self.itst_id} - green {self.green_sec}s / red {self.red_sec}s"
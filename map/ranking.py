@@ -0,0 +1,223 @@
+import numpy as np
+import requests
+
+from .cycles import departure_waits, get_signal_cycle_table, route_waits, scheduled_phases, signal_phase
+from .registry import get_intersection_registry
+from .segmenter import RouteSegmenter
+from .tmap import SEARCH_OPTION_NAMES, extract_route
+from .v2x import get_signal_snapshot, get_signal_statuses
+
+# 횡단보도 지점과 교차로(location.csv)를 같은 곳으로 보는 거리 (m, 미만)
+CROSSING_MATCH_RADIUS_M = 30
+
+
+def crossing_signal_statuses(crossings, snapshot=None):
+    """
+    경로상 횡단보도 지점별 신호 상태 (교차로 매칭 + 스냅샷 하나로 일괄 조회)
+    - 매칭된 지점: 신호 상태 + itstId, 매칭/조회 실패: {"error": ...}
+    - 교차로 레지스트리를 못 읽으면 빈 리스트
+    """
+    try:
+        registry = get_intersection_registry()
+    except Exception as e:
+        print(f"[ERROR] 교차로 CSV 로드 실패: {e}")
+        return []
+
+    # 지점별 최근접 교차로를 한 번에 찾음
+    matches = []
+    for found in registry.nearest_many(
+        [(cross["lat"], cross["lng"]) for cross in crossings], max_distance=CROSSING_MATCH_RADIUS_M
+    ):
+        closest, min_distance = found if found else (None, float("inf"))
+        matches.append(closest if closest and min_distance < CROSSING_MATCH_RADIUS_M else None)
+
+    matched_ids = [closest["itstId"] for closest in matches if closest]
+    try:
+        statuses = iter(get_signal_statuses(matched_ids, snapshot=snapshot) if matched_ids else [])
+    except requests.RequestException:
+        statuses = iter([None] * len(matched_ids))
+
+    signal_status_list = []
+    for cross, closest in zip(crossings, matches):
+        if closest:
+            signal_status = next(statuses)
+            if signal_status:
+                signal_status_list.append(dict(signal_status, itstId=closest["itstId"]))
+            else:
+                signal_status_list.append({
+                    "error": f"Failed to fetch signal status for {closest['name']} (itstId: {closest['itstId']})"
+                })
+        else:
+            signal_status_list.append({
+                "error": f"No matching intersection found for crossing at ({cross['lat']}, {cross['lng']})"
+            })
+
+    return signal_status_list
+
+
+def expected_time(distances, signal_status_list, user_speed_mps, cycle_table=None):
+    """
+    구간 거리와 각 구간 끝 횡단보도의 신호 상태로 신호 대기를 반영한 소요시간 계산
+    - distances: 구간 거리 (m), i 번째 구간이 끝나는 지점이 i 번째 횡단보도
+    - 각 횡단보도 도착 시각 = 앞 구간 보행 시간 + 앞 횡단보도 대기시간 누적, 도착 시점의 신호를 예측해 대기시간 계산
+    - 실시간 신호 상태가 없는 교차로는 추정한 주기 위상(offset)이 있으면 그것으로 예측
+    """
+    distances = np.asarray(distances, dtype=float)
+    walk_arrival = np.cumsum(distances / user_speed_mps)
+
+    statuses = signal_status_list[:len(distances)]
+    matched = [status for status in statuses if "error" not in status]
+    phases = [signal_phase(status) for status in matched]
+    cycle_table = cycle_table or get_signal_cycle_table()
+    green, red, offset = cycle_table.lookup_schedule([status.get("itstId") for status in matched])
+    phase, remaining = scheduled_phases(
+        [phase for phase, _ in phases], [remaining for _, remaining in phases], green, red, offset
+    )
+
+    # 교차로 전체 대기시간을 한 번에 계산 (앞 교차로 대기시간만큼 다음 도착 시각이 늦어짐)
+    matched_at = [i for i, status in enumerate(statuses) if "error" not in status]
+    waits = route_waits(walk_arrival[matched_at], phase, remaining, green, red)
+
+    delays = []
+    matched_waits = iter(waits)
+    for signal_status in statuses:
+        if "error" not in signal_status:
+            delays.append({
+                "intersection": signal_status.get("intersectionName", "Unknown"),
+                "delay_sec": round(float(next(matched_waits)), 2)
+            })
+        else:
+            delays.append({
+                "intersection": "Unknown",
+                "delay_sec": 0,
+                "error": signal_status["error"]
+            })
+
+    total_distance = float(distances.sum())
+    walk_time = float(walk_arrival[-1]) if len(walk_arrival) else 0.0
+    wait_time = float(waits.sum())
+    return {
+        "total_distance_m": round(total_distance, 2),
+        "walk_time_sec": round(walk_time, 2),
+        "signal_wait_sec": round(wait_time, 2),
+        "adjusted_total_time_sec": round(walk_time + wait_time, 2),
+        "delays": delays
+    }
+
+
+def segment_distances(all_coords, crossings):
+    """출발 ~ 각 횡단보도 ~ 도착 구간 거리 (횡단보도는 경로 좌표에 순서대로 맞춤)"""
+    segmenter = RouteSegmenter(all_coords)
+    if not len(segmenter):
+        return np.zeros(0)
+    bounds = [0, *segmenter.snap_crossings(crossings), len(segmenter) - 1]
+    return np.diff(segmenter.cumulative[bounds])
+
+
+def route_signal_inputs(tmap_data, snapshot=None):
+    """TMAP 경로 하나의 (extract_route 결과, 구간 거리, 구간 끝 횡단보도별 신호 상태)"""
+    route = extract_route(tmap_data)
+    distances = segment_distances(route["all_coords"], route["crossings"])
+    # i 번째 구간 끝이 i 번째 횡단보도 (구간 수를 넘는 횡단보도는 계산에 쓰이지 않아 조회하지 않음)
+    statuses = crossing_signal_statuses(route["crossings"][:len(distances)], snapshot=snapshot)
+    return route, distances, statuses
+
+
+def score_route(tmap_data, user_speed_mps, snapshot=None, cycle_table=None):
+    """TMAP 경로 하나의 신호 반영 예상 소요시간 (구간 분할 -> 교차로 매칭/신호 조회 -> 대기시간을 경로당 한 번에 계산)"""
+    route, distances, statuses = route_signal_inputs(tmap_data, snapshot=snapshot)
+    result = expected_time(distances, statuses, user_speed_mps, cycle_table=cycle_table)
+    return {
+        "original_tmap_time_sec": route["total_time_sec"],
+        "walk_time_sec": result["walk_time_sec"],
+        "signal_wait_sec": result["signal_wait_sec"],
+        "adjusted_time_sec": result["adjusted_total_time_sec"],
+        "total_distance_m": result["total_distance_m"],
+        "crossings": len(statuses),
+        "delays": result["delays"],
+    }
+
+
+def rank_routes(results, user_speed_mps, snapshot=None):
+    """
+    fetch_pedestrian_routes 결과 {searchOption: {"data"} 또는 {"error"}} 를 신호 반영 예상 소요시간 순으로 정렬
+    - 모든 경로가 같은 신호 스냅샷 / 주기 테이블로 계산됨
+    - 반환: (순위 매긴 경로 목록, 실패한 경로 목록)
+    """
+    if snapshot is None:
+        try:
+            snapshot = get_signal_snapshot()
+        except requests.RequestException as e:
+            print(f"[WARN] V2X 신호 스냅샷 조회 실패: {e}")
+    cycle_table = get_signal_cycle_table()
+
+    routes, errors = [], []
+    for option, result in results.items():
+        route_type = SEARCH_OPTION_NAMES.get(option, f"option_{option}")
+        if "error" in result:
+            errors.append({"route_type": route_type, "search_option": option, **result})
+            continue
+        if "features" not in result["data"]:
+            errors.append({"route_type": route_type, "search_option": option, "error": "Tmap features not found"})
+            continue
+        routes.append({
+            "route_type": route_type,
+            "search_option": option,
+            **score_route(result["data"], user_speed_mps, snapshot=snapshot, cycle_table=cycle_table),
+        })
+
+    routes.sort(key=lambda route: (route["adjusted_time_sec"], route["total_distance_m"]))
+    for rank, route in enumerate(routes, start=1):
+        route["rank"] = rank
+    return routes, errors
+
+
+def departure_profile(distances, signal_status_list, user_speed_mps, offsets_sec, cycle_table=None):
+    """
+    출발 시각 후보별 신호 대기시간 / 도착 시각을 한 번에 계산해 가장 좋은 출발 시각 선택
+    - offsets_sec: 지금부터 출발을 미루는 시간 (초) 목록
+    - best: 도착이 가장 이른 출발 (같으면 덜 기다리는 = 늦게 출발), least_wait: 대기시간이 가장 적은 출발 (같으면 일찍 출발)
+    - 신호는 주기가 반복된다고 보고 예측 (cycles.cycle_waits), 실시간 상태가 없으면 추정한 주기 위상(offset) 사용
+    """
+    distances = np.asarray(distances, dtype=float)
+    offsets_sec = np.asarray(offsets_sec, dtype=float)
+    walk_arrival = np.cumsum(distances / user_speed_mps)
+    walk_time = float(walk_arrival[-1]) if len(walk_arrival) else 0.0
+
+    statuses = signal_status_list[:len(distances)]
+    matched_at = [i for i, status in enumerate(statuses) if "error" not in status]
+    phases = [signal_phase(statuses[i]) for i in matched_at]
+    cycle_table = cycle_table or get_signal_cycle_table()
+    green, red, offset = cycle_table.lookup_schedule([statuses[i].get("itstId") for i in matched_at])
+    phase, remaining = scheduled_phases(
+        [phase for phase, _ in phases], [remaining for _, remaining in phases], green, red, offset
+    )
+
+    waits = departure_waits(walk_arrival[matched_at], offsets_sec, phase, remaining, green, red)
+    total_wait = waits.sum(axis=1)
+    arrival = offsets_sec + walk_time + total_wait
+
+    def option(k):
+        return {
+            "departure_offset_sec": round(float(offsets_sec[k]), 2),
+            "signal_wait_sec": round(float(total_wait[k]), 2),
+            "travel_time_sec": round(walk_time + float(total_wait[k]), 2),
+            "arrival_offset_sec": round(float(arrival[k]), 2),
+            "delays": [
+                {"intersection": statuses[i].get("intersectionName", "Unknown"), "delay_sec": round(float(wait), 2)}
+                for i, wait in zip(matched_at, waits[k])
+            ],
+        }
+
+    # np.lexsort 는 마지막 키가 1순위 정렬 기준
+    best = int(np.lexsort((-offsets_sec, arrival))[0])
+    least_wait = int(np.lexsort((offsets_sec, total_wait))[0])
+    return {
+        "total_distance_m": round(float(distances.sum()), 2),
+        "walk_time_sec": round(walk_time, 2),
+        "signalized_crossings": len(matched_at),
+        "leave_now": option(0) if len(offsets_sec) and offsets_sec[0] == 0 else None,
+        "best": option(best),
+        "least_wait": option(least_wait),
+        "wait_by_offset": [round(float(wait), 2) for wait in total_wait],
+    }
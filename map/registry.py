@@ -0,0 +1,119 @@
+import csv
+import os
+import threading
+from pathlib import Path
+from types import MappingProxyType
+
+from django.conf import settings
+
+from .dataversion import get_data_version
+from .spatial import GridIndex
+
+
+def get_location_csv_path():
+    return Path(getattr(
+        settings, "MAP_LOCATION_CSV",
+        Path(__file__).resolve().parent / "data" / "location.csv",
+    ))
+
+
+class IntersectionRegistry:
+    """
+    location.csv 의 교차로 정보를 메모리에 올려둔 읽기 전용 레지스트리
+    - id -> 이름 dict (O(1) 조회), 위경도 배열 + 격자 인덱스 (최근접 교차로 조회)
+    """
+
+    def __init__(self, ids, names, lats, lons, mtime=None, version=0):
+        self.ids = tuple(ids)
+        by_id = {}
+        for itst_id, name in zip(self.ids, names):
+            by_id.setdefault(itst_id, name)
+        self.names = MappingProxyType(by_id)
+        self.grid = GridIndex(lats, lons)
+        self.grid.lats.flags.writeable = False
+        self.grid.lons.flags.writeable = False
+        self.mtime = mtime
+        self.version = version
+
+    @classmethod
+    def from_csv(cls, path, version=0):
+        ids, names, lats, lons = [], [], [], []
+        mtime = os.stat(path).st_mtime_ns
+        with open(path, encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                try:
+                    lat = float(row.get("mapCtptIntLat"))
+                    lon = float(row.get("mapCtptIntLot"))
+                except (TypeError, ValueError):
+                    continue
+                ids.append(row.get("itstId", "").strip())
+                names.append(row.get("itstNm", "").strip())
+                lats.append(lat)
+                lons.append(lon)
+        return cls(ids, names, lats, lons, mtime=mtime, version=version)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def name(self, itst_id):
+        return self.names.get(str(itst_id).strip())
+
+    def _record(self, i):
+        return {
+            "itstId": self.ids[i],
+            "name": self.names[self.ids[i]],
+            "lat": float(self.grid.lats[i]),
+            "lng": float(self.grid.lons[i]),
+        }
+
+    def nearest(self, lat, lng, max_distance=float("inf")):
+        """가장 가까운 교차로 (record, 거리), max_distance 안에 없으면 None"""
+        found = self.grid.nearest(lat, lng, max_distance)
+        if found is None:
+            return None
+        dist, i = found
+        return self._record(i), dist
+
+    def nearest_many(self, points, max_distance=float("inf")):
+        """(lat, lng) 지점들 각각의 (가장 가까운 교차로 record, 거리), max_distance 안에 없으면 None"""
+        if not points:
+            return []
+        lats, lngs = zip(*points)
+        dists, indices = self.grid.nearest_many(lats, lngs, max_distance)
+        return [(self._record(i), float(dist)) if i >= 0 else None for dist, i in zip(dists, indices)]
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def _is_stale(registry, path, version):
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return False  # 파일이 사라졌으면 기존 데이터 유지
+    return registry.mtime != mtime or registry.version != version
+
+
+def get_intersection_registry():
+    """
+    워커당 한 번 로드되는 교차로 레지스트리
+    - CSV 파일 mtime 또는 데이터 버전(import_traffic_lights)이 바뀌면 다시 로드
+    """
+    global _registry
+    path = get_location_csv_path()
+    version = get_data_version()
+    registry = _registry
+    if registry is not None and not _is_stale(registry, path, version):
+        return registry
+
+    with _registry_lock:
+        if _registry is None or _is_stale(_registry, path, version):
+            _registry = IntersectionRegistry.from_csv(path, version=version)
+        return _registry
+
+
+def invalidate_intersection_registry():
+    global _registry
+    with _registry_lock:
+        _registry = None
@@ -0,0 +1,214 @@
+import asyncio
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from math import cos, radians, floor
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .spatial import METERS_PER_DEGREE
+
+
+def quantize(lat, lon, grid_m):
+    """위경도를 grid_m 크기 격자의 셀 번호로 변환 (같은 셀이면 같은 키)"""
+    lat_step = grid_m / METERS_PER_DEGREE
+    row = floor(lat / lat_step)
+    # 경도 간격은 셀 중심 위도 기준으로 계산해 같은 셀 안에서는 항상 같은 값이 나오도록 함
+    lon_step = grid_m / (METERS_PER_DEGREE * max(cos(radians((row + 0.5) * lat_step)), 1e-6))
+    return row, floor(lon / lon_step)
+
+
+def route_cache_key(startX, startY, endX, endY, option, grid_m):
+    start = quantize(float(startY), float(startX), grid_m)
+    end = quantize(float(endY), float(endX), grid_m)
+    return f"map:route:{grid_m:g}:{option}:{start[0]}:{start[1]}:{end[0]}:{end[1]}"
+
+
+class LocMemRouteCacheBackend:
+    """프로세스 메모리 LRU + TTL"""
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    @property
+    def entries(self):
+        return len(self._data)
+
+
+class DjangoRouteCacheBackend:
+    """
+    Django 캐시 프레임워크 (CACHES 설정의 alias) 사용, 만료/교체는 캐시 백엔드에 맡김
+    - 항목 수 / 교체 횟수는 캐시 백엔드에서 알 수 없으므로 None (/stats 에는 null, /metrics 에서는 생략)
+    """
+
+    entries = None
+    evictions = None
+
+    def __init__(self, ttl, alias="default"):
+        self.ttl = ttl
+        self.cache = caches[alias]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value):
+        self.cache.set(key, value, self.ttl)
+
+    def clear(self):
+        self.cache.clear()
+
+
+def is_cacheable(value):
+    """features 가 있는 정상 경로 응답만 캐시 (200 으로 온 TMAP 오류 본문 등은 다음 요청에서 다시 시도)"""
+    return isinstance(value, dict) and "features" in value
+
+
+class RouteCache:
+    """
+    TMAP 경로 응답 캐시
+    - 같은 키에 대한 동시 miss 는 업스트림 요청 1건으로 합침 (single-flight)
+    - hits / misses / collapsed 는 _lock 안에서만 갱신 (/stats, /metrics 가 다른 스레드에서 읽음)
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.collapsed = 0
+        # 이벤트 루프별 진행 중인 비동기 요청 {key: Task}
+        self._async_inflight = weakref.WeakKeyDictionary()
+
+    def get_or_fetch(self, key, fetch):
+        value = self.backend.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = {"done": threading.Event(), "value": None, "error": None}
+                self.misses += 1
+            else:
+                self.collapsed += 1
+
+        if not leader:
+            flight["done"].wait()
+            if flight["error"] is not None:
+                raise flight["error"]
+            return flight["value"]
+
+        try:
+            value = fetch()
+            flight["value"] = value
+            if is_cacheable(value):
+                self.backend.set(key, value)
+            return value
+        except Exception as e:
+            flight["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight["done"].set()
+
+    async def aget_or_fetch(self, key, fetch):
+        """
+        get_or_fetch 의 비동기 버전 (fetch 는 코루틴 함수)
+        - 같은 루프 안의 동시 miss 는 Task 하나를 같이 기다림
+        - 기다리던 요청 하나가 취소돼도 공유 Task 는 계속 진행 (asyncio.shield)
+        """
+        value = self.backend.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        flights = self._async_inflight.setdefault(asyncio.get_running_loop(), {})
+        task = flights.get(key)
+        with self._lock:
+            if task is None:
+                self.misses += 1
+            else:
+                self.collapsed += 1
+        if task is None:
+            task = flights[key] = asyncio.ensure_future(self._afetch(key, fetch, flights))
+        return await asyncio.shield(task)
+
+    async def _afetch(self, key, fetch, flights):
+        try:
+            value = await fetch()
+            if is_cacheable(value):
+                self.backend.set(key, value)
+            return value
+        finally:
+            flights.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            hits, misses, collapsed = self.hits, self.misses, self.collapsed
+        lookups = hits + misses + collapsed
+        return {
+            "hits": hits,
+            "misses": misses,
+            "collapsed": collapsed,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": self.backend.entries,
+            "evictions": self.backend.evictions,
+        }
+
+
+def build_route_cache():
+    ttl = getattr(settings, "ROUTE_CACHE_TTL", 600)
+    if getattr(settings, "ROUTE_CACHE_BACKEND", "locmem") == "django":
+        backend = DjangoRouteCacheBackend(ttl, alias=getattr(settings, "ROUTE_CACHE_ALIAS", "default"))
+    else:
+        backend = LocMemRouteCacheBackend(ttl, getattr(settings, "ROUTE_CACHE_MAX_ENTRIES", 1000))
+    return RouteCache(backend)
+
+
+_route_cache = None
+_route_cache_lock = threading.Lock()
+
+
+def get_route_cache():
+    global _route_cache
+    if _route_cache is None:
+        with _route_cache_lock:
+            if _route_cache is None:
+                _route_cache = build_route_cache()
+    return _route_cache
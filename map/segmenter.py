@@ -0,0 +1,76 @@
+import numpy as np
+
+from .geo import haversine_consecutive, haversine_many_to_many, lonlat_arrays
+
+CROSSING_SNAP_RADIUS_M = 30
+
+
+class RouteSegmenter:
+    """
+    경로(좌표 목록)를 구간으로 나누는 엔진
+    - 누적 거리 배열을 한 번만 계산해두고, 구간 거리는 인덱스 두 개의 차이로 구함
+    - coords: GeoJSON 좌표 목록 [[lon, lat], ...], speed: 보행 속도 (m/s, 없으면 구간 시간 None)
+    """
+
+    def __init__(self, coords, speed=None):
+        self.coords = coords
+        self.speed = speed
+        self.lats, self.lons = lonlat_arrays(coords)
+        self.cumulative = np.zeros(len(coords))
+        if len(coords) > 1:
+            np.cumsum(haversine_consecutive(self.lats, self.lons), out=self.cumulative[1:])
+
+    def __len__(self):
+        return len(self.coords)
+
+    @property
+    def total_distance(self):
+        return float(self.cumulative[-1]) if len(self.coords) else 0.0
+
+    def snap_crossings(self, crossings, radius=CROSSING_SNAP_RADIUS_M):
+        """
+        교차로들을 순서대로 경로 좌표(vertex)에 맞춤
+        - 각 교차로는 직전 교차로 이후 좌표 중 radius 안에 처음 들어오는 좌표에 대응
+        - 대응되는 좌표가 없는 교차로가 나오면 거기서 중단 (이후 교차로도 매칭하지 않음)
+        - 반환: 좌표 인덱스 목록 (매칭된 교차로 수만큼)
+        """
+        if not crossings or not len(self.coords):
+            return []
+
+        # 교차로 x 좌표 거리 행렬을 한 번에 계산
+        within = haversine_many_to_many(
+            [cross["lat"] for cross in crossings],
+            [cross["lng"] for cross in crossings],
+            self.lats, self.lons,
+        ) < radius
+
+        indices = []
+        search_from = 0
+        for row in within:
+            hits = np.flatnonzero(row[search_from:])
+            if not len(hits):
+                break
+            cut = search_from + int(hits[0])
+            indices.append(cut)
+            search_from = cut + 1
+        return indices
+
+    def segment(self, start_index, end_index):
+        distance = float(self.cumulative[end_index] - self.cumulative[start_index])
+        start = self.coords[start_index]
+        end = self.coords[end_index]
+        return {
+            "start_index": start_index,
+            "end_index": end_index,
+            "start": {"lat": start[1], "lng": start[0]},
+            "end": {"lat": end[1], "lng": end[0]},
+            "distance_m": distance,
+            "time_sec": distance / self.speed if self.speed else None,
+        }
+
+    def split(self, cut_indices):
+        """좌표 인덱스에서 경로를 잘라 [출발 ~ 첫 지점], ..., [마지막 지점 ~ 도착] 구간 목록 반환"""
+        if not len(self.coords):
+            return []
+        bounds = [0, *cut_indices, len(self.coords) - 1]
+        return [self.segment(start, end) for start, end in zip(bounds[:-1], bounds[1:])]
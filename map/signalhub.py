@@ -0,0 +1,214 @@
+import asyncio
+import json
+import threading
+import time
+import weakref
+
+from django.conf import settings
+
+from .registry import get_intersection_registry
+from .v2x import build_signal_status, get_signal_poller
+
+
+def sse_event(name, payload):
+    """Server-Sent Events 이벤트 한 개 (bytes)"""
+    data = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), allow_nan=False)
+    return f"event: {name}\ndata: {data}\n\n".encode("utf-8")
+
+
+def signal_state(status, trsm_utc_time):
+    """방향별 (색, 남은 시간, 기준 전송 시각) - 변경 여부 판단용"""
+    return {
+        signal["direction"]: (signal["signalColor"], signal["remainingSeconds"], trsm_utc_time)
+        for signal in status["signals"]
+    }
+
+
+def signal_changes(previous, status, trsm_utc_time, drift_sec):
+    """
+    직전에 보낸 상태(signal_state) 대비 바뀐 방향의 신호만 반환 (바뀐 것이 없으면 빈 리스트)
+    - 색이 바뀌었거나, 남은 시간이 직전 값에서 경과 시간만큼 줄어든 예상값과 drift_sec 초 넘게 다르면 변경
+      (클라이언트가 남은 시간을 스스로 줄여가며 표시하므로 매 폴링의 카운트다운은 보내지 않음)
+    """
+    if previous is None:
+        return status["signals"]
+    changes = []
+    for signal in status["signals"]:
+        color, remaining, sent_at = previous.get(signal["direction"], (None, None, trsm_utc_time))
+        seconds = signal["remainingSeconds"]
+        if signal["signalColor"] != color or (seconds is None) != (remaining is None):
+            changes.append(signal)
+        elif seconds is not None and abs(seconds - (remaining - (trsm_utc_time - sent_at) / 1000)) > drift_sec:
+            changes.append(signal)
+    return changes
+
+
+class Subscription:
+    """
+    스트림 하나의 구독 (구독한 itstId 집합 + 아직 보내지 않은 이벤트)
+    - 교차로마다 대기 이벤트는 최대 하나: 클라이언트가 느려서 앞 변경분을 아직 못 보냈으면
+      전체 상태 이벤트로 합쳐서 메모리가 구독 교차로 수 이상 늘지 않음
+    """
+
+    def __init__(self, its_ids):
+        self.its_ids = tuple(its_ids)
+        self.pending = {}
+        self.coalesced = 0
+        self._event = asyncio.Event()
+
+    def push(self, its_id, event):
+        if its_id in self.pending:
+            self.coalesced += 1
+        self.pending[its_id] = event
+        self._event.set()
+
+    async def next(self, timeout):
+        """대기 중인 이벤트들 (timeout 초 동안 없으면 빈 리스트)"""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except TimeoutError:
+            return []
+        self._event.clear()
+        events, self.pending = list(self.pending.values()), {}
+        return events
+
+
+class SignalHub:
+    """
+    이벤트 루프 하나에 붙는 신호 스트림 허브
+    - 공유 폴러(SignalFeedPoller)의 새 스냅샷을 받아, 구독 중인 교차로만 직전 전송 상태와 비교
+    - 바뀐 교차로의 변경분 이벤트는 한 번만 인코딩해서 해당 교차로 구독자 모두에게 전달
+    - 외부 피드 호출은 구독자 수와 무관하게 폴러 주기마다 한 번
+    """
+
+    def __init__(self, loop, poller=None):
+        # 루프를 약하게 참조 (폴러가 허브를 들고 있어도 닫힌 루프는 정리되도록)
+        self._loop = weakref.ref(loop)
+        self.poller = poller or get_signal_poller()
+        self.subscribers = {}
+        self.sent = {}
+        self.seen = {}
+        self.published = 0
+        self.last_published_at = None
+        self._listener = self._on_snapshot
+        self.poller.add_listener(self._listener)
+
+    def _on_snapshot(self, snapshot):
+        # 폴러 스레드에서 호출됨 -> 이벤트 루프로 넘겨서 처리
+        loop = self._loop()
+        try:
+            if loop is None:
+                raise RuntimeError("event loop is gone")
+            loop.call_soon_threadsafe(self.publish, snapshot)
+        except RuntimeError:
+            # 루프가 이미 닫힘
+            self.poller.remove_listener(self._listener)
+
+    def close(self):
+        self.poller.remove_listener(self._listener)
+
+    async def ready(self, timeout=10):
+        """폴러를 시작하고 첫 스냅샷을 기다림 (스트리밍은 항상 공유 폴러를 사용)"""
+        if not self.poller.running:
+            self.poller.start()
+        if self.poller.snapshot is None:
+            await asyncio.to_thread(self.poller.wait_ready, timeout)
+        return self.poller.snapshot
+
+    def subscribe(self, its_ids):
+        """구독 등록 후 (구독, 현재 전체 상태 이벤트)"""
+        subscription = Subscription(its_ids)
+        for its_id in subscription.its_ids:
+            self.subscribers.setdefault(its_id, set()).add(subscription)
+        return subscription, self.snapshot_event(subscription.its_ids)
+
+    def unsubscribe(self, subscription):
+        for its_id in subscription.its_ids:
+            subscribers = self.subscribers.get(its_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscribers[its_id]
+                    self.sent.pop(its_id, None)
+                    self.seen.pop(its_id, None)
+
+    def snapshot_event(self, its_ids):
+        """구독 시작 시 보내는 전체 상태 (피드에 없는 교차로는 null)"""
+        snapshot = self.poller.snapshot
+        try:
+            registry = get_intersection_registry()
+        except Exception:
+            registry = None
+        signals = {}
+        for its_id in its_ids:
+            item = snapshot.get(its_id) if snapshot else None
+            if not item:
+                signals[its_id] = None
+                continue
+            status = build_signal_status(item, registry.name(its_id) if registry else None)
+            if its_id not in self.sent:
+                self.sent[its_id] = signal_state(status, item["trsmUtcTime"])
+                self.seen[its_id] = item["trsmUtcTime"]
+            signals[its_id] = status
+        return sse_event("snapshot", signals)
+
+    def publish(self, snapshot):
+        """새 스냅샷에서 구독 중인 교차로의 변경분만 구독자에게 전달"""
+        drift_sec = getattr(settings, "V2X_STREAM_DRIFT_SEC", 1.0)
+        for its_id, subscribers in self.subscribers.items():
+            item = snapshot.get(its_id)
+            if not item or self.seen.get(its_id) == item["trsmUtcTime"]:
+                continue
+            trsm_utc_time = self.seen[its_id] = item["trsmUtcTime"]
+            status = build_signal_status(item, None)
+            previous = self.sent.get(its_id)
+            changes = signal_changes(previous, status, trsm_utc_time, drift_sec)
+            if not changes:
+                continue
+
+            # 보낸 방향만 기준 상태 갱신 (보내지 않은 방향은 계속 직전 기준에서 예상)
+            state = dict(previous or {})
+            state.update(signal_state({"signals": changes}, trsm_utc_time))
+            self.sent[its_id] = state
+
+            event = sse_event("signal", {"itsId": its_id, "timestamp": status["timestamp"], "signals": changes})
+            full = event if len(changes) == len(status["signals"]) else None
+            for subscription in subscribers:
+                if its_id in subscription.pending:
+                    # 앞 변경분을 아직 못 보낸 구독자에게는 전체 상태로 대체
+                    if full is None:
+                        full = sse_event("signal", {"itsId": its_id, **status})
+                    subscription.push(its_id, full)
+                else:
+                    subscription.push(its_id, event)
+        self.published += 1
+        self.last_published_at = time.perf_counter()
+
+    def stats(self):
+        return {
+            "intersections": len(self.subscribers),
+            "subscriptions": len({s for subscribers in self.subscribers.values() for s in subscribers}),
+            "published": self.published,
+        }
+
+
+_hubs = weakref.WeakKeyDictionary()
+_hubs_lock = threading.Lock()
+
+
+def get_signal_hub():
+    """현재 이벤트 루프의 신호 스트림 허브"""
+    loop = asyncio.get_running_loop()
+    with _hubs_lock:
+        hub = _hubs.get(loop)
+        if hub is None:
+            hub = _hubs[loop] = SignalHub(loop)
+    return hub
+
+
+def close_signal_hub():
+    """현재 이벤트 루프의 허브를 폴러에서 떼어냄 (벤치마크 등에서 루프를 끝내기 전에 호출)"""
+    with _hubs_lock:
+        hub = _hubs.pop(asyncio.get_running_loop(), None)
+    if hub is not None:
+        hub.close()
@@ -0,0 +1,190 @@
+import threading
+from math import floor
+
+import numpy as np
+from django.conf import settings
+
+from .dataversion import get_data_version
+from .geo import as_array, bounding_box, haversine_one_to_many
+
+METERS_PER_DEGREE = 111320.0
+
+
+class GridIndex:
+    """
+    위경도 격자(grid) 기반 공간 인덱스
+    - 좌표를 cell_deg 크기의 격자 셀로 나눠두고, 반경 검색 시 후보 셀만 확인한 뒤 정확한 거리로 필터링
+    """
+
+    def __init__(self, lats, lons, cell_deg=0.01):
+        self.lats = as_array(lats)
+        self.lons = as_array(lons)
+        self.cell_deg = cell_deg
+
+        # 셀 번호로 정렬한 뒤 같은 셀끼리 묶어 셀 -> 인덱스 배열 dict 생성
+        rows = np.floor(self.lats / cell_deg).astype(np.int64)
+        cols = np.floor(self.lons / cell_deg).astype(np.int64)
+        order = np.lexsort((cols, rows))
+        self.cells = {}
+        if len(order):
+            keys = np.stack((rows[order], cols[order]), axis=1)
+            boundaries = np.flatnonzero(np.any(keys[1:] != keys[:-1], axis=1)) + 1
+            for chunk in np.split(order, boundaries):
+                self.cells[(int(rows[chunk[0]]), int(cols[chunk[0]]))] = chunk
+
+    def __len__(self):
+        return len(self.lats)
+
+    def _cell(self, lat, lon):
+        return floor(lat / self.cell_deg), floor(lon / self.cell_deg)
+
+    def _candidates(self, lat, lon, radius):
+        min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius)
+        min_row, min_col = self._cell(min_lat, min_lon)
+        max_row, max_col = self._cell(max_lat, max_lon)
+
+        # 후보 셀이 전체 셀 수보다 많으면 셀 순회보다 전체 스캔이 빠름
+        if (max_row - min_row + 1) * (max_col - min_col + 1) >= len(self.cells):
+            return np.arange(len(self.lats))
+
+        chunks = [
+            self.cells[(row, col)]
+            for row in range(min_row, max_row + 1)
+            for col in range(min_col, max_col + 1)
+            if (row, col) in self.cells
+        ]
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+    def within(self, lat, lon, radius, limit=None):
+        """반경(m) 내 좌표의 (거리, 인덱스) 목록을 가까운 순으로 반환"""
+        candidates = self._candidates(lat, lon, radius)
+        dists = haversine_one_to_many(lat, lon, self.lats[candidates], self.lons[candidates])
+        mask = dists <= radius
+        candidates, dists = candidates[mask], dists[mask]
+        order = np.lexsort((candidates, dists))
+        if limit is not None:
+            order = order[:limit]
+        return [(float(dists[k]), int(candidates[k])) for k in order]
+
+    def nearest(self, lat, lon, max_distance=float("inf")):
+        """
+        가장 가까운 좌표의 (거리, 인덱스), max_distance 안에 없으면 None
+        - 셀 크기에서 시작해 검색 반경을 두 배씩 넓혀가며 찾음
+        """
+        if not len(self.lats):
+            return None
+        radius = min(self.cell_deg * METERS_PER_DEGREE, max_distance)
+        while True:
+            found = self.within(lat, lon, radius, limit=1)
+            if found:
+                return found[0]
+            if radius >= max_distance:
+                return None
+            radius = min(radius * 2, max_distance)
+
+    def nearest_many(self, lats, lons, max_distance=float("inf")):
+        """
+        여러 지점 각각의 최근접 좌표
+        - 반환: (거리 배열, 인덱스 배열), max_distance 안에 없으면 거리 inf / 인덱스 -1
+        """
+        dists = np.full(len(lats), np.inf)
+        indices = np.full(len(lats), -1, dtype=np.int64)
+        for k, (lat, lon) in enumerate(zip(lats, lons)):
+            found = self.nearest(lat, lon, max_distance)
+            if found is not None:
+                dists[k], indices[k] = found
+        return dists, indices
+
+
+class TrafficLightIndex:
+    """TrafficLight 전체를 메모리에 올려둔 공간 인덱스"""
+
+    def __init__(self, lights, version=0):
+        self.lights = lights
+        self.version = version
+        self.grid = GridIndex(
+            [light["latitude"] for light in lights],
+            [light["longitude"] for light in lights],
+            cell_deg=getattr(settings, "MAP_SPATIAL_CELL_DEG", 0.01),
+        )
+
+    @classmethod
+    def from_db(cls, version=0):
+        from .models import TrafficLight
+
+        lights = [
+            {"itst_id": itst_id, "name": name, "latitude": lat, "longitude": lon}
+            for itst_id, name, lat, lon in TrafficLight.objects.values_list(
+                "itst_id", "name", "latitude", "longitude"
+            ).iterator()
+        ]
+        return cls(lights, version=version)
+
+    def within(self, lat, lon, radius, limit=None):
+        return [
+            dict(self.lights[i], distance_m=dist)
+            for dist, i in self.grid.within(lat, lon, radius, limit=limit)
+        ]
+
+    def match(self, points, max_distance=float("inf")):
+        """(lat, lon) 지점들을 각각 가장 가까운 신호등과 매칭, 반경 밖이면 None"""
+        if not points:
+            return []
+        lats, lons = zip(*points)
+        dists, indices = self.grid.nearest_many(lats, lons, max_distance)
+        return [
+            dict(self.lights[i], distance_m=float(dist)) if i >= 0 else None
+            for dist, i in zip(dists, indices)
+        ]
+
+
+def nearby_from_db(lat, lon, radius, limit=None, using=None):
+    """
+    DB 에서 반경(m) 내 신호등을 가까운 순으로 조회 (공간 인덱스를 메모리에 올리지 않는 경우)
+    - 반경을 덮는 위경도 범위(bbox)로 먼저 거르고 (latitude, longitude 복합 인덱스 사용)
+      남은 후보만 정확한 거리로 다시 거름
+    """
+    from .models import TrafficLight
+
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius)
+    rows = list(
+        TrafficLight.objects.using(using)
+        .filter(latitude__range=(min_lat, max_lat), longitude__range=(min_lon, max_lon))
+        .order_by("itst_id")
+        .values_list("itst_id", "name", "latitude", "longitude")
+    )
+    if not rows:
+        return []
+
+    dists = haversine_one_to_many(lat, lon, [row[2] for row in rows], [row[3] for row in rows])
+    order = [k for k in np.argsort(dists, kind="stable") if dists[k] <= radius]
+    if limit is not None:
+        order = order[:limit]
+    return [
+        {"itst_id": rows[k][0], "name": rows[k][1], "latitude": rows[k][2], "longitude": rows[k][3], "distance_m": float(dists[k])}
+        for k in order
+    ]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_traffic_light_index():
+    """프로세스 공용 인덱스 반환 (데이터 버전이 바뀌었으면 다시 생성)"""
+    global _index
+    version = get_data_version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+
+    with _index_lock:
+        if _index is None or _index.version != version:
+            _index = TrafficLightIndex.from_db(version=version)
+        return _index
+
+
+def invalidate_traffic_light_index():
+    global _index
+    with _index_lock:
+        _index = None
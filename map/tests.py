@@ -1,3 +1,1515 @@
-from django.test import TestCase
+import asyncio
+import gzip
+import importlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
 
-# Create your tests here.
+import numpy as np
+import requests
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import NoReverseMatch, clear_url_caches, reverse
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from . import upstream
+from . import urls as map_urls
+from .async_upstream import close_sessions
+from .artifact import invalidate_traffic_light_artifact, unpack_traffic_lights
+from .cycles import (
+    PHASE_GREEN,
+    PHASE_RED,
+    PHASE_UNKNOWN,
+    SignalCycleTable,
+    get_signal_cycle_table,
+    invalidate_signal_cycle_table,
+    scheduled_phases,
+)
+from .dataversion import bump_data_version, get_data_version
+from .geo import (
+    haversine,
+    haversine_consecutive,
+    haversine_many_to_many,
+    haversine_one_to_many,
+    polyline_length,
+)
+from .graph import PedestrianGraph, PedestrianGraphBuilder
+from .history import PhaseHistoryStore
+from .metrics import (
+    REQUEST_DB_QUERIES,
+    UPSTREAM_ERRORS,
+    MetricsMiddleware,
+    cache_metrics,
+    count_queries,
+    metrics_view,
+    render_metrics,
+)
+from .models import SignalCycle, TrafficLight
+from .ranking import departure_profile, expected_time
+from .registry import get_intersection_registry, invalidate_intersection_registry
+from .routecache import DjangoRouteCacheBackend, LocMemRouteCacheBackend, RouteCache
+from .segmenter import RouteSegmenter
+from .serializers import TrafficLightSerializer
+from .signalhub import SignalHub
+from .spatial import get_traffic_light_index, invalidate_traffic_light_index, nearby_from_db
+from .tiles import TileIndex, invalidate_tile_index, lonlat_to_tile, tile_bounds
+from .tmap import fetch_pedestrian_route, fetch_pedestrian_routes, parse_route_stream
+from .v2x import (
+    SIGNAL_DIRECTIONS,
+    SignalFeedPoller,
+    SignalSnapshot,
+    fetch_signal_feed,
+    get_signal_statuses,
+    snapshot_status,
+)
+from .views import (
+    AllTrafficLightsView,
+    DepartureTimeView,
+    NearbyTrafficLightsView,
+    RankedRouteView,
+    SegmentedRouteView,
+    SignalStatusBatchView,
+    TmapSegmentedRouteView,
+    TrafficLightBBoxView,
+    TrafficLightTileView,
+)
+
+
+def random_points(rng, n, lat=37.5665, lon=126.9780, spread=0.5):
+    return [(lat + rng.uniform(-spread, spread), lon + rng.uniform(-spread, spread)) for _ in range(n)]
+
+
+class HaversineKernelTests(SimpleTestCase):
+    """NumPy 거리 커널이 스칼라 haversine 과 1e-6 m 이내로 같은지"""
+
+    TOLERANCE_M = 1e-6
+
+    def setUp(self):
+        self.rng = random.Random(42)
+
+    def test_one_to_many(self):
+        origin = random_points(self.rng, 1)[0]
+        points = random_points(self.rng, 500)
+        lats, lons = zip(*points)
+        distances = haversine_one_to_many(origin[0], origin[1], lats, lons)
+        self.assertEqual(distances.shape, (500,))
+        for (lat, lon), distance in zip(points, distances):
+            self.assertAlmostEqual(distance, haversine(origin[0], origin[1], lat, lon), delta=self.TOLERANCE_M)
+
+    def test_many_to_many(self):
+        points1 = random_points(self.rng, 40)
+        points2 = random_points(self.rng, 60)
+        lats1, lons1 = zip(*points1)
+        lats2, lons2 = zip(*points2)
+        matrix = haversine_many_to_many(lats1, lons1, lats2, lons2)
+        self.assertEqual(matrix.shape, (40, 60))
+        for i, (lat1, lon1) in enumerate(points1):
+            for j, (lat2, lon2) in enumerate(points2):
+                self.assertAlmostEqual(matrix[i, j], haversine(lat1, lon1, lat2, lon2), delta=self.TOLERANCE_M)
+
+    def test_consecutive(self):
+        points = random_points(self.rng, 300, spread=0.01)
+        lats, lons = zip(*points)
+        distances = haversine_consecutive(lats, lons)
+        self.assertEqual(distances.shape, (299,))
+        for (lat1, lon1), (lat2, lon2), distance in zip(points, points[1:], distances):
+            self.assertAlmostEqual(distance, haversine(lat1, lon1, lat2, lon2), delta=self.TOLERANCE_M)
+
+    def test_long_and_degenerate_distances(self):
+        # 같은 점, 대척점 근처, 경도 ±180 경계
+        cases = [
+            ((37.5, 127.0), (37.5, 127.0)),
+            ((37.5, 127.0), (-37.5, -53.0)),
+            ((10.0, 179.9999), (10.0, -179.9999)),
+            ((89.9999, 0.0), (89.9999, 180.0)),
+        ]
+        for (lat1, lon1), (lat2, lon2) in cases:
+            expected = haversine(lat1, lon1, lat2, lon2)
+            self.assertAlmostEqual(haversine_one_to_many(lat1, lon1, [lat2], [lon2])[0], expected, delta=self.TOLERANCE_M)
+            self.assertAlmostEqual(haversine_many_to_many([lat1], [lon1], [lat2], [lon2])[0, 0], expected, delta=self.TOLERANCE_M)
+            self.assertAlmostEqual(haversine_consecutive([lat1, lat2], [lon1, lon2])[0], expected, delta=self.TOLERANCE_M)
+
+    def test_polyline_length(self):
+        points = random_points(self.rng, 50, spread=0.01)
+        coords = [[lon, lat] for lat, lon in points]
+        expected = sum(haversine(a[0], a[1], b[0], b[1]) for a, b in zip(points, points[1:]))
+        self.assertAlmostEqual(polyline_length(coords), expected, delta=self.TOLERANCE_M * len(points))
+        self.assertEqual(polyline_length(coords[:1]), 0.0)
+        self.assertEqual(haversine_consecutive([37.5], [127.0]).shape, (0,))
+
+
+class NearbyTrafficLightsViewTests(TestCase):
+    def setUp(self):
+        for i in range(5):
+            TrafficLight.objects.create(itst_id=i, name=f"신호 {i}", latitude=37.5, longitude=127.0 + i * 0.001)
+        invalidate_traffic_light_index()
+        self.addCleanup(invalidate_traffic_light_index)
+
+    def get(self, **params):
+        return NearbyTrafficLightsView.as_view()(APIRequestFactory().get("/", {"lat": 37.5, "lon": 127.0, **params}))
+
+    def test_limit_keeps_nearest(self):
+        response = self.get(radius=1000, limit=2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([light["itst_id"] for light in response.data], [0, 1])
+
+    def test_db_backend_matches_index(self):
+        rng = random.Random(11)
+        for i, (lat, lon) in enumerate(random_points(rng, 200, spread=0.02), start=100):
+            TrafficLight.objects.create(itst_id=i, name=f"신호 {i}", latitude=lat, longitude=lon)
+        # 같은 거리(동률)는 itst_id 순
+        TrafficLight.objects.create(itst_id=99, name="동률", latitude=37.5, longitude=127.0 + 0.001)
+        invalidate_traffic_light_index()
+        index = get_traffic_light_index()
+
+        for lat, lon in [(37.5, 127.0)] + random_points(rng, 10, spread=0.02):
+            for radius, limit in ((50, None), (300, None), (1500, None), (1500, 7), (5000, 0)):
+                expected = index.within(lat, lon, radius, limit=limit)
+                found = nearby_from_db(lat, lon, radius, limit=limit)
+                self.assertEqual([light["itst_id"] for light in found], [light["itst_id"] for light in expected])
+                for a, b in zip(found, expected):
+                    self.assertAlmostEqual(a["distance_m"], b["distance_m"], delta=1e-6)
+
+        with override_settings(MAP_NEARBY_BACKEND="db"):
+            with self.assertNumQueries(1):
+                response = self.get(radius=150, limit=3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([light["itst_id"] for light in response.data], [0, 1, 99])
+        self.assertEqual(response.data, self.get(radius=150, limit=3).data)
+
+    def test_invalid_radius_or_limit(self):
+        for params in ({"limit": -1}, {"radius": 0}, {"radius": -5}, {"radius": "nan"}, {"radius": "inf"}, {"limit": "x"}):
+            response = self.get(**params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertEqual(response.data, {"error": "Invalid 'radius' or 'limit' parameter."})
+
+
+class TrafficLightArtifactTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(MAP_DATA_VERSION_FILE=Path(directory.name) / ".version")
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        invalidate_traffic_light_artifact()
+        self.addCleanup(invalidate_traffic_light_artifact)
+        TrafficLight.objects.create(itst_id=7, name="세종대로 \"사거리\"", latitude=37.5665123456789, longitude=126.978)
+        TrafficLight.objects.create(itst_id=3, name="Ø 교차로", latitude=-0.5, longitude=127.0)
+
+    def get(self, headers=None, **params):
+        return AllTrafficLightsView.as_view()(APIRequestFactory().get("/", params, headers=headers))
+
+    def serialized(self):
+        return json.loads(json.dumps(TrafficLightSerializer(TrafficLight.objects.all(), many=True).data))
+
+    def test_body_matches_serializer(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(json.loads(response.content), self.serialized())
+        binary = self.get(output="binary")
+        self.assertEqual(unpack_traffic_lights(binary.content), self.serialized())
+        self.assertEqual(self.get(output="xml").status_code, 400)
+
+    def test_etag_304_and_gzip(self):
+        identity = self.get()
+        self.assertEqual(self.get(headers={"If-None-Match": identity["ETag"]}).status_code, 304)
+
+        gzipped = self.get(headers={"Accept-Encoding": "br;q=0, gzip"})
+        self.assertEqual(gzipped["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(gzipped.content), identity.content)
+        self.assertNotEqual(gzipped["ETag"], identity["ETag"])
+        self.assertIn("Accept-Encoding", gzipped["Vary"])
+        self.assertEqual(self.get(headers={"Accept-Encoding": "gzip", "If-None-Match": gzipped["ETag"]}).status_code, 304)
+
+        refused = self.get(headers={"Accept-Encoding": "gzip;q=0"})
+        self.assertFalse(refused.has_header("Content-Encoding"))
+        self.assertEqual(refused.content, identity.content)
+
+    def test_etag_changes_after_version_bump(self):
+        before = self.get()
+        TrafficLight.objects.create(itst_id=9, name="새 신호", latitude=37.0, longitude=127.0)
+        # 버전을 올리기 전에는 이전 본문을 그대로 사용
+        self.assertEqual(self.get(headers={"If-None-Match": before["ETag"]}).status_code, 304)
+
+        bump_data_version("map")
+        after = self.get(headers={"If-None-Match": before["ETag"]})
+        self.assertEqual(after.status_code, 200)
+        self.assertNotEqual(after["ETag"], before["ETag"])
+        self.assertEqual(json.loads(after.content), self.serialized())
+
+
+class TileIndexTests(SimpleTestCase):
+    def lights(self, points):
+        return [{"itst_id": i, "name": f"신호 {i}", "latitude": lat, "longitude": lon} for i, (lat, lon) in enumerate(points)]
+
+    def tile_payload(self, index, z, x, y):
+        return json.loads(index.tile(z, x, y).body("identity"))
+
+    def test_membership_at_tile_edges(self):
+        z, (x, y) = 15, (int(v) for v in lonlat_to_tile(37.5665, 126.9780, 15))
+        south, west, north, east = tile_bounds(z, x, y)
+        # 타일 경계 위, 경계 바로 안쪽/바깥쪽 좌표
+        points = [
+            (lat + d_lat, lon + d_lon)
+            for lat in (south, (south + north) / 2, north)
+            for lon in (west, (west + east) / 2, east)
+            for d_lat in (-1e-9, 0, 1e-9)
+            for d_lon in (-1e-9, 0, 1e-9)
+        ]
+        index = TileIndex(self.lights(points))
+        tiles_x, tiles_y = lonlat_to_tile([p[0] for p in points], [p[1] for p in points], z)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                expected = {i for i in range(len(points)) if (tiles_x[i], tiles_y[i]) == (x + dx, y + dy)}
+                found = {light["itst_id"] for light in self.tile_payload(index, z, x + dx, y + dy)["lights"]}
+                self.assertEqual(found, expected, (dx, dy))
+
+        # 서쪽 경계는 타일에 포함, 동쪽 경계는 옆 타일 (위도 경계는 역변환 반올림으로 양쪽 모두 가능)
+        self.assertEqual(int(tiles_x[points.index((south, west))]), x)
+        self.assertEqual(int(tiles_x[points.index((south, east))]), x + 1)
+
+    def test_child_tiles_partition_parent(self):
+        rng = random.Random(7)
+        index = TileIndex(self.lights(random_points(rng, 400, spread=0.05)))
+        z, (x, y) = 12, (int(v) for v in lonlat_to_tile(37.5665, 126.9780, 12))
+        parent = self.tile_payload(index, z, x, y)["lights"]
+        children = [
+            light for cx in (2 * x, 2 * x + 1) for cy in (2 * y, 2 * y + 1)
+            for light in self.tile_payload(index, z + 1, cx, cy)["lights"]
+        ]
+        self.assertTrue(parent)
+        self.assertEqual(sorted(light["itst_id"] for light in children), sorted(light["itst_id"] for light in parent))
+
+    def test_clustering_above_threshold(self):
+        rng = random.Random(3)
+        points = random_points(rng, 50, spread=0.01)
+        z, (x, y) = 10, (int(v) for v in lonlat_to_tile(37.5665, 126.9780, 10))
+        south, west, north, east = tile_bounds(z, x, y)
+
+        below = self.tile_payload(TileIndex(self.lights(points), max_points=50), z, x, y)
+        self.assertFalse(below["clustered"])
+        self.assertEqual(below["count"], 50)
+
+        above = self.tile_payload(TileIndex(self.lights(points), max_points=10, cluster_depth=2), z, x, y)
+        self.assertTrue(above["clustered"])
+        self.assertEqual(above["count"], 50)
+        self.assertEqual(sum(cluster["count"] for cluster in above["clusters"]) + len(above["lights"]), 50)
+        self.assertLessEqual(len(above["clusters"]) + len(above["lights"]), 4 ** 2)
+        self.assertTrue(all(cluster["count"] > 1 for cluster in above["clusters"]))
+        for cluster in above["clusters"]:
+            self.assertTrue(south <= cluster["latitude"] <= north and west <= cluster["longitude"] <= east)
+
+    def test_bbox_filters_exactly(self):
+        rng = random.Random(5)
+        points = random_points(rng, 300, spread=0.05)
+        index = TileIndex(self.lights(points))
+        south, west, north, east = 37.55, 126.96, 37.58, 127.0
+        expected = sorted(i for i, (lat, lon) in enumerate(points) if south <= lat <= north and west <= lon <= east)
+        self.assertEqual(sorted(light["itst_id"] for light in index.lights_in_bbox(south, west, north, east)), expected)
+        payload = json.loads(index.bbox(south, west, north, east).body("identity"))
+        self.assertEqual(sorted(light["itst_id"] for light in payload["lights"]), expected)
+
+
+class TrafficLightTileViewTests(TestCase):
+    def setUp(self):
+        for i in range(5):
+            TrafficLight.objects.create(itst_id=i, name=f"신호 {i}", latitude=37.5 + i * 0.001, longitude=127.0)
+        for invalidate in (invalidate_traffic_light_index, invalidate_tile_index):
+            invalidate()
+            self.addCleanup(invalidate)
+
+    def bbox(self, value, **headers):
+        return TrafficLightBBoxView.as_view()(APIRequestFactory().get("/", {"bbox": value}, headers=headers))
+
+    def test_bbox_validation(self):
+        for value in ("", "127,37.4", "127,37.4,128,x", "128,37.4,127,37.6", "127,37.6,128,37.4", "-181,37,127,38", "127,37,128,91"):
+            self.assertEqual(self.bbox(value).status_code, 400, value)
+        response = self.bbox("126.99,37.4995,127.01,37.5025")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(light["itst_id"] for light in json.loads(response.content)["lights"]), [0, 1, 2])
+
+    def test_invalid_tile(self):
+        view = TrafficLightTileView.as_view()
+        for z, x, y in ((23, 0, 0), (3, 8, 0), (3, 0, 8)):
+            self.assertEqual(view(APIRequestFactory().get("/"), z=z, x=x, y=y).status_code, 400)
+
+    def test_if_none_match_returns_304(self):
+        view = TrafficLightTileView.as_view()
+        x, y = (int(v) for v in lonlat_to_tile(37.5, 127.0, 14))
+        first = view(APIRequestFactory().get("/"), z=14, x=x, y=y)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(json.loads(first.content)["count"], 5)
+
+        for if_none_match in (first["ETag"], f'"other", W/{first["ETag"]}', "*"):
+            response = view(APIRequestFactory().get("/", headers={"If-None-Match": if_none_match}), z=14, x=x, y=y)
+            self.assertEqual(response.status_code, 304, if_none_match)
+            self.assertEqual(response.content, b"")
+            self.assertEqual(response["ETag"], first["ETag"])
+
+        response = view(APIRequestFactory().get("/", headers={"If-None-Match": '"other"'}), z=14, x=x, y=y)
+        self.assertEqual(response.status_code, 200)
+        # bbox 응답도 같은 방식
+        bbox = self.bbox("126.99,37.4995,127.01,37.5025")
+        self.assertEqual(self.bbox("126.99,37.4995,127.01,37.5025", **{"If-None-Match": bbox["ETag"]}).status_code, 304)
+
+
+class FakeUpstreamServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class FakeUpstream:
+    """
+    테스트용 로컬 HTTP 서버
+    - respond(method, path, body) -> (status, payload) 로 응답 (payload 가 bytes 가 아니면 JSON 으로 보냄)
+    """
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.requests = []
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def handle_request(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                upstream.requests.append((self.command, self.path, body))
+                status, payload = upstream.respond(self.command, self.path, body)
+                if not isinstance(payload, bytes):
+                    payload = json.dumps(payload).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    # 클라이언트가 timeout 으로 먼저 끊은 경우
+                    pass
+
+            do_GET = do_POST = handle_request
+
+            def log_message(self, *args):
+                pass
+
+        self.server = FakeUpstreamServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def feed_items(trsm_ms, count=3):
+    return [
+        {
+            "itstId": str(1000 + i),
+            "trsmUtcTime": trsm_ms,
+            "ntPdsgStatNm": "protected-Movement-Allowed",
+            "ntPdsgRmdrCs": 150,
+        }
+        for i in range(count)
+    ]
+
+
+class SignalFeedPollerTests(SimpleTestCase):
+    """로컬 가짜 피드 서버를 상대로 한 SignalFeedPoller 동작"""
+
+    def setUp(self):
+        self.response = (200, [])
+
+    def serve(self):
+        return FakeUpstream(lambda method, path, body: self.response)
+
+    def poller(self, interval=0.05):
+        return SignalFeedPoller(interval, fetch=lambda: fetch_signal_feed(timeout=2))
+
+    def test_snapshot_contents_and_age(self):
+        trsm_ms = int(time.time() * 1000) - 3000
+        self.response = (200, feed_items(trsm_ms) + [{"itstId": " 1000 ", "trsmUtcTime": 0}, {"itstId": ""}, "bad"])
+        with self.serve() as server, override_settings(V2X_SIGNAL_FEED_URL=server.url):
+            poller = self.poller()
+            snapshot = poller.refresh()
+
+        self.assertIs(poller.snapshot, snapshot)
+        self.assertEqual(len(snapshot), 3)
+        # 같은 itstId 는 처음 것만, 빈 id / dict 가 아닌 item 은 제외
+        self.assertEqual(snapshot.get(" 1000").get("trsmUtcTime"), trsm_ms)
+        self.assertIsNone(snapshot.get("9999"))
+        self.assertEqual(snapshot.trsm_utc_time, trsm_ms)
+        self.assertAlmostEqual(snapshot.age(now=snapshot.fetched_at + 2), 2)
+        self.assertAlmostEqual(snapshot.feed_age(now=trsm_ms / 1000 + 5), 5)
+
+        status = snapshot_status(poller)
+        self.assertEqual(status["items"], 3)
+        self.assertFalse(status["pollerRunning"])
+        self.assertIsNone(status["lastError"])
+        self.assertGreaterEqual(status["feedAgeSec"], 3)
+        self.assertLess(status["ageSec"], 1)
+
+    def test_staleness_reporting(self):
+        snapshot = SignalSnapshot(feed_items(1_000_000), fetched_at=1_000.0)
+        self.assertEqual(snapshot.age(now=1_030.0), 30.0)
+        self.assertEqual(snapshot.feed_age(now=1_030.0), 30.0)
+        self.assertIsNone(SignalSnapshot([{"itstId": "1"}]).feed_age())
+
+    def test_items_without_transmit_time_are_dropped(self):
+        trsm_ms = int(time.time() * 1000)
+        snapshot = SignalSnapshot(feed_items(trsm_ms) + [
+            {"itstId": "2000", "ntPdsgStatNm": "stop-And-Remain"},
+            {"itstId": "2001", "trsmUtcTime": None},
+            {"itstId": "2002", "trsmUtcTime": "soon"},
+        ])
+        self.assertEqual(len(snapshot), 3)
+        self.assertEqual(snapshot.trsm_utc_time, trsm_ms)
+        # 잘못된 item 하나 때문에 다른 교차로 조회가 실패하지 않음
+        statuses = get_signal_statuses(["1000", "2000", "2002"], snapshot=snapshot)
+        self.assertEqual(statuses[0]["signals"][0]["signalColor"], "green")
+        self.assertEqual(statuses[1:], [None, None])
+
+    def test_refresh_error_keeps_previous_snapshot(self):
+        self.response = (200, feed_items(int(time.time() * 1000)))
+        with self.serve() as server, override_settings(V2X_SIGNAL_FEED_URL=server.url):
+            poller = self.poller()
+            snapshot = poller.refresh()
+            self.response = (500, {"error": "down"})
+            with self.assertRaises(requests.HTTPError):
+                poller.refresh()
+
+        self.assertIs(poller.snapshot, snapshot)
+        status = snapshot_status(poller)
+        self.assertIn("500", status["lastError"])
+        self.assertIsNotNone(status["lastErrorAt"])
+
+    def test_non_list_body_is_rejected(self):
+        self.response = (200, {"code": "ERROR", "message": "invalid apikey"})
+        with self.serve() as server, override_settings(V2X_SIGNAL_FEED_URL=server.url):
+            poller = self.poller()
+            with self.assertRaises(ValueError):
+                poller.refresh()
+        self.assertIsNone(poller.snapshot)
+        self.assertIn("dict", poller.last_error)
+        # 기다리는 요청이 막히지 않도록 실패해도 ready 는 설정됨
+        self.assertTrue(poller.wait_ready(0))
+
+    def test_poller_thread_survives_bad_payloads(self):
+        self.response = (200, {"not": "a list"})
+        with self.serve() as server, override_settings(V2X_SIGNAL_FEED_URL=server.url):
+            poller = self.poller()
+            poller.start()
+            try:
+                deadline = time.monotonic() + 5
+                while len(server.requests) < 3 and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                self.assertTrue(poller.running)
+                self.assertIsNone(poller.snapshot)
+
+                # 피드가 정상으로 돌아오면 다음 주기에 스냅샷이 생김
+                self.response = (200, feed_items(int(time.time() * 1000)))
+                while poller.snapshot is None and time.monotonic() < deadline:
+                    time.sleep(0.01)
+            finally:
+                poller.stop()
+        self.assertIsNotNone(poller.snapshot)
+        self.assertEqual(len(poller.snapshot), 3)
+        self.assertIsNone(poller.last_error)
+
+
+class SignalStatusBatchTests(SimpleTestCase):
+    """공유 스냅샷을 직접 넣은 폴러로 배치 엔드포인트 확인 (외부 호출 없음)"""
+
+    def setUp(self):
+        self.now = time.time()
+        fresh, old = int(self.now * 1000) - 2000, int(self.now * 1000) - 60_000
+        poller = SignalFeedPoller(60)
+        poller.apply(feed_items(fresh, count=2) + [
+            {**feed_items(old)[0], "itstId": "2000"},
+            {"itstId": "3000", "ntPdsgStatNm": "stop-And-Remain"},
+        ])
+        patcher = patch("map.v2x._poller", poller)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get(self, query):
+        return SignalStatusBatchView.as_view()(APIRequestFactory().get("/", query))
+
+    @override_settings(V2X_POLL_ENABLED=False, V2X_STALE_AFTER=10.0)
+    def test_found_unknown_and_stale(self):
+        response = self.get({"itsIds": "1000,2000,9999,3000"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["count"], 4)
+        self.assertEqual(response.data["found"], 2)
+        fresh, old, unknown, malformed = response.data["results"]
+        self.assertEqual((fresh["itsId"], fresh["found"], fresh["stale"]), ("1000", True, False))
+        self.assertAlmostEqual(fresh["ageSec"], 2, delta=1)
+        self.assertEqual(fresh["signals"][0]["signalColor"], "green")
+        self.assertEqual((old["found"], old["stale"]), (True, True))
+        self.assertGreaterEqual(old["ageSec"], 60)
+        # 피드에 없는 교차로, 전송 시각이 없는 item 은 500 대신 found False
+        self.assertEqual(unknown, {"itsId": "9999", "found": False})
+        self.assertEqual(malformed, {"itsId": "3000", "found": False})
+
+    @override_settings(V2X_POLL_ENABLED=False)
+    def test_duplicate_and_blank_ids(self):
+        response = self.get({"itsIds": ["1000, ,1001,1000", " 1001 ,,"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result["itsId"] for result in response.data["results"]], ["1000", "1001"])
+
+    @override_settings(V2X_POLL_ENABLED=False, V2X_BATCH_MAX_IDS=2)
+    def test_id_limit_and_missing_ids(self):
+        self.assertEqual(self.get({"itsIds": "1000,1001,2000"}).status_code, 400)
+        # 중복을 제거한 뒤 개수를 셈
+        self.assertEqual(self.get({"itsIds": "1000,1001,1000"}).status_code, 200)
+        self.assertEqual(self.get({"itsIds": " , "}).status_code, 400)
+        self.assertEqual(self.get({"bbox": "127,37"}).status_code, 400)
+
+
+def parse_sse(event):
+    name, data = event.decode("utf-8").strip().split("\n")
+    return name.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+
+@override_settings(V2X_STREAM_DRIFT_SEC=1.0)
+class SignalHubTests(SimpleTestCase):
+    """스냅샷 두 개 사이의 변경분만 나가는지, 느린 구독자에게는 최신 상태로 합쳐지는지"""
+
+    T0 = 1_700_000_000_000
+
+    def item(self, its_id, sent_ms, nt=("protected-Movement-Allowed", 300), et=("stop-And-Remain", 200)):
+        return {
+            "itstId": its_id, "trsmUtcTime": sent_ms,
+            "ntPdsgStatNm": nt[0], "ntPdsgRmdrCs": nt[1], "etPdsgStatNm": et[0], "etPdsgRmdrCs": et[1],
+        }
+
+    def run_hub(self, scenario):
+        async def main():
+            poller = SignalFeedPoller(60)
+            poller.apply([self.item("1000", self.T0), self.item("1001", self.T0), self.item("1002", self.T0)])
+            hub = SignalHub(asyncio.get_running_loop(), poller=poller)
+            try:
+                return await scenario(hub, poller)
+            finally:
+                hub.close()
+
+        return asyncio.run(main())
+
+    def test_only_changed_intersections_are_emitted(self):
+        async def scenario(hub, poller):
+            subscription, initial = hub.subscribe(["1000", "1001"])
+            name, payload = parse_sse(initial)
+            self.assertEqual(name, "snapshot")
+            self.assertEqual(set(payload), {"1000", "1001"})
+
+            # 1초 뒤: 1000 은 보행 신호 색 변경, 1001 은 남은 시간만 1초 줄어듦, 1002 는 구독하지 않음
+            t1 = self.T0 + 1000
+            hub.publish(SignalSnapshot([
+                self.item("1000", t1, nt=("stop-And-Remain", 900), et=("stop-And-Remain", 190)),
+                self.item("1001", t1, nt=("protected-Movement-Allowed", 290), et=("stop-And-Remain", 190)),
+                self.item("1002", t1, nt=("stop-And-Remain", 10)),
+            ]))
+            events = [parse_sse(event) for event in await subscription.next(0.5)]
+            self.assertEqual(len(events), 1)
+            name, payload = events[0]
+            self.assertEqual((name, payload["itsId"]), ("signal", "1000"))
+            self.assertEqual([signal["direction"] for signal in payload["signals"]], ["nt"])
+            self.assertEqual(payload["signals"][0]["signalColor"], "red")
+
+            # 같은 전송 시각 스냅샷은 무시, 예상보다 남은 시간이 1초 넘게 어긋나면 변경으로 전송
+            t2 = self.T0 + 2000
+            poller.apply([
+                self.item("1000", t1, nt=("protected-Movement-Allowed", 300)),
+                self.item("1001", t2, nt=("protected-Movement-Allowed", 150), et=("stop-And-Remain", 180)),
+            ])
+            await asyncio.sleep(0.01)
+            events = [parse_sse(event) for event in await subscription.next(0.5)]
+            self.assertEqual([(payload["itsId"], [s["direction"] for s in payload["signals"]]) for _, payload in events],
+                             [("1001", ["nt"])])
+            self.assertEqual(await subscription.next(0.05), [])
+            return hub.stats()
+
+        stats = self.run_hub(scenario)
+        self.assertEqual(stats["published"], 2)
+        self.assertEqual(stats["subscriptions"], 1)
+
+    def test_slow_subscriber_gets_coalesced_latest_state(self):
+        async def scenario(hub, poller):
+            slow, _ = hub.subscribe(["1000"])
+            fast, _ = hub.subscribe(["1000"])
+            colors = ["stop-And-Remain", "protected-Movement-Allowed", "stop-And-Remain"]
+            for k, color in enumerate(colors, start=1):
+                hub.publish(SignalSnapshot([self.item("1000", self.T0 + 1000 * k, nt=(color, 300))]))
+                if k < len(colors):
+                    self.assertEqual(len(await fast.next(0.5)), 1)
+
+            events = [parse_sse(event) for event in await slow.next(0.5)]
+            self.assertEqual(slow.coalesced, 2)
+            self.assertEqual(len(events), 1)
+            name, payload = events[0]
+            # 대기 중이던 변경분 대신 최신 전체 상태 (모든 방향 + timestamp)
+            self.assertEqual((name, payload["itsId"]), ("signal", "1000"))
+            self.assertEqual(payload["signals"][0]["signalColor"], "red")
+            self.assertEqual(len(payload["signals"]), len(SIGNAL_DIRECTIONS))
+
+            # 따라오는 구독자는 마지막 변경분만 받음
+            _, latest = parse_sse((await fast.next(0.5))[0])
+            self.assertEqual([signal["direction"] for signal in latest["signals"]], ["nt"])
+            self.assertEqual(fast.coalesced, 0)
+
+            hub.unsubscribe(slow)
+            hub.unsubscribe(fast)
+            self.assertEqual(hub.stats()["intersections"], 0)
+            self.assertEqual(hub.sent, {})
+
+        self.run_hub(scenario)
+
+
+@override_settings(UPSTREAM_RETRIES=2, UPSTREAM_BACKOFF=0.01, UPSTREAM_BACKOFF_JITTER=0.01)
+class UpstreamClientTests(SimpleTestCase):
+    """공용 세션의 재시도 설정과 호출 통계 / upstream_errors_total 지표"""
+
+    NAME = "test-upstream"
+
+    def setUp(self):
+        # 설정을 바꾼 세션을 새로 만들도록 캐시된 세션을 비움
+        patcher = patch.dict(upstream._sessions, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def errors(self):
+        return UPSTREAM_ERRORS.labels(self.NAME).value()
+
+    def test_503_is_retried_for_get_only(self):
+        errors = self.errors()
+        with FakeUpstream(lambda method, path, body: (503, {"error": "busy"})) as server:
+            self.assertEqual(upstream.get(self.NAME, server.url, timeout=2).status_code, 503)
+            self.assertEqual([method for method, _, _ in server.requests], ["GET"] * 3)
+
+            server.requests.clear()
+            self.assertEqual(upstream.post(self.NAME, server.url, json={}, timeout=2).status_code, 503)
+            self.assertEqual([method for method, _, _ in server.requests], ["POST"])
+
+        # 재시도는 호출 한 번으로 기록
+        self.assertEqual(self.errors(), errors + 2)
+        self.assertEqual(upstream.upstream_stats()[self.NAME]["errors"], upstream.upstream_stats()[self.NAME]["count"])
+
+    def test_retry_then_success_is_not_an_error(self):
+        responses = iter([(503, {}), (200, {"ok": True})])
+        errors = self.errors()
+        with FakeUpstream(lambda method, path, body: next(responses)) as server:
+            response = upstream.get(self.NAME, server.url, timeout=2)
+        self.assertEqual(response.json(), {"ok": True})
+        self.assertEqual(self.errors(), errors)
+
+    def test_connection_error_counts_as_error(self):
+        errors = self.errors()
+        with FakeUpstream(lambda method, path, body: (200, {})) as server:
+            url = server.url
+        with self.assertRaises(requests.ConnectionError):
+            upstream.post(self.NAME, url, json={}, timeout=1)
+        self.assertEqual(self.errors(), errors + 1)
+
+    def test_jittered_backoff_settings(self):
+        retry = upstream.build_session().get_adapter("http://").max_retries
+        self.assertEqual((retry.total, retry.read), (2, 0))
+        self.assertNotIn("POST", retry.allowed_methods)
+        self.assertEqual(set(retry.status_forcelist), {502, 503, 504})
+        self.assertEqual(retry.backoff_jitter, 0.01)
+        # 두 번째 재시도부터 backoff_factor * 2^(n-1) + [0, jitter) 초
+        retry = retry.increment("GET", "/").increment("GET", "/")
+        self.assertTrue(0.02 <= retry.get_backoff_time() <= 0.03)
+
+
+def tmap_route(option):
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {"type": "LineString", "coordinates": [[127.0, 37.5], [127.001, 37.5]]},
+                "properties": {"index": 0, "description": f"option {option}", "distance": 88, "time": 63},
+            }
+        ],
+    }
+
+
+@override_settings(ROUTE_CACHE_ENABLED=False, PEDESTRIAN_GRAPH_GEOMETRY_LOG="", TMAP_MAX_WORKERS=8)
+class FetchPedestrianRoutesTests(SimpleTestCase):
+    """searchOption 별 지연을 넣은 가짜 TMAP 서버로 동시 요청 / 옵션별 timeout / 부분 결과 확인"""
+
+    def setUp(self):
+        # searchOption -> (지연 초, 상태 코드)
+        self.behaviour = {}
+
+    def respond(self, method, path, body):
+        option = json.loads(body)["searchOption"]
+        delay, status = self.behaviour.get(option, (0, 200))
+        time.sleep(delay)
+        if status != 200:
+            return status, {"error": {"code": "ERROR"}}
+        return status, tmap_route(option)
+
+    def fetch(self, server, options=("0", "10"), timeout=2):
+        with override_settings(TMAP_PEDESTRIAN_URL=server.url):
+            return fetch_pedestrian_routes(127.0, 37.5, 127.001, 37.5, options, timeout=timeout)
+
+    def test_options_are_fetched_concurrently(self):
+        self.behaviour = {"0": (0.4, 200), "10": (0.4, 200), "30": (0.4, 200)}
+        with FakeUpstream(self.respond) as server:
+            started = time.monotonic()
+            results = self.fetch(server, options=("0", "10", "30"))
+            elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(set(results), {"0", "10", "30"})
+        for option, result in results.items():
+            self.assertEqual(result["data"]["features"][0]["properties"]["description"], f"option {option}")
+
+    def test_slow_option_times_out_alone(self):
+        self.behaviour = {"10": (3, 200)}
+        with FakeUpstream(self.respond) as server:
+            started = time.monotonic()
+            results = self.fetch(server, timeout=0.5)
+            elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 2.0)
+        self.assertIn("data", results["0"])
+        self.assertEqual(results["10"]["error"], "TMAP 도보 경로 요청 실패")
+
+    def test_failed_option_returns_partial_results(self):
+        self.behaviour = {"10": (0, 500)}
+        with FakeUpstream(self.respond) as server:
+            results = self.fetch(server)
+
+        self.assertIn("data", results["0"])
+        self.assertIn("500", results["10"]["details"])
+
+    def test_concurrent_requests_do_not_queue_behind_each_other(self):
+        # 요청 10개 x 옵션 2개가 동시에 들어와도 각 옵션은 바로 시작하므로 timeout 안에 끝남
+        self.behaviour = {"0": (0.6, 200), "10": (0.6, 200)}
+        with FakeUpstream(self.respond) as server:
+            results = [None] * 10
+
+            def run(i):
+                results[i] = self.fetch(server, timeout=0.5 + 0.4)
+
+            threads = [threading.Thread(target=run, args=(i,)) for i in range(len(results))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        for result in results:
+            self.assertEqual({option: "data" in value for option, value in result.items()}, {"0": True, "10": True})
+
+
+class FeatureStreamTests(SimpleTestCase):
+    """TMAP 응답 스트리밍 파서가 json.loads 와 같은 결과를 내는지"""
+
+    ROUTE = {
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "geometry": {"type": "Point", "coordinates": [127.0, 37.5]},
+             "properties": {"index": 0, "description": "횡단보도 후 직진", "pointType": "SP"}},
+            {"type": "Feature", "geometry": {"type": "LineString", "coordinates": [[127.0, 37.5], [127.001, 37.5]]},
+             "properties": {"index": 1, "description": "보행자도로 88m", "distance": 88, "time": 63, "name": "[\"]"}},
+        ],
+    }
+
+    def body(self, route):
+        return json.dumps(route, ensure_ascii=False).encode()
+
+    def parse(self, body, chunk_size):
+        return parse_route_stream(body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+
+    def test_features_split_across_chunks(self):
+        body = self.body(self.ROUTE)
+        # 1바이트 청크는 한글(3바이트) 문자와 feature 를 모두 청크 경계에서 자름
+        for chunk_size in (1, 7, 64, len(body)):
+            self.assertEqual(self.parse(body, chunk_size), self.ROUTE, chunk_size)
+
+    def test_nul_padded_body(self):
+        body = self.body(self.ROUTE)
+        padded = b"\x00" * 5 + body.replace(b"},", b"},\x00\x00", 1) + b"\x00" * 300
+        for chunk_size in (3, 1024):
+            self.assertEqual(self.parse(padded, chunk_size), self.ROUTE, chunk_size)
+
+    def test_missing_or_empty_features(self):
+        self.assertEqual(self.parse(b'{"error": {"id": "400", "message": "bad request"}}', 8), {})
+        self.assertEqual(self.parse(b"", 8), {})
+        self.assertEqual(
+            self.parse(b'{"type": "FeatureCollection", "features": [ ]}', 8),
+            {"type": "FeatureCollection", "features": []},
+        )
+
+    def test_truncated_body_raises(self):
+        body = self.body(self.ROUTE)
+        with self.assertRaises(json.JSONDecodeError):
+            self.parse(body[:len(body) // 2], 16)
+
+    @override_settings(PEDESTRIAN_GRAPH_GEOMETRY_LOG="")
+    def test_fetch_pedestrian_route_streams_padded_response(self):
+        body = self.body(self.ROUTE) + b"\x00" * 200_000
+        with FakeUpstream(lambda method, path, request_body: (200, body)) as server, \
+                override_settings(TMAP_PEDESTRIAN_URL=server.url):
+            self.assertEqual(fetch_pedestrian_route(127.0, 37.5, 127.001, 37.5), self.ROUTE)
+
+
+@override_settings(ROUTE_CACHE_ENABLED=True, PEDESTRIAN_GRAPH_MODE="off", PEDESTRIAN_GRAPH_GEOMETRY_LOG="")
+class AsyncViewsTests(SimpleTestCase):
+    """ASYNC_VIEWS_ENABLED 로 연결한 비동기 엔드포인트를 AsyncClient 로 호출"""
+
+    QUERY = {"startX": 127.0, "startY": 37.5, "endX": 127.001, "endY": 37.5}
+
+    def setUp(self):
+        # map.urls 는 import 시점의 설정으로 비동기 경로를 붙이므로 설정을 켠 채 다시 불러옴
+        with override_settings(ASYNC_VIEWS_ENABLED=True):
+            importlib.reload(map_urls)
+        self.addCleanup(importlib.reload, map_urls)
+        settings_override = override_settings(ROOT_URLCONF="map.urls")
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.cache = RouteCache(LocMemRouteCacheBackend(600, 100))
+        patcher = patch("map.routecache._route_cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def respond(self, method, path, body):
+        time.sleep(0.2)
+        return 200, tmap_route(json.loads(body)["searchOption"])
+
+    async def test_route_single_flight_and_cache_hit(self):
+        url = reverse("async-tmap-route")
+        client = AsyncClient()
+        try:
+            with FakeUpstream(self.respond) as server, override_settings(TMAP_PEDESTRIAN_URL=server.url):
+                # 같은 경로 동시 요청 2건 -> 옵션별 TMAP 호출 1건씩
+                first, second = await asyncio.gather(client.get(url, self.QUERY), client.get(url, self.QUERY))
+                self.assertEqual((first.status_code, second.status_code), (200, 200))
+                self.assertEqual(first.json(), second.json())
+                self.assertEqual([route["type"] for route in first.json()["routes"]], ["recommended", "alternative"])
+                self.assertEqual(len(server.requests), 2)
+                self.assertEqual((self.cache.misses, self.cache.collapsed), (2, 2))
+
+                # 이후 요청은 캐시에서 응답
+                third = await client.get(url, self.QUERY)
+                self.assertEqual(third.json(), first.json())
+                self.assertEqual(len(server.requests), 2)
+                self.assertEqual(self.cache.hits, 2)
+        finally:
+            await close_sessions()
+
+    async def test_missing_coordinates(self):
+        response = await AsyncClient().get(reverse("async-tmap-route"), {"startX": 127.0})
+        self.assertEqual(response.status_code, 400)
+
+    def test_routes_require_setting(self):
+        importlib.reload(map_urls)
+        clear_url_caches()
+        with self.assertRaises(NoReverseMatch):
+            reverse("async-tmap-route")
+        self.assertTrue(reverse("tmap-route"))
+
+
+class RouteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = RouteCache(LocMemRouteCacheBackend(ttl=60, max_entries=10))
+
+    def test_only_routes_with_features_are_cached(self):
+        calls = []
+
+        def fetch_error_body():
+            calls.append(1)
+            return {}
+
+        # features 없는 응답(TMAP 이 200 으로 보낸 오류 본문)은 다음 요청에서 다시 요청
+        self.assertEqual(self.cache.get_or_fetch("k", fetch_error_body), {})
+        self.assertEqual(self.cache.get_or_fetch("k", fetch_error_body), {})
+        self.assertEqual(len(calls), 2)
+
+        route = tmap_route("0")
+        self.assertEqual(self.cache.get_or_fetch("k", lambda: route), route)
+        self.assertEqual(self.cache.get_or_fetch("k", fetch_error_body), route)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 3)
+
+    def test_concurrent_misses_are_collapsed(self):
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return tmap_route("0")
+
+        threads = [threading.Thread(target=self.cache.get_or_fetch, args=("k", fetch)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while self.cache.stats()["collapsed"] < 7 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        stats = self.cache.stats()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual((stats["misses"], stats["collapsed"]), (1, 7))
+
+    def test_entries_are_unknown_for_django_backend(self):
+        self.cache.get_or_fetch("k", lambda: tmap_route("0"))
+        with patch("map.routecache._route_cache", self.cache):
+            families = {name: samples for name, _, _, samples in cache_metrics()}
+        self.assertEqual((self.cache.stats()["entries"], self.cache.stats()["evictions"]), (1, 0))
+        self.assertIn(({"cache": "route"}, 1), families["cache_entries"])
+
+        django_cache = RouteCache(DjangoRouteCacheBackend(ttl=60))
+        self.addCleanup(django_cache.backend.clear)
+        django_cache.get_or_fetch("k", lambda: tmap_route("0"))
+        stats = django_cache.stats()
+        self.assertIsNone(stats["entries"])
+        self.assertIsNone(stats["evictions"])
+        # /metrics 에는 0 대신 route 샘플 자체를 내보내지 않음
+        with patch("map.routecache._route_cache", django_cache):
+            families = {name: samples for name, _, _, samples in cache_metrics()}
+            text = render_metrics()
+        self.assertNotIn("route", [labels["cache"] for labels, _ in families["cache_entries"]])
+        self.assertEqual(families["cache_evictions_total"], [])
+        self.assertNotIn('cache_entries{cache="route"}', text)
+        self.assertIn('cache_lookups_total{cache="route",result="miss"} 1', text)
+
+
+class RouteSegmenterTests(SimpleTestCase):
+    # 경도 방향으로 거의 일정한 간격의 직선 경로
+    COORDS = [[127.0 + 0.001 * i, 37.5] for i in range(6)]
+
+    def setUp(self):
+        self.segmenter = RouteSegmenter(self.COORDS, speed=1.25)
+        self.steps = [haversine(a[1], a[0], b[1], b[0]) for a, b in zip(self.COORDS, self.COORDS[1:])]
+
+    def test_cumulative_distance(self):
+        self.assertEqual(len(self.segmenter), 6)
+        self.assertEqual(self.segmenter.cumulative[0], 0.0)
+        self.assertAlmostEqual(self.segmenter.total_distance, sum(self.steps), delta=1e-6)
+        self.assertEqual(RouteSegmenter([]).total_distance, 0.0)
+        self.assertEqual(RouteSegmenter(self.COORDS[:1]).total_distance, 0.0)
+
+    def test_split_distance_and_time(self):
+        segments = self.segmenter.split([2, 4])
+        self.assertEqual([(s["start_index"], s["end_index"]) for s in segments], [(0, 2), (2, 4), (4, 5)])
+        for segment in segments:
+            expected = sum(self.steps[segment["start_index"]:segment["end_index"]])
+            self.assertAlmostEqual(segment["distance_m"], expected, delta=1e-6)
+            self.assertAlmostEqual(segment["time_sec"], expected / 1.25, delta=1e-6)
+        self.assertEqual(segments[0]["start"], {"lat": 37.5, "lng": 127.0})
+        self.assertEqual(segments[-1]["end"], {"lat": 37.5, "lng": self.COORDS[-1][0]})
+        self.assertAlmostEqual(sum(s["distance_m"] for s in segments), self.segmenter.total_distance, delta=1e-6)
+
+    def test_split_without_cuts_and_speed(self):
+        segments = RouteSegmenter(self.COORDS).split([])
+        self.assertEqual(len(segments), 1)
+        self.assertIsNone(segments[0]["time_sec"])
+        self.assertEqual(RouteSegmenter([]).split([1]), [])
+
+    def test_snap_crossings_cut_indices(self):
+        crossings = [
+            {"lat": 37.5, "lng": 127.001},
+            {"lat": 37.50005, "lng": 127.003},    # 약 5.6 m 떨어진 지점
+            {"lat": 37.5, "lng": 127.001},        # 이미 지나간 좌표라 이후 좌표에서는 매칭 안 됨
+            {"lat": 37.5, "lng": 127.005},
+        ]
+        self.assertEqual(self.segmenter.snap_crossings(crossings), [1, 3])
+        self.assertEqual(self.segmenter.snap_crossings(crossings[:2] + crossings[3:]), [1, 3, 5])
+        self.assertEqual(self.segmenter.snap_crossings([{"lat": 37.6, "lng": 127.0}]), [])
+        self.assertEqual(self.segmenter.snap_crossings([]), [])
+
+
+@override_settings(ROUTE_CACHE_ENABLED=False, PEDESTRIAN_GRAPH_MODE="off", PEDESTRIAN_GRAPH_GEOMETRY_LOG="")
+class SegmentedRouteViewTests(TestCase):
+    START = [127.0, 37.5]
+    CROSSING = [127.002, 37.5]
+    END = [127.004, 37.5]
+
+    def setUp(self):
+        TrafficLight.objects.create(itst_id=1, name="출발 신호", latitude=37.5, longitude=127.0)
+        TrafficLight.objects.create(itst_id=2, name="횡단보도 신호", latitude=37.5, longitude=127.002)
+        invalidate_traffic_light_index()
+        self.addCleanup(invalidate_traffic_light_index)
+        self.user = type("WalkingUser", (), {"is_authenticated": True, "min_speed": 1.0, "max_speed": 1.5})()
+
+    def get(self, features, view=SegmentedRouteView, **params):
+        route = {"type": "FeatureCollection", "features": features}
+        with FakeUpstream(lambda method, path, body: (200, route)) as server, \
+                override_settings(TMAP_PEDESTRIAN_URL=server.url):
+            request = APIRequestFactory().get("/", {"startX": 127.0, "startY": 37.5, "endX": 127.004, "endY": 37.5, **params})
+            force_authenticate(request, user=self.user)
+            return view.as_view()(request)
+
+    def test_crossing_on_linestring_uses_its_last_coordinate(self):
+        response = self.get([
+            {"geometry": {"type": "Point", "coordinates": self.START}, "properties": {"description": "출발"}},
+            {"geometry": {"type": "LineString", "coordinates": [self.START, self.CROSSING]},
+             "properties": {"description": "횡단보도 앞까지 이동"}},
+            {"geometry": {"type": "LineString", "coordinates": [self.CROSSING, self.END]},
+             "properties": {"description": "직진"}},
+        ])
+        self.assertEqual(response.status_code, 200)
+        route = response.data["routes"][0]
+        self.assertEqual(route["total_segments"], 2)
+        self.assertEqual(route["segments"][0]["end"], {"lat": 37.5, "lng": 127.002})
+        self.assertEqual(route["segments"][0]["traffic_light"]["name"], "횡단보도 신호")
+        self.assertAlmostEqual(route["segments"][0]["estimated_time_sec"], route["segments"][0]["distance_m"], delta=0.01)
+
+    def test_crossing_linestring_as_first_feature(self):
+        response = self.get([
+            {"geometry": {"type": "LineString", "coordinates": [self.START, self.CROSSING]},
+             "properties": {"description": "건널목 건너기"}},
+            {"geometry": {"type": "LineString", "coordinates": [self.CROSSING, self.END]},
+             "properties": {"description": "직진"}},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["routes"][0]["segments"][0]["traffic_light"]["name"], "횡단보도 신호")
+
+    def test_tmap_segmented_route_matches_crossing_lights(self):
+        response = self.get([
+            {"geometry": {"type": "LineString", "coordinates": [self.START, self.CROSSING]},
+             "properties": {"description": "횡단보도 건너기"}},
+            {"geometry": {"type": "LineString", "coordinates": [self.CROSSING, self.END]},
+             "properties": {"description": "직진"}},
+        ], view=TmapSegmentedRouteView)
+        self.assertEqual(response.status_code, 200)
+        segments = response.data["routes"][0]["segments"]
+        self.assertEqual(segments[0]["traffic_light"], {"lat": 37.5, "lng": 127.002, "name": "횡단보도 신호"})
+        self.assertIsNone(segments[1]["traffic_light"])
+
+    def test_tmap_segmented_route_raw_modes(self):
+        features = [
+            {"type": "Feature", "geometry": {"type": "LineString", "coordinates": [self.START, self.END]},
+             "properties": {"index": 1, "description": "직진", "distance": 355, "facilityType": "11", "roadType": 21}},
+        ]
+        full = self.get(features, view=TmapSegmentedRouteView).data["routes"][0]["tmap_raw"]
+        self.assertEqual(full["features"], features)
+
+        compact = self.get(features, view=TmapSegmentedRouteView, raw="compact").data["routes"][0]["tmap_raw"]
+        self.assertEqual(compact, {"type": "FeatureCollection", "features": [{
+            "geometry": features[0]["geometry"],
+            "properties": {"index": 1, "description": "직진", "distance": 355},
+        }]})
+
+        routes = self.get(features, view=TmapSegmentedRouteView, raw="none").data["routes"]
+        self.assertEqual(len(routes), 2)
+        self.assertTrue(all("tmap_raw" not in route and route["segments"] for route in routes))
+
+        self.assertEqual(self.get(features, view=TmapSegmentedRouteView, raw="gzip").status_code, 400)
+
+
+class SignalRouteTestMixin:
+    """임시 location.csv / 데이터 버전 파일, 직접 넣은 V2X 스냅샷, 가짜 TMAP 서버로 신호 반영 경로 계산"""
+
+    INTERSECTION = ("500", "신호 교차로", 37.5, 127.001)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        its_id, name, lat, lon = self.INTERSECTION
+        (self.directory / "location.csv").write_text(
+            f"itstId,itstNm,mapCtptIntLat,mapCtptIntLot\n{its_id},{name},{lat},{lon}\n", encoding="utf-8"
+        )
+        settings_override = override_settings(
+            MAP_LOCATION_CSV=self.directory / "location.csv",
+            MAP_DATA_VERSION_FILE=self.directory / ".version",
+            SIGNAL_CYCLE_VERSION_FILE=self.directory / ".cycles-version",
+            ROUTE_CACHE_ENABLED=False,
+            PEDESTRIAN_GRAPH_MODE="off",
+            PEDESTRIAN_GRAPH_GEOMETRY_LOG="",
+            V2X_POLL_ENABLED=False,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        for invalidate in (invalidate_intersection_registry, invalidate_signal_cycle_table):
+            invalidate()
+            self.addCleanup(invalidate)
+
+        self.poller = SignalFeedPoller(60)
+        patcher = patch("map.v2x._poller", self.poller)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.routes = {}
+
+    def set_signal(self, status, remaining_sec):
+        self.poller.apply([{
+            "itstId": self.INTERSECTION[0], "trsmUtcTime": int(time.time() * 1000),
+            "ntPdsgStatNm": status, "ntPdsgRmdrCs": remaining_sec * 10,
+        }])
+
+    def respond(self, method, path, body):
+        return 200, {"type": "FeatureCollection", "features": self.routes[json.loads(body)["searchOption"]]}
+
+    def get(self, view, upstream=True, **params):
+        query = {"startX": 127.0, "startY": 37.5, "endX": 127.002, "endY": 37.5, "speed": 1.0, **params}
+        if not upstream:
+            return view.as_view()(APIRequestFactory().get("/", query))
+        with FakeUpstream(self.respond) as server, override_settings(TMAP_PEDESTRIAN_URL=server.url):
+            return view.as_view()(APIRequestFactory().get("/", query))
+
+
+def line(*coords):
+    return {"type": "Feature", "geometry": {"type": "LineString", "coordinates": [list(c) for c in coords]},
+            "properties": {"description": "보행자도로", "time": 0}}
+
+
+def crossing(lon, lat):
+    return {"type": "Feature", "geometry": {"type": "Point", "coordinates": [lon, lat]},
+            "properties": {"description": "횡단보도 후 직진"}}
+
+
+class RankedRouteViewTests(SignalRouteTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        # 0: 교차로(500)를 건너는 짧은 경로 (약 176 m), 10: 횡단보도 없이 돌아가는 긴 경로 (약 220 m)
+        self.routes = {
+            "0": [line((127.0, 37.5), (127.001, 37.5)), crossing(127.001, 37.5), line((127.001, 37.5), (127.002, 37.5))],
+            "10": [line((127.0, 37.5), (127.0, 37.5002), (127.002, 37.5002), (127.002, 37.5))],
+        }
+        SignalCycle.objects.create(itst_id=500, green_sec=30, red_sec=60)
+
+    def test_signal_wait_ranks_shorter_route_second(self):
+        self.set_signal("stop-And-Remain", 60)
+        response = self.get(RankedRouteView)
+        self.assertEqual(response.status_code, 200)
+        first, second = response.data["routes"]
+        self.assertEqual((first["search_option"], first["rank"]), ("10", 1))
+        self.assertEqual((second["search_option"], second["rank"]), ("0", 2))
+        self.assertLess(second["total_distance_m"], first["total_distance_m"])
+        self.assertEqual(first["signal_wait_sec"], 0)
+        # 빨간불 60초 남음 -> 남은 시간 + 초록불 30초
+        self.assertEqual(second["delays"], [{"intersection": "신호 교차로", "delay_sec": 90.0}])
+        self.assertEqual(second["adjusted_time_sec"], round(second["walk_time_sec"] + 90, 2))
+        self.assertLess(first["adjusted_time_sec"], second["adjusted_time_sec"])
+
+    def test_green_light_keeps_shorter_route_first(self):
+        self.set_signal("protected-Movement-Allowed", 120)
+        response = self.get(RankedRouteView)
+        self.assertEqual([route["search_option"] for route in response.data["routes"]], ["0", "10"])
+        self.assertEqual(response.data["routes"][0]["signal_wait_sec"], 0)
+
+
+class DepartureTimeTests(SignalRouteTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.routes = {"0": [line((127.0, 37.5), (127.001, 37.5)), crossing(127.001, 37.5), line((127.001, 37.5), (127.002, 37.5))]}
+        SignalCycle.objects.create(itst_id=500, green_sec=30, red_sec=60)
+
+    def test_best_departure_lands_at_green_start(self):
+        # 100 m 뒤 횡단보도, 빨간불 20초 남음 (초록 30 / 빨강 60) -> 초록불은 20초, 110초, ... 에 시작
+        table = SignalCycleTable([500], [30], [60])
+        status = [{"itstId": "500", "intersectionName": "신호 교차로", "signals": [{"signalColor": "red", "remainingSeconds": 20}]}]
+        profile = departure_profile([100.0, 50.0], status, 1.0, np.arange(0, 61, 5), cycle_table=table)
+
+        self.assertEqual(profile["leave_now"]["signal_wait_sec"], 10.0)
+        # 0 ~ 10초 뒤 출발은 모두 같은 시각에 도착 -> 가장 늦게 출발해 초록불 시작(110초)에 도착하는 10초
+        self.assertEqual(profile["best"]["departure_offset_sec"], 10.0)
+        self.assertEqual(profile["best"]["signal_wait_sec"], 0.0)
+        self.assertEqual(profile["best"]["arrival_offset_sec"], 160.0)
+        self.assertEqual(profile["least_wait"]["departure_offset_sec"], 10.0)
+        # 초록불(110 ~ 140초) 안에 도착하면 대기 없음, 끝난 뒤 도착하면 다음 초록불(200초)까지 대기
+        self.assertEqual(profile["wait_by_offset"][:3], [10.0, 5.0, 0.0])
+        self.assertEqual(profile["wait_by_offset"][8:], [0.0, 55.0, 50.0, 45.0, 40.0])
+
+    def test_view_best_departure(self):
+        self.set_signal("stop-And-Remain", 20)
+        response = self.get(DepartureTimeView, max_offset=60, step=1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["signalized_crossings"], 1)
+        self.assertEqual(len(response.data["wait_by_offset"]), 61)
+        best = response.data["best"]
+        # 횡단보도는 경로 중간 -> 출발 + 걷는 시간 + 대기 = 다음 초록불 시작 (110초)
+        crossing_at = best["departure_offset_sec"] + response.data["walk_time_sec"] / 2 + best["signal_wait_sec"]
+        self.assertAlmostEqual(crossing_at, 110, delta=0.02)
+        self.assertLess(best["signal_wait_sec"], 1)
+        self.assertLess(best["arrival_offset_sec"], response.data["leave_now"]["arrival_offset_sec"] + 1)
+
+    @override_settings(DEPARTURE_MAX_OFFSET=600, DEPARTURE_MAX_CANDIDATES=1000)
+    def test_window_and_step_validation(self):
+        for params in (
+            {"max_offset": -1}, {"max_offset": 601}, {"max_offset": "x"},
+            {"step": 0}, {"step": -5}, {"step": "x"}, {"max_offset": 600, "step": 0.5},
+            {"speed": 0}, {"speed": "fast"},
+        ):
+            # 경로를 요청하기 전에 거부
+            response = self.get(DepartureTimeView, upstream=False, **params)
+            self.assertEqual(response.status_code, 400, params)
+        self.assertEqual(self.get(DepartureTimeView, upstream=False, endY="").status_code, 400)
+
+
+class IntersectionRegistryReloadTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.csv = Path(directory.name) / "location.csv"
+        settings_override = override_settings(
+            MAP_LOCATION_CSV=self.csv, MAP_DATA_VERSION_FILE=Path(directory.name) / ".version"
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        invalidate_intersection_registry()
+        self.addCleanup(invalidate_intersection_registry)
+
+    def write(self, rows, mtime_ns):
+        # BOM 포함 UTF-8 (원본 location.csv 와 같은 형식), 좌표가 없는 행은 건너뜀
+        self.csv.write_text(
+            "\ufeffitstId,itstNm,mapCtptIntLat,mapCtptIntLot\n" + "".join(f"{row}\n" for row in rows), encoding="utf-8"
+        )
+        os.utime(self.csv, ns=(mtime_ns, mtime_ns))
+
+    def test_reload_on_csv_change(self):
+        self.write(["1,첫 교차로,37.5,127.0", "2,좌표 없음,,"], 1_000_000_000)
+        registry = get_intersection_registry()
+        self.assertEqual(registry.name("1"), "첫 교차로")
+        self.assertEqual(len(registry), 1)
+        self.assertIs(get_intersection_registry(), registry)
+
+        self.write(["1,바뀐 이름,37.5,127.0", "3,새 교차로,37.6,127.1"], 2_000_000_000)
+        reloaded = get_intersection_registry()
+        self.assertIsNot(reloaded, registry)
+        self.assertEqual(reloaded.name(1), "바뀐 이름")
+        record, distance = reloaded.nearest(37.6, 127.1)
+        self.assertEqual((record["itstId"], record["name"], distance), ("3", "새 교차로", 0.0))
+
+    def test_reload_on_data_version_bump(self):
+        self.write(["1,첫 교차로,37.5,127.0"], 1_000_000_000)
+        registry = get_intersection_registry()
+
+        # mtime 을 그대로 두고 내용만 바꾸면 데이터 버전이 올라갈 때 다시 읽음
+        self.write(["1,가져온 이름,37.5,127.0"], 1_000_000_000)
+        self.assertIs(get_intersection_registry(), registry)
+        bump_data_version("map")
+        self.assertEqual(get_intersection_registry().name("1"), "가져온 이름")
+
+        # 파일이 사라지면 기존 데이터 유지
+        self.csv.unlink()
+        self.assertEqual(get_intersection_registry().name("1"), "가져온 이름")
+
+
+class SignalCycleVersionTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings_override = override_settings(
+            MAP_DATA_VERSION_FILE=self.directory / ".version",
+            SIGNAL_CYCLE_VERSION_FILE=self.directory / ".cycles-version",
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        invalidate_signal_cycle_table()
+        self.addCleanup(invalidate_signal_cycle_table)
+
+    def import_cycles(self, rows):
+        path = self.directory / "cycles.csv"
+        path.write_text("itstId,greenSec,redSec\n" + "".join(f"{row}\n" for row in rows), encoding="utf-8")
+        call_command("import_signal_cycles", str(path), stdout=StringIO(), stderr=StringIO())
+
+    def test_import_only_reloads_cycle_table(self):
+        map_version = bump_data_version()
+        self.import_cycles(["1,30,60"])
+        self.assertEqual(get_data_version(), map_version)
+        self.assertEqual(get_signal_cycle_table().lookup(["1"])[0].tolist(), [30.0])
+
+        # 다시 가져오면 신호 주기 버전만 바뀌고 테이블이 새로 로드됨
+        cycles_version = get_data_version("cycles")
+        time.sleep(0.01)
+        self.import_cycles(["1,25,65"])
+        self.assertNotEqual(get_data_version("cycles"), cycles_version)
+        self.assertEqual(get_data_version(), map_version)
+        self.assertEqual(get_signal_cycle_table().lookup(["1"])[1].tolist(), [65.0])
+
+
+class ImportTrafficLightsTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings_override = override_settings(MAP_DATA_VERSION_FILE=self.directory / ".version")
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def import_lights(self, rows, *args):
+        path = self.directory / "location.csv"
+        path.write_text(
+            "itstId,itstNm,mapCtptIntLat,mapCtptIntLot\n" + "".join(f"{row}\n" for row in rows), encoding="utf-8"
+        )
+        out = StringIO()
+        call_command("import_traffic_lights", str(path), "--bulk", *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_bulk_import_skips_unchanged_rows(self):
+        rows = ["1,교차로1,37.5,127.0", "2,교차로2,37.51,127.01"]
+        self.assertIn("2 new, 0 updated, 0 unchanged", self.import_lights(rows))
+        version = get_data_version()
+
+        # 같은 내용을 다시 가져오면 아무것도 바꾸지 않고 캐시 버전도 그대로
+        self.assertIn("0 new, 0 updated, 2 unchanged", self.import_lights(rows))
+        self.assertEqual(get_data_version(), version)
+
+        output = self.import_lights(["1,교차로1,37.5,127.0", "2,교차로2*,37.51,127.01", "3,교차로3,37.52,127.02"])
+        self.assertIn("1 new, 1 updated, 1 unchanged", output)
+        self.assertEqual(TrafficLight.objects.get(itst_id=2).name, "교차로2*")
+
+    def test_dry_run_does_not_write(self):
+        output = self.import_lights(["1,교차로1,37.5,127.0"], "--dry-run")
+        self.assertIn("+ 1: 교차로1 (37.5, 127.0)", output)
+        self.assertFalse(TrafficLight.objects.exists())
+
+
+class PedestrianGraphTests(SimpleTestCase):
+    def setUp(self):
+        # A -(횡단보도, 신호 7)- B 직선과, C 를 거쳐 돌아가는 길
+        builder = PedestrianGraphBuilder()
+        self.a, self.b, self.c = [127.0, 37.5], [127.001, 37.5], [127.0005, 37.501]
+        builder.add_line([self.a, self.b], crosswalk=True)
+        builder.add_line([self.a, self.c, self.b])
+        graph = builder.build([{"itst_id": 7, "latitude": 37.5, "longitude": 127.0005}])
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / "graph.bin"
+        graph.save(path)
+        self.graph = PedestrianGraph.load(path)
+        self.source = self.graph.snap(37.5, 127.0, 5)[0]
+        self.target = self.graph.snap(37.5, 127.001, 5)[0]
+
+    def test_load_round_trip(self):
+        self.assertEqual((len(self.graph), self.graph.edge_count), (3, 3))
+        edges = list(self.graph.neighbors(self.source))
+        self.assertEqual(len(edges), 2)
+        lights = {neighbor: light for _, neighbor, _, light in edges}
+        self.assertEqual(lights[self.target], 7)
+        self.assertIsNone(self.graph.snap(37.6, 127.0, 50))
+
+    def test_signal_wait_changes_fastest_path(self):
+        nodes, _, arrival = self.graph.shortest_path(self.source, self.target, 1.0)
+        self.assertEqual(nodes, [self.source, self.target])
+        self.assertAlmostEqual(arrival, haversine(37.5, 127.0, 37.5, 127.001), delta=0.01)
+
+        # 횡단보도 신호 대기가 돌아가는 시간보다 길면 돌아감
+        nodes, _, _ = self.graph.shortest_path(self.source, self.target, 1.0, wait=lambda its_id, arrival_sec: 1000.0)
+        self.assertEqual(len(nodes), 3)
+        nodes, _, _ = self.graph.shortest_path(self.source, self.target, 1.0, wait=lambda its_id, arrival_sec: 1.0)
+        self.assertEqual(len(nodes), 2)
+
+
+class SignalCycleOffsetTests(TestCase):
+    def test_table_loads_offset(self):
+        SignalCycle.objects.create(itst_id=1, green_sec=30, red_sec=60, offset_sec=15, source="inferred")
+        SignalCycle.objects.create(itst_id=2, green_sec=20, red_sec=40)
+        green, red, offset = SignalCycleTable.from_db().lookup_schedule(["2", "1", "3"])
+        self.assertEqual(green[:2].tolist(), [20.0, 30.0])
+        self.assertTrue(np.isnan(offset[0]))
+        self.assertEqual(offset[1], 15.0)
+        self.assertTrue(np.isnan(offset[2]))
+
+    def test_scheduled_phases(self):
+        # 주기 90초 (초록 30 / 빨강 60), Unix 시각 mod 90 == 15 일 때 초록불 시작
+        now = 9000 + 15 + 10
+        phase, remaining = scheduled_phases(
+            [PHASE_UNKNOWN, PHASE_UNKNOWN, PHASE_RED, PHASE_UNKNOWN],
+            [np.nan, np.nan, 7.0, np.nan],
+            [30, 30, 30, 30], [60, 60, 60, 60], [15, 15 + 50, 15, np.nan], now=now,
+        )
+        self.assertEqual(phase.tolist(), [PHASE_GREEN, PHASE_RED, PHASE_RED, PHASE_UNKNOWN])
+        # 초록 시작 10초 뒤 -> 초록 20초 남음, 초록 시작 50초 뒤(= 빨강 20초째) -> 빨강 40초 남음, 실시간 값은 그대로
+        self.assertEqual(remaining[:3].tolist(), [20.0, 40.0, 7.0])
+        self.assertTrue(np.isnan(remaining[3]))
+
+    def test_offset_is_used_without_live_status(self):
+        table = SignalCycleTable([1], [30], [60], [0])
+        status = [{"itstId": "1", "intersectionName": "교차로1", "signals": []}]
+        with patch("map.cycles.time.time", return_value=9000 + 35):
+            # 지금은 주기 35초째 (빨강 55초 남음)
+            result = expected_time([10.0], status, 1.0, cycle_table=table)
+            profile = departure_profile([10.0], status, 1.0, [0, 45], cycle_table=table)
+        # crossing_waits: 빨간불이면 남은 시간 + 초록불 주기
+        self.assertEqual(result["delays"][0]["delay_sec"], 85.0)
+        # cycle_waits: 10초 뒤 도착하면 주기 45초째 -> 다음 초록까지 45초, 45초 늦게 출발하면 초록 시작에 도착
+        self.assertEqual(profile["wait_by_offset"], [45.0, 0.0])
+
+        # 주기 정보만 있고 위상을 모르면 대기시간 0
+        table = SignalCycleTable([1], [30], [60])
+        self.assertEqual(expected_time([10.0], status, 1.0, cycle_table=table)["delays"][0]["delay_sec"], 0)
+
+
+class PhaseHistoryFlushTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+
+    def rows(self, t_ms, n=3):
+        return [np.full(n, t_ms), np.arange(n), np.zeros(n), np.full(n, 2), np.full(n, 100)]
+
+    def test_flush_on_row_count(self):
+        store = PhaseHistoryStore(self.root, flush_rows=5, flush_interval=3600)
+        t_ms = 1_700_000_000_000
+        store.append(self.rows(t_ms))
+        self.assertEqual(store.stats()["written_rows"], 0)
+        store.append(self.rows(t_ms + 1000))
+        self.assertEqual(store.stats()["written_rows"], 6)
+        self.assertEqual(len(store.read()["t"]), 6)
+
+    def test_flush_on_age(self):
+        store = PhaseHistoryStore(self.root, flush_rows=1000, flush_interval=0.05)
+        t_ms = 1_700_000_000_000
+        store.append(self.rows(t_ms))
+        self.assertEqual(store.stats()["buffered_rows"], 3)
+        time.sleep(0.06)
+        store.append(self.rows(t_ms + 1000))
+        stats = store.stats()
+        self.assertEqual((stats["buffered_rows"], stats["written_rows"]), (0, 6))
+
+
+class MetricsTests(TestCase):
+    def query_count(self):
+        _, count, total = REQUEST_DB_QUERIES.labels("unmatched").snapshot()
+        return count, total
+
+    def test_async_requests_count_queries_on_existing_connections(self):
+        # 지표 모듈보다 먼저 만들어진 연결처럼 execute_wrapper 가 없는 상태에서 시작
+        connection.ensure_connection()
+        if count_queries in connection.execute_wrappers:
+            connection.execute_wrappers.remove(count_queries)
+
+        async def view(request):
+            await sync_to_async(lambda: list(TrafficLight.objects.all()))()
+            await sync_to_async(lambda: TrafficLight.objects.count())()
+            return HttpResponse("ok")
+
+        before = self.query_count()
+        response = async_to_sync(MetricsMiddleware(view))(RequestFactory().get("/"))
+        self.assertEqual(response.status_code, 200)
+        after = self.query_count()
+        self.assertEqual((after[0] - before[0], after[1] - before[1]), (1, 2))
+
+    def test_metrics_endpoint_is_disabled_by_default(self):
+        self.assertEqual(metrics_view(RequestFactory().get("/metrics")).status_code, 404)
+        with override_settings(METRICS_ENABLED=True):
+            response = metrics_view(RequestFactory().get("/metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"http_request_duration_seconds", response.content)
@@ -0,0 +1,250 @@
+import json
+import threading
+from collections import OrderedDict
+from math import floor, log2
+
+import numpy as np
+from django.conf import settings
+
+from .artifact import EncodedBody, JSON_CONTENT_TYPE
+from .spatial import get_traffic_light_index
+
+# 인덱스에 저장하는 가장 세밀한 타일 줌 (타일 x, y 를 비트 교차(quadkey)한 값이 uint64 에 들어감)
+MAX_TILE_ZOOM = 22
+MAX_LATITUDE = 85.05112878
+
+# bbox 조회 시 훑어보는 타일 수 상한
+BBOX_MAX_TILES = 16
+
+
+def lonlat_to_tile(lats, lons, zoom):
+    """위경도 배열 -> 웹 메르카토르 타일 (x, y) 배열"""
+    lats = np.clip(np.asarray(lats, dtype=float), -MAX_LATITUDE, MAX_LATITUDE)
+    lons = np.asarray(lons, dtype=float)
+    n = 2 ** zoom
+    x = np.floor((lons + 180.0) / 360.0 * n)
+    lat_rad = np.radians(lats)
+    y = np.floor((1.0 - np.arcsinh(np.tan(lat_rad)) / np.pi) / 2.0 * n)
+    return np.clip(x, 0, n - 1).astype(np.uint64), np.clip(y, 0, n - 1).astype(np.uint64)
+
+
+def tile_bounds(z, x, y):
+    """타일의 (south, west, north, east)"""
+    n = 2 ** z
+
+    def lat(row):
+        return float(np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * row / n)))))
+
+    return lat(y + 1), x / n * 360.0 - 180.0, lat(y), (x + 1) / n * 360.0 - 180.0
+
+
+def _spread_bits(v):
+    """32비트 정수의 비트 사이에 0 을 끼워 넣음 (quadkey 계산용)"""
+    v = v & np.uint64(0x00000000FFFFFFFF)
+    v = (v | (v << np.uint64(16))) & np.uint64(0x0000FFFF0000FFFF)
+    v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF00FF00FF)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x3333333333333333)
+    v = (v | (v << np.uint64(1))) & np.uint64(0x5555555555555555)
+    return v
+
+
+def quadkey(x, y):
+    """타일 (x, y) -> quadkey 정수 (같은 상위 타일에 속한 타일들은 연속된 값)"""
+    return _spread_bits(np.asarray(x, dtype=np.uint64)) | (_spread_bits(np.asarray(y, dtype=np.uint64)) << np.uint64(1))
+
+
+class TileIndex:
+    """
+    신호등을 MAX_TILE_ZOOM 타일 quadkey 순으로 정렬해둔 인덱스
+    - 줌 z 타일 하나에 속한 신호등은 정렬된 배열에서 연속 구간이라 searchsorted 두 번으로 찾음
+    - 한 타일/bbox 에 max_points 개보다 많으면 하위 타일 단위로 묶어(clustering) 개수와 중심만 반환
+    """
+
+    def __init__(self, lights, version=0, max_points=500, cluster_depth=3, cache_size=1024):
+        self.version = version
+        self.max_points = max_points
+        self.cluster_depth = cluster_depth
+        lats = np.array([light["latitude"] for light in lights], dtype=float)
+        lons = np.array([light["longitude"] for light in lights], dtype=float)
+        codes = quadkey(*lonlat_to_tile(lats, lons, MAX_TILE_ZOOM))
+        order = np.argsort(codes, kind="stable")
+        self.lights = [lights[i] for i in order]
+        self.codes = codes[order]
+        self.lats = lats[order]
+        self.lons = lons[order]
+        # 구간 좌표 합 계산용 누적합 (묶음 중심 계산)
+        self._lat_sums = np.concatenate(([0.0], np.cumsum(self.lats)))
+        self._lon_sums = np.concatenate(([0.0], np.cumsum(self.lons)))
+
+        self._cache = OrderedDict()
+        self._cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.lights)
+
+    def tile_range(self, z, x, y):
+        """줌 z 타일 (x, y) 에 속한 신호등의 정렬 배열 구간 [start, end)"""
+        shift = np.uint64(2 * (MAX_TILE_ZOOM - z))
+        low = quadkey(x, y) << shift
+        high = low + (np.uint64(1) << shift)
+        return int(np.searchsorted(self.codes, low)), int(np.searchsorted(self.codes, high))
+
+    def _lights(self, indices):
+        return {"clustered": False, "count": len(indices), "lights": [self.lights[i] for i in indices]}
+
+    def _clusters(self, group_codes, cluster_zoom, bbox=None):
+        """
+        cluster_zoom 하위 타일(group_codes) 단위로 묶은 결과
+        - 하위 타일별 개수/좌표 합은 searchsorted + 누적합으로 구하므로 신호등 수와 무관하게 하위 타일 수에만 비례
+        - bbox 가 주어지면 중심이 bbox 안에 있는 묶음만 포함
+        """
+        shift = np.uint64(2 * (MAX_TILE_ZOOM - cluster_zoom))
+        lows = np.asarray(group_codes, dtype=np.uint64) << shift
+        starts = np.searchsorted(self.codes, lows)
+        ends = np.searchsorted(self.codes, lows + (np.uint64(1) << shift))
+        counts = ends - starts
+        nonempty = counts > 0
+        starts, ends, counts = starts[nonempty], ends[nonempty], counts[nonempty]
+        lat_means = (self._lat_sums[ends] - self._lat_sums[starts]) / counts
+        lon_means = (self._lon_sums[ends] - self._lon_sums[starts]) / counts
+
+        if bbox is not None:
+            south, west, north, east = bbox
+            inside = (lat_means >= south) & (lat_means <= north) & (lon_means >= west) & (lon_means <= east)
+            starts, counts, lat_means, lon_means = starts[inside], counts[inside], lat_means[inside], lon_means[inside]
+
+        lights, clusters = [], []
+        for start, count, lat, lon in zip(starts.tolist(), counts.tolist(), lat_means.tolist(), lon_means.tolist()):
+            if count == 1:
+                lights.append(self.lights[start])
+            else:
+                clusters.append({"latitude": lat, "longitude": lon, "count": count})
+        return {"clustered": True, "count": int(counts.sum()), "lights": lights, "clusters": clusters}
+
+    def tile(self, z, x, y):
+        """타일 응답 본문 (EncodedBody), 타일별로 LRU 캐시"""
+        key = (z, x, y)
+        with self._lock:
+            encoded = self._cache.get(key)
+            if encoded is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return encoded
+
+        start, end = self.tile_range(z, x, y)
+        if end - start <= self.max_points:
+            payload = self._lights(range(start, end))
+        else:
+            # 타일 하나를 2^depth x 2^depth 하위 타일로 나눠 묶음
+            depth = min(self.cluster_depth, MAX_TILE_ZOOM - z)
+            base = quadkey(x, y) << np.uint64(2 * depth)
+            payload = self._clusters(base + np.arange(4 ** depth, dtype=np.uint64), z + depth)
+        encoded = encode_json({"z": z, "x": x, "y": y, **payload})
+
+        with self._lock:
+            self.misses += 1
+            self._cache[key] = encoded
+            while len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        return encoded
+
+    def bbox(self, south, west, north, east):
+        """
+        bbox 안의 신호등 응답 본문 (EncodedBody)
+        - bbox 를 BBOX_MAX_TILES 개 이하 타일로 덮는 줌을 골라 타일 구간만 확인한 뒤 좌표로 정확히 필터링
+        - 덮는 타일들의 신호등이 max_points 개를 넘으면 하위 타일 단위로 묶음 (중심이 bbox 안인 묶음만)
+        """
+        zoom, tiles, ranges = self._bbox_tiles(south, west, north, east)
+        if sum(end - start for start, end in ranges) <= self.max_points:
+            payload = self._lights(self._filter_bbox(ranges, south, west, north, east))
+        else:
+            depth = min(self.cluster_depth, MAX_TILE_ZOOM - zoom)
+            sub_tiles = np.arange(4 ** depth, dtype=np.uint64)
+            group_codes = np.concatenate([
+                (quadkey(x, y) << np.uint64(2 * depth)) + sub_tiles
+                for (x, y), (start, end) in zip(tiles, ranges) if start < end
+            ])
+            payload = self._clusters(group_codes, zoom + depth, bbox=(south, west, north, east))
+        return encode_json({"bbox": [west, south, east, north], **payload})
+
+    def _bbox_tiles(self, south, west, north, east):
+        """bbox 를 덮는 타일들의 (줌, [(x, y)], [정렬 배열 구간])"""
+        zoom = bbox_zoom(south, west, north, east)
+        min_x, min_y = (int(v) for v in lonlat_to_tile(north, west, zoom))
+        max_x, max_y = (int(v) for v in lonlat_to_tile(south, east, zoom))
+        tiles = [(x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1)]
+        return zoom, tiles, [self.tile_range(zoom, x, y) for x, y in tiles]
+
+    def _filter_bbox(self, ranges, south, west, north, east):
+        """타일 구간들 중 좌표가 bbox 안인 신호등 인덱스 (정렬 순)"""
+        indices = np.concatenate([np.arange(start, end) for start, end in ranges])
+        mask = (
+            (self.lats[indices] >= south) & (self.lats[indices] <= north)
+            & (self.lons[indices] >= west) & (self.lons[indices] <= east)
+        )
+        return np.sort(indices[mask])
+
+    def lights_in_bbox(self, south, west, north, east):
+        """bbox 안의 신호등 리스트 (묶지 않음)"""
+        _, _, ranges = self._bbox_tiles(south, west, north, east)
+        return [self.lights[i] for i in self._filter_bbox(ranges, south, west, north, east)]
+
+
+def bbox_zoom(south, west, north, east):
+    """bbox 가 BBOX_MAX_TILES 개 이하 타일에 걸치는 가장 큰 줌"""
+    span = max(east - west, 1e-9)
+    zoom = max(0, min(MAX_TILE_ZOOM, floor(log2(360.0 / span)) + 1))
+    while zoom > 0:
+        min_x, min_y = lonlat_to_tile(north, west, zoom)
+        max_x, max_y = lonlat_to_tile(south, east, zoom)
+        if (int(max_x) - int(min_x) + 1) * (int(max_y) - int(min_y) + 1) <= BBOX_MAX_TILES:
+            break
+        zoom -= 1
+    return zoom
+
+
+def encode_json(payload):
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":"), allow_nan=False).encode("utf-8")
+    return EncodedBody(body, JSON_CONTENT_TYPE)
+
+
+_tile_index = None
+_tile_index_lock = threading.Lock()
+
+
+def get_tile_index():
+    """프로세스 공용 타일 인덱스 (신호등 공간 인덱스와 같은 데이터 버전으로 다시 생성)"""
+    global _tile_index
+    light_index = get_traffic_light_index()
+    tile_index = _tile_index
+    if tile_index is not None and tile_index.version == light_index.version:
+        return tile_index
+
+    with _tile_index_lock:
+        if _tile_index is None or _tile_index.version != light_index.version:
+            _tile_index = TileIndex(
+                light_index.lights,
+                version=light_index.version,
+                max_points=getattr(settings, "MAP_TILE_MAX_POINTS", 500),
+                cluster_depth=getattr(settings, "MAP_TILE_CLUSTER_DEPTH", 3),
+                cache_size=getattr(settings, "MAP_TILE_CACHE_SIZE", 1024),
+            )
+        return _tile_index
+
+
+def tile_cache_stats():
+    """타일 응답 캐시 통계 (타일 인덱스가 아직 없으면 None)"""
+    tile_index = _tile_index
+    if tile_index is None:
+        return None
+    return {"hits": tile_index.hits, "misses": tile_index.misses, "entries": len(tile_index._cache)}
+
+
+def invalidate_tile_index():
+    global _tile_index
+    with _tile_index_lock:
+        _tile_index = None
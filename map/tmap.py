@@ -0,0 +1,313 @@
+import asyncio
+import codecs
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import aiohttp
+import requests
+from django.conf import settings
+
+from . import async_upstream, upstream
+from .graph import record_route_geometry
+from .routecache import get_route_cache, route_cache_key
+
+PEDESTRIAN_ROUTE_URL = "https://apis.openapi.sk.com/tmap/routes/pedestrian?version=1"
+
+# 경로 종류 -> TMAP searchOption
+ROUTE_OPTIONS = {
+    "recommended": "0",
+    "alternative": "10",
+}
+
+# TMAP 도보 경로 searchOption 이름 (0: 추천, 4: 추천+대로우선, 10: 최단, 30: 최단+계단제외)
+SEARCH_OPTION_NAMES = {
+    "0": "recommended",
+    "4": "main_road",
+    "10": "alternative",
+    "30": "no_stairs",
+}
+
+CROSSING_KEYWORDS = ("횡단보도", "건널목", "교차로")
+
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+_FEATURES_KEY = re.compile(r'"features"\s*:\s*\[')
+_WHITESPACE = re.compile(r'[\s,]*')
+
+
+class FeatureStream:
+    """
+    TMAP 응답(GeoJSON FeatureCollection) 바이트 청크에서 features 배열 원소를 하나씩 꺼내는 파서
+    - 청크마다 NUL(\x00) 문자를 제거하므로 응답 전체 문자열 복사본을 만들지 않음
+    - 순회가 끝난 뒤 found 가 False 면 응답에 features 가 없었던 것
+    - JSON 이 깨져 있으면 json.JSONDecodeError
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.buffer = ""
+        self.exhausted = False
+        self.found = False
+
+    def _fill(self):
+        if self.exhausted:
+            return False
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.exhausted = True
+            text = self.decoder.decode(b"", final=True)
+        else:
+            text = self.decoder.decode(chunk)
+        self.buffer += text.replace('\x00', '')
+        return True
+
+    def __iter__(self):
+        decoder = json.JSONDecoder()
+
+        # 1. "features": [ 위치 찾기
+        match = _FEATURES_KEY.search(self.buffer)
+        while match is None:
+            if not self._fill():
+                return
+            match = _FEATURES_KEY.search(self.buffer)
+        self.found = True
+        self.buffer = self.buffer[match.end():]
+        pos = 0
+
+        # 2. 배열 원소를 하나씩 디코딩
+        while True:
+            pos = _WHITESPACE.match(self.buffer, pos).end()
+            if pos >= len(self.buffer):
+                if not self._fill():
+                    raise json.JSONDecodeError("Unterminated features array", self.buffer, pos)
+                continue
+            if self.buffer[pos] == "]":
+                return
+
+            while True:
+                try:
+                    feature, pos = decoder.raw_decode(self.buffer, pos)
+                    break
+                except json.JSONDecodeError:
+                    # 아직 덜 받은 feature: 남은 길이의 두 배가 될 때까지 더 읽고 다시 시도
+                    pending = len(self.buffer) - pos
+                    while len(self.buffer) - pos < 2 * pending and self._fill():
+                        pass
+                    if self.exhausted and len(self.buffer) - pos == pending:
+                        raise
+            yield feature
+
+            # 처리한 앞부분은 버려서 버퍼가 응답 전체 크기로 커지지 않게 함
+            if pos > STREAM_CHUNK_SIZE:
+                self.buffer = self.buffer[pos:]
+                pos = 0
+
+
+def parse_route_stream(chunks):
+    """스트리밍 파싱 결과를 FeatureCollection dict 로 반환 (features 가 없으면 빈 dict)"""
+    stream = FeatureStream(chunks)
+    features = list(stream)
+    if not stream.found:
+        return {}
+    return {"type": "FeatureCollection", "features": features}
+
+
+COMPACT_PROPERTIES = {"index", "pointType", "turnType", "description", "distance", "time", "totalDistance", "totalTime"}
+
+
+def compact_route(tmap_data):
+    """tmap_raw 용 축약본: geometry 와 주요 properties 만 남김"""
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "geometry": feature.get("geometry"),
+                "properties": {
+                    key: value for key, value in feature.get("properties", {}).items()
+                    if key in COMPACT_PROPERTIES
+                },
+            }
+            for feature in tmap_data.get("features", [])
+        ],
+    }
+
+
+
+def extract_route(tmap_data):
+    """
+    TMAP 응답에서 경로 좌표, 횡단보도/교차로 지점, TMAP 예상 시간 추출
+    - all_coords: LineString 좌표를 이어붙인 목록, crossings: [{"lat", "lng", "description"}, ...]
+    """
+    all_coords = []
+    crossings = []
+    total_time_sec = 0
+
+    for feature in tmap_data.get("features", []):
+        geometry = feature.get("geometry", {})
+        properties = feature.get("properties", {})
+        description = properties.get("description", "")
+
+        if geometry.get("type") == "LineString":
+            line_coords = geometry.get("coordinates", [])
+            all_coords.extend(line_coords)
+            total_time_sec += properties.get("time", 0)
+
+        if geometry.get("type") == "Point" and any(kw in description for kw in CROSSING_KEYWORDS):
+            point = geometry.get("coordinates")
+            crossings.append({"lat": point[1], "lng": point[0], "description": description})
+
+    return {
+        "all_coords": all_coords,
+        "crossings": crossings,
+        "total_time_sec": total_time_sec
+    }
+
+
+def build_route_body(startX, startY, endX, endY, option):
+    return {
+        "startX": startX,
+        "startY": startY,
+        "endX": endX,
+        "endY": endY,
+        "reqCoordType": "WGS84GEO",
+        "resCoordType": "WGS84GEO",
+        "startName": "출발지",
+        "endName": "도착지",
+        "searchOption": option
+    }
+
+
+def route_request(startX, startY, endX, endY, option):
+    """TMAP 도보 경로 요청의 (url, headers, body)"""
+    headers = {
+        "appKey": settings.TMAP_API_KEY,
+        "Content-Type": "application/json"
+    }
+    url = getattr(settings, "TMAP_PEDESTRIAN_URL", PEDESTRIAN_ROUTE_URL)
+    return url, headers, build_route_body(startX, startY, endX, endY, option)
+
+
+def fetch_pedestrian_route(startX, startY, endX, endY, option="0", timeout=5):
+    """
+    TMAP 도보 경로 1건 요청
+    - 실패 시 requests.RequestException, 응답 JSON 이 깨졌으면 json.JSONDecodeError
+    """
+    url, headers, body = route_request(startX, startY, endX, endY, option)
+
+    # 응답 전체를 문자열로 만들지 않고 스트리밍으로 feature 단위 파싱
+    with upstream.post(upstream.TMAP, url, headers=headers, json=body, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        data = parse_route_stream(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+    record_route_geometry(data)
+    return data
+
+
+def fetch_pedestrian_route_cached(startX, startY, endX, endY, option="0", timeout=5):
+    """
+    경로 캐시를 거쳐 TMAP 도보 경로 요청
+    - 출발/도착 좌표를 ROUTE_CACHE_GRID_M 격자로 맞춘 값 + searchOption 을 키로 사용
+    """
+    if not getattr(settings, "ROUTE_CACHE_ENABLED", True):
+        return fetch_pedestrian_route(startX, startY, endX, endY, option, timeout)
+
+    try:
+        key = route_cache_key(startX, startY, endX, endY, option, getattr(settings, "ROUTE_CACHE_GRID_M", 10))
+    except (TypeError, ValueError):
+        # 좌표가 숫자가 아니면 캐시 없이 그대로 요청 (TMAP 이 오류 응답)
+        return fetch_pedestrian_route(startX, startY, endX, endY, option, timeout)
+
+    return get_route_cache().get_or_fetch(
+        key, lambda: fetch_pedestrian_route(startX, startY, endX, endY, option, timeout)
+    )
+
+
+async def afetch_pedestrian_route(startX, startY, endX, endY, option="0", timeout=5):
+    """
+    fetch_pedestrian_route 의 비동기 버전
+    - 실패 시 aiohttp.ClientError (시간 초과는 TimeoutError), 응답 JSON 이 깨졌으면 json.JSONDecodeError
+    """
+    url, headers, body = route_request(startX, startY, endX, endY, option)
+    content = await async_upstream.post(upstream.TMAP, url, headers=headers, json=body, timeout=timeout)
+    data = parse_route_stream([content])
+    record_route_geometry(data)
+    return data
+
+
+async def afetch_pedestrian_route_cached(startX, startY, endX, endY, option="0", timeout=5):
+    """fetch_pedestrian_route_cached 의 비동기 버전 (같은 경로 캐시 사용)"""
+    def fetch():
+        return afetch_pedestrian_route(startX, startY, endX, endY, option, timeout)
+
+    if not getattr(settings, "ROUTE_CACHE_ENABLED", True):
+        return await fetch()
+
+    try:
+        key = route_cache_key(startX, startY, endX, endY, option, getattr(settings, "ROUTE_CACHE_GRID_M", 10))
+    except (TypeError, ValueError):
+        return await fetch()
+
+    return await get_route_cache().aget_or_fetch(key, fetch)
+
+
+def fetch_pedestrian_routes(startX, startY, endX, endY, options=("0", "10"), timeout=None):
+    """
+    여러 searchOption 을 동시에 요청
+    - 반환: {option: {"data": ...}} 또는 실패한 옵션은 {option: {"error": ..., "details": ...}}
+    - 한 옵션이 실패/시간 초과해도 나머지 옵션 결과는 그대로 반환 (부분 결과)
+    - 요청마다 옵션 수만큼 스레드를 따로 써서 다른 요청에 밀려 대기하는 일이 없음 (TMAP_MAX_WORKERS 가 상한)
+    """
+    timeout = timeout if timeout is not None else settings.TMAP_TIMEOUT
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, min(len(options), settings.TMAP_MAX_WORKERS)),
+        thread_name_prefix="tmap",
+    )
+    try:
+        futures = {
+            option: executor.submit(fetch_pedestrian_route_cached, startX, startY, endX, endY, option, timeout)
+            for option in options
+        }
+
+        # 요청 자체의 timeout 외에 전체 대기 시간도 제한 (모든 옵션이 바로 시작하므로 마감 시각은 공통)
+        deadline = time.monotonic() + timeout + 1
+        results = {}
+        for option, future in futures.items():
+            try:
+                results[option] = {"data": future.result(timeout=max(0, deadline - time.monotonic()))}
+            except json.JSONDecodeError as e:
+                results[option] = {"error": "Invalid JSON response from TMAP", "details": str(e)}
+            except FutureTimeoutError:
+                results[option] = {"error": "TMAP 도보 경로 요청 실패", "details": "요청 시간이 초과되었습니다."}
+            except requests.RequestException as e:
+                results[option] = {"error": "TMAP 도보 경로 요청 실패", "details": str(e)}
+        return results
+    finally:
+        # 시간 초과로 남은 요청은 기다리지 않음 (requests timeout 이 지나면 스레드도 끝남)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def afetch_pedestrian_routes(startX, startY, endX, endY, options=("0", "10"), timeout=None):
+    """
+    fetch_pedestrian_routes 의 비동기 버전 (결과 형식 동일)
+    - 옵션별 요청을 asyncio.gather 로 동시에 보내고, 각각 timeout + 1 초가 지나면 취소
+    """
+    timeout = timeout if timeout is not None else settings.TMAP_TIMEOUT
+
+    async def fetch(option):
+        try:
+            data = await asyncio.wait_for(
+                afetch_pedestrian_route_cached(startX, startY, endX, endY, option, timeout), timeout + 1
+            )
+            return {"data": data}
+        except json.JSONDecodeError as e:
+            return {"error": "Invalid JSON response from TMAP", "details": str(e)}
+        except TimeoutError:
+            return {"error": "TMAP 도보 경로 요청 실패", "details": "요청 시간이 초과되었습니다."}
+        except aiohttp.ClientError as e:
+            return {"error": "TMAP 도보 경로 요청 실패", "details": str(e)}
+
+    results = await asyncio.gather(*(fetch(option) for option in options))
+    return dict(zip(options, results))
@@ -0,0 +1,111 @@
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .metrics import observe_upstream
+
+# 외부 API 이름 (통계 구분용)
+TMAP = "tmap"
+V2X = "v2x"
+
+
+class UpstreamStats:
+    """외부 API 별 호출 수 / 오류 수 / 누적 소요시간"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def record(self, name, elapsed, error=False):
+        observe_upstream(name, elapsed, error)
+        with self._lock:
+            stat = self._stats.setdefault(name, {"count": 0, "errors": 0, "total_sec": 0.0, "max_sec": 0.0})
+            stat["count"] += 1
+            stat["errors"] += int(error)
+            stat["total_sec"] += elapsed
+            stat["max_sec"] = max(stat["max_sec"], elapsed)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: dict(
+                    stat,
+                    avg_sec=stat["total_sec"] / stat["count"] if stat["count"] else 0.0,
+                )
+                for name, stat in self._stats.items()
+            }
+
+
+stats = UpstreamStats()
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def build_session():
+    """
+    keep-alive 커넥션 풀을 쓰는 세션
+    - 호스트별로 최대 UPSTREAM_POOL_MAXSIZE 개 커넥션 재사용
+    - GET 같은 멱등 요청만 지터(jitter)가 들어간 지수 백오프로 재시도
+      (연결 실패, 502/503/504 응답만 재시도하고 읽기 timeout 은 재시도하지 않음)
+    """
+    retry = Retry(
+        total=getattr(settings, "UPSTREAM_RETRIES", 2),
+        connect=getattr(settings, "UPSTREAM_RETRIES", 2),
+        read=0,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD", "OPTIONS"}),
+        backoff_factor=getattr(settings, "UPSTREAM_BACKOFF", 0.2),
+        backoff_jitter=getattr(settings, "UPSTREAM_BACKOFF_JITTER", 0.2),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=getattr(settings, "UPSTREAM_POOL_CONNECTIONS", 10),
+        pool_maxsize=getattr(settings, "UPSTREAM_POOL_MAXSIZE", 20),
+        max_retries=retry,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(name):
+    session = _sessions.get(name)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(name)
+            if session is None:
+                session = _sessions[name] = build_session()
+    return session
+
+
+def request(name, method, url, **kwargs):
+    """
+    공용 세션으로 외부 API 호출 후 소요시간 기록
+    - 예외는 그대로 전달 (requests.RequestException)
+    """
+    started = time.perf_counter()
+    error = True
+    try:
+        response = get_session(name).request(method, url, **kwargs)
+        error = response.status_code >= 400
+        return response
+    finally:
+        stats.record(name, time.perf_counter() - started, error=error)
+
+
+def get(name, url, **kwargs):
+    return request(name, "GET", url, **kwargs)
+
+
+def post(name, url, **kwargs):
+    return request(name, "POST", url, **kwargs)
+
+
+def upstream_stats():
+    return stats.snapshot()
@@ -1,22 +1,47 @@
+from django.conf import settings
 from django.urls import path
+from .async_views import AsyncV2XSignalTestView, AsyncTmapRouteView, AsyncSignalStatusView, AsyncSignalStreamView
 from .views import (
     AllTrafficLightsView,
     NearbyTrafficLightsView,
+    TrafficLightTileView,
+    TrafficLightBBoxView,
     V2XSignalTestView,
     TmapRouteView,
     SegmentedRouteView,
     TmapSegmentedRouteView,
     SignalStatusView,
+    SignalStatusBatchView,
+    SignalSnapshotStatusView,
+    MapStatsView,
     RouteEstimatedTimeView,
+    RankedRouteView,
+    DepartureTimeView,
 )
 
 urlpatterns = [
     path('traffic-lights/all/', AllTrafficLightsView.as_view(), name='all-traffic-lights'),
     path('traffic-lights/nearby/', NearbyTrafficLightsView.as_view(), name='nearby-traffic-lights'),
+    path('traffic-lights/tiles/<int:z>/<int:x>/<int:y>/', TrafficLightTileView.as_view(), name='traffic-light-tile'),
+    path('traffic-lights/bbox/', TrafficLightBBoxView.as_view(), name='traffic-light-bbox'),
     path('traffic-lights/v2x-test/', V2XSignalTestView.as_view(), name='v2x-signal-test'),
     path('traffic-lights/tmap-route/', TmapRouteView.as_view(), name='tmap-route'),
     path('traffic-lights/segmented-route/', SegmentedRouteView.as_view(), name='segmented-route'),
     path('traffic-lights/tmap-segmented-route/', TmapSegmentedRouteView.as_view(), name='tmap-segmented-route'),
     path('traffic-lights/signal-status/', SignalStatusView.as_view(), name='signal-status'),
+    path('traffic-lights/signal-status/batch/', SignalStatusBatchView.as_view(), name='signal-status-batch'),
+    path('traffic-lights/signal-snapshot/', SignalSnapshotStatusView.as_view(), name='signal-snapshot'),
+    path('traffic-lights/stats/', MapStatsView.as_view(), name='map-stats'),
     path('traffic-lights/estimated-time/', RouteEstimatedTimeView.as_view(), name='estimated-time'),
-]
\ No newline at end of file
+    path('traffic-lights/ranked-routes/', RankedRouteView.as_view(), name='ranked-routes'),
+    path('traffic-lights/departure-time/', DepartureTimeView.as_view(), name='departure-time'),
+]
+
+# ASGI 비동기 엔드포인트 (응답 형식은 위 동기 엔드포인트와 같음), ASGI 서버로 띄웠을 때만 연결
+if getattr(settings, 'ASYNC_VIEWS_ENABLED', False):
+    urlpatterns += [
+        path('traffic-lights/async/v2x-test/', AsyncV2XSignalTestView.as_view(), name='async-v2x-signal-test'),
+        path('traffic-lights/async/tmap-route/', AsyncTmapRouteView.as_view(), name='async-tmap-route'),
+        path('traffic-lights/async/signal-status/', AsyncSignalStatusView.as_view(), name='async-signal-status'),
+        path('traffic-lights/async/signal-stream/', AsyncSignalStreamView.as_view(), name='async-signal-stream'),
+    ]
@@ -0,0 +1,364 @@
+import asyncio
+import json
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+import aiohttp
+import requests
+from django.conf import settings
+
+from . import async_upstream, upstream
+from .registry import get_intersection_registry
+
+SIGNAL_FUSION_URL = "https://t-data.seoul.go.kr/apig/apiman-gateway/tapi/v2xSignalPhaseTimingFusionInformation/1.0"
+
+
+def signal_feed_request():
+    """V2X 신호 위상 피드 요청의 (url, params, headers)"""
+    url = getattr(settings, "V2X_SIGNAL_FEED_URL", SIGNAL_FUSION_URL)
+    headers = {"accept": "application/json"}
+    params = {"apikey": quote(settings.V2X_API_KEY, safe='')}
+    return url, params, headers
+
+
+def fetch_signal_feed(timeout=5):
+    """V2X 신호 위상 피드 전체 다운로드 (교차로별 item 리스트)"""
+    url, params, headers = signal_feed_request()
+    response = upstream.get(upstream.V2X, url, params=params, headers=headers, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+
+async def afetch_signal_feed(timeout=5):
+    """fetch_signal_feed 의 비동기 버전 (실패 시 aiohttp.ClientError 또는 TimeoutError)"""
+    url, params, headers = signal_feed_request()
+    content = await async_upstream.get(upstream.V2X, url, params=params, headers=headers, timeout=timeout)
+    return json.loads(content)
+
+
+def is_transmit_time(value):
+    """trsmUtcTime 으로 쓸 수 있는 값인지 (ms 단위 숫자)"""
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class SignalSnapshot:
+    """
+    피드 한 번 다운로드분을 itstId 기준 dict 로 정리한 스냅샷
+    - fetched_at: 서버가 받아온 시각, trsm_utc_time: 피드 내 가장 최근 전송 시각 (ms)
+    - 피드가 item 리스트가 아니면 ValueError (dict 가 아닌 item, 전송 시각이 숫자가 아닌 item 은 건너뜀)
+    """
+
+    def __init__(self, data, fetched_at=None):
+        if data is None:
+            data = []
+        if not isinstance(data, list):
+            raise ValueError(f"V2X 피드 형식 오류: item 리스트가 아닌 {type(data).__name__} 응답")
+        self.items = {}
+        for item in data:
+            if not isinstance(item, dict) or not is_transmit_time(item.get("trsmUtcTime")):
+                continue
+            its_id = str(item.get("itstId", "")).strip()
+            if its_id:
+                self.items.setdefault(its_id, item)
+        self.fetched_at = fetched_at if fetched_at is not None else time.time()
+        self.trsm_utc_time = max((item["trsmUtcTime"] for item in self.items.values()), default=None)
+
+    def __len__(self):
+        return len(self.items)
+
+    def get(self, its_id):
+        return self.items.get(str(its_id).strip())
+
+    def age(self, now=None):
+        """스냅샷을 받아온 뒤 지난 시간(초)"""
+        return (now if now is not None else time.time()) - self.fetched_at
+
+    def feed_age(self, now=None):
+        """피드 전송 시각(trsmUtcTime) 기준으로 지난 시간(초)"""
+        if self.trsm_utc_time is None:
+            return None
+        return (now if now is not None else time.time()) - self.trsm_utc_time / 1000
+
+
+class SignalFeedPoller:
+    """주기적으로 피드를 받아 공유 스냅샷을 교체하는 백그라운드 스레드"""
+
+    def __init__(self, interval, fetch=fetch_signal_feed):
+        self.interval = interval
+        self.fetch = fetch
+        self.snapshot = None
+        self.last_error = None
+        self.last_error_at = None
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+        self._thread = None
+        self._listeners = []
+        self._listeners_lock = threading.Lock()
+
+    def refresh(self):
+        try:
+            return self.apply(self.fetch())
+        except Exception as e:
+            self.last_error = str(e)
+            self.last_error_at = time.time()
+            raise
+        finally:
+            self._ready.set()
+
+    def apply(self, data):
+        """
+        받아온 피드로 공유 스냅샷 교체 후 리스너(스트리밍 허브 등)에 새 스냅샷 전달
+        - 피드 형식이 잘못됐으면 ValueError (기존 스냅샷 유지)
+        """
+        snapshot = self.snapshot = SignalSnapshot(data)
+        self.last_error = None
+        self._ready.set()
+        with self._listeners_lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                print(f"[WARN] V2X 스냅샷 리스너 실패: {e}")
+        return snapshot
+
+    def add_listener(self, listener):
+        """새 스냅샷마다 listener(snapshot) 호출 (폴러 스레드에서 호출되므로 빨리 끝나야 함)"""
+        with self._listeners_lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._listeners_lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.refresh()
+            except Exception as e:
+                # 어떤 오류든 스레드는 계속 돌고 다음 주기에 다시 시도
+                print(f"[WARN] V2X 피드 갱신 실패: {e}")
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="v2x-signal-poller", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def wait_ready(self, timeout):
+        return self._ready.wait(timeout)
+
+
+_poller = None
+_poller_lock = threading.Lock()
+
+
+def get_signal_poller():
+    global _poller
+    if _poller is None:
+        with _poller_lock:
+            if _poller is None:
+                poller = SignalFeedPoller(getattr(settings, "V2X_POLL_INTERVAL", 2.0))
+                # 신호 이력 기록 (V2X_HISTORY_RECORD), history 가 v2x 를 import 하므로 여기서 import
+                from .history import attach_phase_history
+                attach_phase_history(poller)
+                _poller = poller
+    return _poller
+
+
+def get_signal_snapshot():
+    """
+    공유 스냅샷 반환 (요청마다 외부 호출 없음)
+    - V2X_POLL_ENABLED 이면 첫 호출 시 폴러 스레드를 시작하고 첫 스냅샷을 기다림
+    - 폴러를 쓰지 않으면 스냅샷이 V2X_POLL_INTERVAL 보다 오래됐을 때만 직접 갱신
+    """
+    poller = get_signal_poller()
+    if getattr(settings, "V2X_POLL_ENABLED", True):
+        if not poller.running:
+            with _poller_lock:
+                poller.start()
+        if poller.snapshot is None:
+            poller.wait_ready(timeout=10)
+        if poller.snapshot is None:
+            raise requests.RequestException(poller.last_error or "V2X 신호 스냅샷이 아직 준비되지 않았습니다.")
+        return poller.snapshot
+
+    snapshot = poller.snapshot
+    if snapshot is None or snapshot.age() >= getattr(settings, "V2X_POLL_INTERVAL", poller.interval):
+        with _poller_lock:
+            if poller.snapshot is snapshot:
+                try:
+                    poller.refresh()
+                except ValueError as e:
+                    # 응답 JSON/형식 오류도 호출하는 view 에서는 외부 API 실패로 처리
+                    raise requests.RequestException(str(e)) from e
+    return poller.snapshot
+
+
+async def aget_signal_snapshot():
+    """
+    get_signal_snapshot 의 비동기 버전
+    - 폴러를 쓰면 첫 스냅샷은 스레드에서 기다림 (이벤트 루프를 막지 않음)
+    - 폴러를 쓰지 않으면 오래된 스냅샷을 비동기 클라이언트로 갱신
+    - 스냅샷을 얻지 못하면 requests.RequestException 또는 aiohttp.ClientError
+    """
+    poller = get_signal_poller()
+    if getattr(settings, "V2X_POLL_ENABLED", True):
+        if not poller.running:
+            with _poller_lock:
+                poller.start()
+        if poller.snapshot is None:
+            await asyncio.to_thread(poller.wait_ready, 10)
+        if poller.snapshot is None:
+            raise requests.RequestException(poller.last_error or "V2X 신호 스냅샷이 아직 준비되지 않았습니다.")
+        return poller.snapshot
+
+    snapshot = poller.snapshot
+    if snapshot is None or snapshot.age() >= getattr(settings, "V2X_POLL_INTERVAL", poller.interval):
+        try:
+            data = await afetch_signal_feed()
+            if poller.snapshot is snapshot:
+                poller.apply(data)
+        except (aiohttp.ClientError, TimeoutError, ValueError) as e:
+            poller.last_error = str(e)
+            poller.last_error_at = time.time()
+            raise
+    return poller.snapshot
+
+
+SIGNAL_DIRECTIONS = ["nt", "et", "st", "wt", "ne", "nw", "se", "sw"]
+
+
+def decode_signals(item):
+    """피드 item 의 방향별 보행 신호 (*PdsgStatNm / *PdsgRmdrCs) 를 색상/남은 시간으로 변환"""
+    signals = []
+
+    for key in SIGNAL_DIRECTIONS:
+        status_key = f"{key}PdsgStatNm"
+        time_key = f"{key}PdsgRmdrCs"
+        raw_status = item.get(status_key)
+        remaining_raw = item.get(time_key)
+
+        seconds = round(remaining_raw / 10, 1) if remaining_raw is not None else None
+
+        if raw_status:
+            raw_status_lower = raw_status.lower()
+            if "stop" in raw_status_lower:
+                color = "red"
+            elif "protected" in raw_status_lower:
+                color = "green"
+            elif "permissive" in raw_status_lower:
+                # permissive green + 5초 미만이면 'red' 처리
+                if seconds is not None and seconds < 5:
+                    color = "Hurry up!"
+                else:
+                    color = "green"
+            else:
+                color = None
+        else:
+            color = None
+
+        signals.append({
+            "direction": key,
+            "signalColor": color,
+            "remainingSeconds": seconds
+        })
+
+    return signals
+
+
+def build_signal_status(item, intersection_name):
+    """SignalStatusView 응답 형식의 신호 상태"""
+    return {
+        "intersectionName": intersection_name,
+        "timestamp": datetime.fromtimestamp(item["trsmUtcTime"] / 1000, tz=timezone.utc).isoformat(),
+        "signals": decode_signals(item)
+    }
+
+
+def get_signal_statuses(its_ids, snapshot=None):
+    """
+    여러 교차로의 신호 상태를 스냅샷 하나로 한 번에 계산
+    - 반환: its_ids 순서대로 신호 상태 dict, 피드에 없는 교차로는 None
+    - 스냅샷을 얻지 못하면 requests.RequestException
+    """
+    if snapshot is None:
+        snapshot = get_signal_snapshot()
+    try:
+        registry = get_intersection_registry()
+    except Exception as e:
+        print(f"[WARN] 교차로 이름 조회 실패: {e}")
+        registry = None
+
+    statuses = []
+    for its_id in its_ids:
+        item = snapshot.get(its_id)
+        if not item:
+            statuses.append(None)
+            continue
+        intersection_name = registry.name(its_id) if registry else None
+        statuses.append(build_signal_status(item, intersection_name))
+    return statuses
+
+
+def get_signal_status_batch(its_ids, snapshot=None, now=None):
+    """
+    여러 교차로의 신호 상태를 스냅샷 하나로 한 번에 조회 (배치 엔드포인트 응답 형식)
+    - results: its_ids 순서대로 {"itsId", "found", ...신호 상태, "ageSec", "stale"}
+    - 피드에 없거나 전송 시각이 없는 교차로(스냅샷에서 제외됨)는 found False
+    - ageSec: 해당 교차로 데이터의 전송 시각(trsmUtcTime) 기준 경과 시간, V2X_STALE_AFTER 초를 넘으면 stale
+    - 스냅샷을 얻지 못하면 requests.RequestException
+    """
+    if snapshot is None:
+        snapshot = get_signal_snapshot()
+    now = now if now is not None else time.time()
+    stale_after = getattr(settings, "V2X_STALE_AFTER", 10.0)
+
+    results = []
+    for its_id, status in zip(its_ids, get_signal_statuses(its_ids, snapshot=snapshot)):
+        if status is None:
+            results.append({"itsId": its_id, "found": False})
+            continue
+        # 스냅샷의 item 은 모두 숫자 trsmUtcTime 을 가짐 (SignalSnapshot 에서 걸러짐)
+        age = round(now - snapshot.get(its_id)["trsmUtcTime"] / 1000, 3)
+        results.append({"itsId": its_id, "found": True, **status, "ageSec": age, "stale": age > stale_after})
+
+    return {
+        "fetchedAt": datetime.fromtimestamp(snapshot.fetched_at, tz=timezone.utc).isoformat(),
+        "snapshotAgeSec": round(snapshot.age(now), 3),
+        "count": len(results),
+        "found": sum(result["found"] for result in results),
+        "results": results,
+    }
+
+
+def snapshot_status(poller=None):
+    """스냅샷 신선도(staleness) 정보"""
+    poller = poller or get_signal_poller()
+    snapshot = poller.snapshot
+    now = time.time()
+    return {
+        "pollerRunning": poller.running,
+        "pollIntervalSec": poller.interval,
+        "items": len(snapshot) if snapshot else 0,
+        "fetchedAt": datetime.fromtimestamp(snapshot.fetched_at, tz=timezone.utc).isoformat() if snapshot else None,
+        "ageSec": round(snapshot.age(now), 3) if snapshot else None,
+        "trsmUtcTime": snapshot.trsm_utc_time if snapshot else None,
+        "feedAgeSec": round(snapshot.feed_age(now), 3) if snapshot and snapshot.trsm_utc_time else None,
+        "lastError": poller.last_error,
+        "lastErrorAt": datetime.fromtimestamp(poller.last_error_at, tz=timezone.utc).isoformat() if poller.last_error_at else None,
+    }
@@ -1,34 +1,57 @@
-import os
-import pandas as pd
+import numpy as np
 import requests
-import json
-import csv
-from pathlib import Path
-from datetime import datetime, timezone
 from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework import status
-from haversine import haversine
-from .models import TrafficLight
+from member.speed import get_speed_profile
 from .serializers import TrafficLightSerializer
-from math import radians, cos, sin, sqrt, atan2
-from urllib.parse import quote
+from .spatial import get_traffic_light_index, nearby_from_db
+from .artifact import get_traffic_light_artifact, serve_encoded
+from .tiles import MAX_TILE_ZOOM, get_tile_index
+from . import upstream
+from .v2x import get_signal_status_batch, get_signal_statuses, snapshot_status
+from .segmenter import RouteSegmenter
+from .cycles import crossing_waits, get_signal_cycle_table, scheduled_phases, signal_phase
+from .tmap import ROUTE_OPTIONS, compact_route, extract_route, fetch_pedestrian_route_cached
+from .ranking import crossing_signal_statuses, departure_profile, expected_time, rank_routes, route_signal_inputs
+from .routecache import get_route_cache
+from .graph import fetch_routes_with_local_fallback
+
+V2X_SIGNAL_PHASE_URL = "https://t-data.seoul.go.kr/apig/apiman-gateway/tapi/v2xSignalPhaseTimingInformation/1.0"
+
+
+def build_route_response(results):
+    """
+    fetch_pedestrian_routes 결과 -> (응답 본문, 상태 코드)
+    - 성공한 경로만 포함, 모두 실패하면 추천 경로의 오류로 500
+    """
+    routes = []
+    for route_type, option in ROUTE_OPTIONS.items():
+        result = results[option]
+        if "data" in result:
+            routes.append({
+                "type": route_type,
+                "route": result["data"]
+            })
 
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371000
-    dlat = radians(lat2 - lat1)
-    dlon = radians(lon2 - lon1)
-    a = sin(dlat / 2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-    return R * c
+    if not routes:
+        first_error = results[ROUTE_OPTIONS["recommended"]]
+        return {"error": first_error["error"], "details": first_error["details"]}, 500
+
+    return {"routes": routes}, 200
 
 class AllTrafficLightsView(APIView):
     def get(self, request):
-        lights = TrafficLight.objects.all()
-        serializer = TrafficLightSerializer(lights, many=True)
-        return Response(serializer.data)
+        # 데이터 버전마다 미리 인코딩/압축해둔 본문을 그대로 응답 (ETag 가 같으면 304)
+        # ?output=binary 이면 열 단위 packed 바이너리 (map/artifact.py 참고)
+        output = request.query_params.get("output", "json")
+        if output not in ("json", "binary"):
+            return Response({"error": "Invalid 'output' parameter. Use one of: json, binary."}, status=400)
+
+        artifact = get_traffic_light_artifact()
+        return serve_encoded(request, artifact.binary if output == "binary" else artifact.json)
 
 class NearbyTrafficLightsView(APIView):
     def get(self, request):
@@ -38,20 +61,54 @@ class NearbyTrafficLightsView(APIView):
         except (TypeError, ValueError):
             return Response({"error": "Invalid or missing 'lat' and 'lon' parameters."}, status=400)
 
-        radius = float(request.query_params.get('radius', 500))
-        nearby_lights = []
-        for light in TrafficLight.objects.all():
-            if haversine(lat, lon, light.latitude, light.longitude) <= radius:
-                nearby_lights.append(light)
+        try:
+            radius = float(request.query_params.get('radius', 500))
+            limit = request.query_params.get('limit')
+            limit = int(limit) if limit else None
+        except ValueError:
+            return Response({"error": "Invalid 'radius' or 'limit' parameter."}, status=400)
+        # 음수 limit 은 슬라이싱에서 뒤쪽 결과를 잘라내므로 거부 (radius 는 양의 유한값만)
+        if not 0 < radius < float("inf") or (limit is not None and limit < 0):
+            return Response({"error": "Invalid 'radius' or 'limit' parameter."}, status=400)
+
+        # 가까운 순 정렬
+        # - index: 메모리 공간 인덱스로 후보 셀만 확인
+        # - db: 위경도 범위로 DB 에서 먼저 거른 뒤 정확한 거리로 필터링
+        if getattr(settings, "MAP_NEARBY_BACKEND", "index") == "db":
+            nearby_lights = nearby_from_db(lat, lon, radius, limit=limit)
+        else:
+            nearby_lights = get_traffic_light_index().within(lat, lon, radius, limit=limit)
 
         serializer = TrafficLightSerializer(nearby_lights, many=True)
         return Response(serializer.data)
 
+class TrafficLightTileView(APIView):
+    def get(self, request, z, x, y):
+        if not (0 <= z <= MAX_TILE_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            return Response({"error": f"Invalid tile. z must be 0-{MAX_TILE_ZOOM} and x, y must be 0-(2^z - 1)."}, status=400)
+
+        # 타일 본문은 데이터 버전마다 한 번만 만들어 캐시 (신호등이 많으면 하위 타일 단위로 묶어 반환)
+        encoded = get_tile_index().tile(z, x, y)
+        return serve_encoded(request, encoded, cache_control=f"public, max-age={getattr(settings, 'MAP_TILE_MAX_AGE', 300)}")
+
+class TrafficLightBBoxView(APIView):
+    def get(self, request):
+        # bbox=west,south,east,north (경도, 위도 순)
+        try:
+            west, south, east, north = (float(v) for v in request.query_params.get("bbox", "").split(","))
+        except ValueError:
+            return Response({"error": "Invalid or missing 'bbox' parameter. Use bbox=west,south,east,north."}, status=400)
+        if not (-180 <= west <= east <= 180 and -90 <= south <= north <= 90):
+            return Response({"error": "Invalid 'bbox' parameter. Use bbox=west,south,east,north."}, status=400)
+
+        encoded = get_tile_index().bbox(south, west, north, east)
+        return serve_encoded(request, encoded, cache_control=f"public, max-age={getattr(settings, 'MAP_TILE_MAX_AGE', 300)}")
+
 class V2XSignalTestView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        base_url = "https://t-data.seoul.go.kr/apig/apiman-gateway/tapi/v2xSignalPhaseTimingInformation/1.0"
+        base_url = getattr(settings, "V2X_SIGNAL_PHASE_URL", V2X_SIGNAL_PHASE_URL)
         api_key = settings.V2X_API_KEY  
         page = request.query_params.get("pageNo", "1")
         rows = request.query_params.get("numOfRows", "10")
@@ -67,8 +124,7 @@ class V2XSignalTestView(APIView):
             params["itstId"] = itst_id
 
         try:
-            response = requests.get(base_url, params=params, timeout=20)
-            print("요청 URL:", response.request.url) 
+            response = upstream.get(upstream.V2X, base_url, params=params, timeout=20)
             response.raise_for_status()
             return Response(response.json())
         except requests.Timeout:
@@ -88,49 +144,10 @@ class TmapRouteView(APIView):
         if not all([startX, startY, endX, endY]):
             return Response({"error": "Missing startX, startY, endX, or endY"}, status=400)
 
-        headers = {
-            "appKey": settings.TMAP_API_KEY,
-            "Content-Type": "application/json"
-        }
-
-        # 도보 경로 URL
-        url = "https://apis.openapi.sk.com/tmap/routes/pedestrian?version=1"
-
-        try:
-            routes = []
-
-            for option in ["0", "10"]:  
-                body = {
-                    "startX": startX,
-                    "startY": startY,
-                    "endX": endX,
-                    "endY": endY,
-                    "reqCoordType": "WGS84GEO",
-                    "resCoordType": "WGS84GEO",
-                    "startName": "출발지",
-                    "endName": "도착지",
-                    "searchOption": option  
-                }
-
-                response = requests.post(url, headers=headers, json=body, timeout=5)
-                response.raise_for_status()
-
-                try:
-                    cleaned_text = response.text.replace('\x00', '') 
-                    data = json.loads(cleaned_text) 
-                except json.JSONDecodeError as e:
-                    return Response({"error": "Invalid JSON response from TMAP", "details": str(e)}, status=500)
-
-                route_type = "recommended" if option == "0" else "alternative"
-                routes.append({
-                    "type": route_type,
-                    "route": data
-                })
-
-            return Response({"routes": routes})
-
-        except requests.RequestException as e:
-            return Response({"error": "TMAP 도보 경로 요청 실패", "details": str(e)}, status=500)
+        # 추천/대안 경로를 동시에 요청 (한쪽이 실패해도 나머지는 반환)
+        results = fetch_routes_with_local_fallback(startX, startY, endX, endY, list(ROUTE_OPTIONS.values()))
+        body, status_code = build_route_response(results)
+        return Response(body, status=status_code)
 
 class SegmentedRouteView(APIView):
     permission_classes = [IsAuthenticated]
@@ -144,117 +161,88 @@ class SegmentedRouteView(APIView):
             if not all([startX, startY, endX, endY]):
                 return Response({"error": "Missing coordinates"}, status=400)
             
-            try:
-                response = requests.get("http://127.0.0.1:8000/member/info/")
-                response.raise_for_status()
-                user_data = response.json()
-                speed = user_data.get("min_speed", 1.0)  
-            except (requests.RequestException, KeyError):
-                speed = 1.0  
-
-            headers = {
-                "appKey": settings.TMAP_API_KEY,
-                "Content-Type": "application/json"
-            }
+            # 로그인 사용자의 보행 속도 (설정값 또는 나이대/성별 추천값)
+            speed = get_speed_profile(request.user)["min_speed"]
 
-            url = "https://apis.openapi.sk.com/tmap/routes/pedestrian?version=1"
-            
-            def create_body(route_type):
-                return {
-                    "startX": startX,
-                    "startY": startY,
-                    "endX": endX,
-                    "endY": endY,
-                    "reqCoordType": "WGS84GEO",
-                    "resCoordType": "WGS84GEO",
-                    "startName": "출발지",
-                    "endName": "도착지",
-                    "searchOption": "0" if route_type == "recommended" else "10"  
-                }
+            # 추천/대안 경로 동시 요청
+            results = fetch_routes_with_local_fallback(startX, startY, endX, endY, list(ROUTE_OPTIONS.values()))
 
-            def create_segment(segment_number, start_point, end_point, distance, time, light=None):
+            def create_segment(segment_number, segment, light=None):
                 return {
                     "segment_number": segment_number,
-                    "distance_m": round(distance, 2),
-                    "estimated_time_sec": round(time, 2),
-                    "start": {"lat": start_point[1], "lng": start_point[0]},
-                    "end": {"lat": end_point[1], "lng": end_point[0]},
+                    "distance_m": round(segment["distance_m"], 2),
+                    "estimated_time_sec": round(segment["time_sec"] or 0, 2),
+                    "start": segment["start"],
+                    "end": segment["end"],
                     "speed_used": speed,  
                     "traffic_light": light
                 }
 
             def process_route(route_type):
-                body = create_body(route_type)
-                try:
-                    response = requests.post(url, headers=headers, json=body, timeout=5)
-                    response.raise_for_status()
-                    tmap_data = json.loads(response.text.replace('\x00', ''))
-
-                    if "features" not in tmap_data:
-                        return {"error": f"No features found for {route_type} route"}
-
-                    traffic_lights = TrafficLight.objects.all()
-                    coords = []
-                    segments = []
-                    segment_number = 1
-                    total_distance = 0
-                    total_time = 0
-                    segment_start = None
-
-                    for feature in tmap_data.get("features", []):
-                        geometry = feature.get("geometry", {})
-                        properties = feature.get("properties", {})
-                        description = properties.get("description", "")
-
-                        if geometry.get("type") == "Point":
-                            point = geometry.get("coordinates")
-                            coords.append(point)
-                        elif geometry.get("type") == "LineString":
-                            line_coords = geometry.get("coordinates", [])
-                            coords.extend(line_coords)
-
-                        if "횡단보도" in description or "건널목" in description or "교차로" in description:
-                            min_distance = float('inf')
-                            closest_light = None
-                            for light in traffic_lights:
-                                dist = haversine(point[1], point[0], light.latitude, light.longitude)
-                                if dist < min_distance:
-                                    min_distance = dist
-                                    closest_light = {
-                                        "lat": light.latitude,
-                                        "lng": light.longitude,
-                                        "name": light.name
-                                    }
-
-                            if segment_start is None:
-                                segment_start = coords[0]
-                            segment_end = coords[-1]
-
-                            segment = create_segment(segment_number, segment_start, segment_end, total_distance, total_time, closest_light)
-                            segments.append(segment)
-                            segment_number += 1
-
-                            segment_start = segment_end
-
-                    if segment_start:
-                        segment = create_segment(segment_number, segment_start, coords[-1], total_distance, total_time)
-                        segments.append(segment)
-
-                    return {
-                        "route_type": route_type,
-                        "total_distance_m": round(total_distance, 2),
-                        "total_time_sec": round(total_time, 2),
-                        "speed_used": 1.0,
-                        "total_segments": len(segments),
-                        "segments": segments
-                    }
+                result = results[ROUTE_OPTIONS[route_type]]
+                if "error" in result:
+                    return {"error": f"TMAP {route_type} 경로 요청 실패", "details": result["details"]}
+
+                tmap_data = result["data"]
+                if "features" not in tmap_data:
+                    return {"error": f"No features found for {route_type} route"}
+
+                coords = []
+                cut_indices = []
+                crossing_points = []
+
+                for feature in tmap_data.get("features", []):
+                    geometry = feature.get("geometry", {})
+                    properties = feature.get("properties", {})
+                    description = properties.get("description", "")
+
+                    if geometry.get("type") == "Point":
+                        point = geometry.get("coordinates")
+                        coords.append(point)
+                    elif geometry.get("type") == "LineString":
+                        line_coords = geometry.get("coordinates", [])
+                        coords.extend(line_coords)
+
+                    # 횡단보도/교차로가 나온 지점까지를 한 구간으로 자름
+                    if coords and ("횡단보도" in description or "건널목" in description or "교차로" in description):
+                        cut_indices.append(len(coords) - 1)
+                        crossing_points.append(coords[-1])
+
+                segmenter = RouteSegmenter(coords, speed)
+                segments = []
+                if cut_indices:
+                    for segment_number, segment in enumerate(segmenter.split(cut_indices), start=1):
+                        segments.append(create_segment(segment_number, segment))
+
+                # 신호등은 두 경로를 모두 처리한 뒤 한 번에 매칭
+                crossing_segments.extend(zip(segments, crossing_points))
 
-                except requests.RequestException as e:
-                    return {"error": f"TMAP {route_type} 경로 요청 실패", "details": str(e)}
+                return {
+                    "route_type": route_type,
+                    "total_distance_m": round(sum(segment["distance_m"] for segment in segments), 2),
+                    "total_time_sec": round(sum(segment["estimated_time_sec"] for segment in segments), 2),
+                    "speed_used": speed,
+                    "total_segments": len(segments),
+                    "segments": segments
+                }
 
+            crossing_segments = []  # (segment, 횡단보도 지점 [lon, lat])
             recommended_route = process_route("recommended")
             alternative_route = process_route("alternative")
 
+            # 두 경로의 횡단보도 지점을 가장 가까운 신호등과 일괄 매칭
+            lights = get_traffic_light_index().match(
+                [(point[1], point[0]) for _, point in crossing_segments],
+                max_distance=getattr(settings, "SEGMENT_LIGHT_MATCH_RADIUS", float("inf")),
+            )
+            for (segment, _), light in zip(crossing_segments, lights):
+                if light:
+                    segment["traffic_light"] = {
+                        "lat": light["latitude"],
+                        "lng": light["longitude"],
+                        "name": light["name"]
+                    }
+
             response_data = {"routes": []}
             if "error" not in recommended_route:
                 response_data["routes"].append(recommended_route)
@@ -274,108 +262,100 @@ class TmapSegmentedRouteView(APIView):
         if not all([startX, startY, endX, endY]):
             return Response({"error": "Missing coordinates"}, status=400)
 
-        try:
-            response = requests.get("http://127.0.0.1:8000/member/info/")
-            response.raise_for_status()
-            user_data = response.json()
-            speed = user_data.get("min_speed", 1.0)  
-        except (requests.RequestException, KeyError):
-            speed = 1.0  
-
-        headers = {
-            "appKey": settings.TMAP_API_KEY,
-            "Content-Type": "application/json"
-        }
+        # 로그인 사용자의 보행 속도 (비로그인 시 기본값)
+        speed = get_speed_profile(request.user)["min_speed"]
 
-        url = "https://apis.openapi.sk.com/tmap/routes/pedestrian?version=1"
-        
-        def create_body(route_type):
-            return {
-                "startX": startX,
-                "startY": startY,
-                "endX": endX,
-                "endY": endY,
-                "reqCoordType": "WGS84GEO",
-                "resCoordType": "WGS84GEO",
-                "startName": "출발지",
-                "endName": "도착지",
-                "searchOption": "0" if route_type == "recommended" else "10"  
-            }
+        # tmap_raw 포함 방식: full (기본, 원본 그대로) / compact (주요 필드만) / none (제외)
+        raw_mode = request.query_params.get("raw", "full")
+        if raw_mode not in ("full", "compact", "none"):
+            return Response({"error": "Invalid 'raw' parameter (full, compact, none)"}, status=400)
+
+        # 추천/대안 경로 동시 요청
+        results = fetch_routes_with_local_fallback(startX, startY, endX, endY, list(ROUTE_OPTIONS.values()))
 
-        def create_segment(segment_number, start_point, end_point, distance, time, light=None):
+        def create_segment(segment_number, segment, light=None):
             return {
                 "segment_number": segment_number,
-                "distance_m": round(distance, 2),
-                "estimated_time_sec": round(time, 2),
-                "start": {"lat": start_point[1], "lng": start_point[0]},
-                "end": {"lat": end_point[1], "lng": end_point[0]},
+                "distance_m": round(segment["distance_m"], 2),
+                "estimated_time_sec": round(segment["time_sec"] or 0, 2),
+                "start": segment["start"],
+                "end": segment["end"],
                 "speed_used": speed,  
                 "traffic_light": light
             }
 
         def process_route(route_type):
-            body = create_body(route_type)
-            try:
-                response = requests.post(url, headers=headers, json=body, timeout=5)
-                response.raise_for_status()
-                tmap_data = json.loads(response.text.replace('\x00', ''))
-
-                if "features" not in tmap_data:
-                    return {"error": f"No features found for {route_type} route"}
+            result = results[ROUTE_OPTIONS[route_type]]
+            if "error" in result:
+                return {"error": f"TMAP {route_type} 경로 요청 실패", "details": result["details"]}
 
-                segments = []
-                segment_number = 1
-
-                for feature in tmap_data.get("features", []):
-                    geometry = feature.get("geometry", {})
-                    properties = feature.get("properties", {})
-                    description = properties.get("description", "")
-
-                    # ✅ 1. LineString만 세그먼트 처리
-                    if geometry.get("type") != "LineString":
-                        continue
-
-                    line_coords = geometry.get("coordinates", [])
-                    if not line_coords or len(line_coords) < 2:
-                        continue
-
-                    segment_start = line_coords[0]
-                    segment_end = line_coords[-1]
-
-                    # ✅ 2. start == end 세그먼트는 스킵
-                    if segment_start == segment_end:
-                        continue
-
-                    segment_distance = properties.get("distance", 0)
-                    segment_time = properties.get("time", 0)
-
-                    # ✅ 3. 교차로/횡단보도 포함 여부 → 추후 보행자 신호 매핑용 (지금은 None)
-                    traffic_light = None
+            tmap_data = result["data"]
+            if "features" not in tmap_data:
+                return {"error": f"No features found for {route_type} route"}
 
-                    if "횡단보도" in description or "건널목" in description or "교차로" in description:
-                        # traffic_light 매핑 로직은 추후 추가
-                        traffic_light = {"hint": "TODO: 보행자 신호 매핑 필요"}
+            coords = []
+            lines = []  # (시작 인덱스, 끝 인덱스, 횡단보도 여부)
 
-                    segments.append(
-                        create_segment(segment_number, segment_start, segment_end, segment_distance, segment_time, traffic_light)
-                    )
-                    segment_number += 1
+            for feature in tmap_data.get("features", []):
+                geometry = feature.get("geometry", {})
+                properties = feature.get("properties", {})
+                description = properties.get("description", "")
 
-                total_distance = sum(seg["distance_m"] for seg in segments)
-                total_time = sum(seg["estimated_time_sec"] for seg in segments)
+                # ✅ 1. LineString만 세그먼트 처리
+                if geometry.get("type") != "LineString":
+                    continue
+
+                line_coords = geometry.get("coordinates", [])
+                if not line_coords or len(line_coords) < 2:
+                    continue
+
+                # ✅ 2. start == end 세그먼트는 스킵
+                if line_coords[0] == line_coords[-1]:
+                    continue
+
+                # ✅ 3. 교차로/횡단보도 포함 여부 → 보행자 신호 매핑용
+                crossing = "횡단보도" in description or "건널목" in description or "교차로" in description
+
+                lines.append((len(coords), len(coords) + len(line_coords) - 1, crossing))
+                coords.extend(line_coords)
+
+            # 구간 거리/시간은 누적 거리 배열과 사용자 속도로 계산
+            segmenter = RouteSegmenter(coords, speed)
+            segments = [
+                create_segment(segment_number, segmenter.segment(start, end))
+                for segment_number, (start, end, _) in enumerate(lines, start=1)
+            ]
+
+            # 횡단보도 구간은 끝 지점에서 가장 가까운 신호등과 일괄 매칭 (SegmentedRouteView 와 같은 방식)
+            crossing_segments = [segment for segment, (_, _, crossing) in zip(segments, lines) if crossing]
+            lights = get_traffic_light_index().match(
+                [(segment["end"]["lat"], segment["end"]["lng"]) for segment in crossing_segments],
+                max_distance=getattr(settings, "SEGMENT_LIGHT_MATCH_RADIUS", float("inf")),
+            )
+            for segment, light in zip(crossing_segments, lights):
+                if light:
+                    segment["traffic_light"] = {
+                        "lat": light["latitude"],
+                        "lng": light["longitude"],
+                        "name": light["name"]
+                    }
 
-                return {
-                    "route_type": route_type,
-                    "total_distance_m": round(total_distance, 2),
-                    "total_time_sec": round(total_time, 2),
-                    "speed_used": speed,
-                    "total_segments": len(segments),
-                    "segments": segments,
-                    "tmap_raw": tmap_data
-                }
+            total_distance = sum(seg["distance_m"] for seg in segments)
+            total_time = sum(seg["estimated_time_sec"] for seg in segments)
 
-            except requests.RequestException as e:
-                return {"error": f"TMAP {route_type} 경로 요청 실패", "details": str(e)}
+            route = {
+                "route_type": route_type,
+                "total_distance_m": round(total_distance, 2),
+                "total_time_sec": round(total_time, 2),
+                "speed_used": speed,
+                "total_segments": len(segments),
+                "segments": segments
+            }
+            if raw_mode == "full":
+                route["tmap_raw"] = tmap_data
+            elif raw_mode == "compact":
+                route["tmap_raw"] = compact_route(tmap_data)
+            return route
 
         recommended_route = process_route("recommended")
         alternative_route = process_route("alternative")
@@ -394,118 +374,87 @@ class SignalStatusView(APIView):
         if not its_id:
             return Response({"error": "Missing 'itsId' parameter"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # API 호출
-        url = "https://t-data.seoul.go.kr/apig/apiman-gateway/tapi/v2xSignalPhaseTimingFusionInformation/1.0"
-        headers = {"accept": "application/json"}
-        params = {"apikey": quote(settings.V2X_API_KEY, safe='')}
-
+        # 공유 스냅샷에서 해당 교차로 데이터 찾기 (요청마다 피드를 다운로드하지 않음)
         try:
-            response = requests.get(url, params=params, headers=headers, timeout=5)
-            response.raise_for_status()
-            data = response.json()
+            result = get_signal_statuses([its_id])[0]
         except requests.RequestException as e:
             return Response({"error": "API 호출 중 오류가 발생했습니다.", "details": str(e)}, status=500)
 
-        # 해당 교차로 데이터 찾기
-        item = next((x for x in data if str(x.get("itstId", "")).strip() == str(its_id)), None)
-        if not item:
+        if not result:
             return Response({"error": "ITS ID에 해당하는 데이터를 찾을 수 없습니다."}, status=404)
 
-        # 교차로 이름 가져오기
-        csv_path = Path(__file__).resolve().parent / "data" / "location.csv"
-        intersection_name = None
-        try:
-            with open(csv_path, encoding="utf-8-sig") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row.get("itstId", "").strip() == str(its_id):
-                        intersection_name = row.get("itstNm", "").strip()
-                        break
-        except Exception as e:
-            print(f"[WARN] 교차로 이름 조회 실패: {e}")
-
-        directions = ["nt", "et", "st", "wt", "ne", "nw", "se", "sw"]
-
-        signals = []
-
-        for key in directions:
-            status_key = f"{key}PdsgStatNm"
-            time_key = f"{key}PdsgRmdrCs"
-            raw_status = item.get(status_key)
-            remaining_raw = item.get(time_key)
-
-            seconds = round(remaining_raw / 10, 1) if remaining_raw is not None else None
-
-            if raw_status:
-                raw_status_lower = raw_status.lower()
-                if "stop" in raw_status_lower:
-                    color = "red"
-                elif "protected" in raw_status_lower:
-                    color = "green"
-                elif "permissive" in raw_status_lower:
-                    # permissive green + 5초 미만이면 'red' 처리
-                    if seconds is not None and seconds < 5:
-                        color = "Hurry up!"
-                    else:
-                        color = "green"
-                else:
-                    color = None
-            else:
-                color = None
-
-            
-            signals.append({
-                "direction": key,
-                "signalColor": color,
-                "remainingSeconds": seconds
-            })
-        
-        result = {
-            "intersectionName": intersection_name,
-            "timestamp": datetime.fromtimestamp(item["trsmUtcTime"] / 1000, tz=timezone.utc).isoformat(),
-            "signals": signals
-        }
-
         return Response(result, status=200)
 
-def calculate_crossing_delay(signal_status, arrival_time_sec):
+def parse_its_ids(params):
     """
-    특정 교차로에서 도착 시간에 따라 대기시간 계산용 함수
-    아래 총 소요시간 계산을 위한 함수임임
-    - signal_status: SignalStatusView API 결과 (signals 포함)
-    - arrival_time_sec: 누적 도착 시간 (초)
+    itsIds=1,2,3 (여러 번 줘도 됨) 또는 bbox=west,south,east,north 안의 신호등 전체 -> (itsId 리스트, 오류 메시지)
+    - 중복 제거, V2X_BATCH_MAX_IDS 개까지
     """
-    signal_cycle = {
-        "서울중랑우체국": {"green": 41, "red": 110},
-        # 첫 번째 교차로인 동일로지하차도앞은 측정 후 추가
-    }
+    its_ids = [
+        its_id.strip()
+        for value in params.getlist("itsIds")
+        for its_id in value.split(",") if its_id.strip()
+    ]
+    bbox = params.get("bbox")
+    if bbox:
+        try:
+            west, south, east, north = (float(v) for v in bbox.split(","))
+        except ValueError:
+            return None, "Invalid 'bbox' parameter. Use bbox=west,south,east,north."
+        if not (-180 <= west <= east <= 180 and -90 <= south <= north <= 90):
+            return None, "Invalid 'bbox' parameter. Use bbox=west,south,east,north."
+        its_ids += [str(light["itst_id"]) for light in get_tile_index().lights_in_bbox(south, west, north, east)]
+
+    if not its_ids:
+        return None, "Missing 'itsIds' or 'bbox' parameter"
+
+    its_ids = list(dict.fromkeys(its_ids))
+    max_ids = getattr(settings, "V2X_BATCH_MAX_IDS", 200)
+    if len(its_ids) > max_ids:
+        return None, f"Too many intersections ({len(its_ids)}). At most {max_ids} per request."
+    return its_ids, None
+
+class SignalStatusBatchView(APIView):
+    def get(self, request):
+        its_ids, error = parse_its_ids(request.query_params)
+        if error:
+            return Response({"error": error}, status=400)
 
-    intersection_name = signal_status.get("intersectionName")
-    signals = signal_status.get("signals", [])
+        # 모든 교차로를 같은 공유 스냅샷에서 조회 (피드는 한 번만 사용)
+        try:
+            result = get_signal_status_batch(its_ids)
+        except requests.RequestException as e:
+            return Response({"error": "API 호출 중 오류가 발생했습니다.", "details": str(e)}, status=500)
 
-    if not intersection_name or intersection_name not in signal_cycle:
-        return 0  # 주기 정보 없으면 계산 스킵
+        return Response(result, status=200)
 
-    green_dur = signal_cycle[intersection_name]["green"]
-    red_dur = signal_cycle[intersection_name]["red"]
+class SignalSnapshotStatusView(APIView):
+    permission_classes = [AllowAny]
 
-    # 신호 상태 추출
-    signal_color = None
-    remaining = None
-    for s in signals:
-        if s["signalColor"] in ["green", "red"]:
-            signal_color = s["signalColor"]
-            remaining = s["remainingSeconds"]
-            break
+    def get(self, request):
+        return Response(snapshot_status())
 
-    if signal_color is None or remaining is None:
-        return 0
+class MapStatsView(APIView):
+    permission_classes = [AllowAny]
 
-    if signal_color == "green" and remaining >= arrival_time_sec:
-        return 0  # 바로 통과
+    def get(self, request):
+        return Response({
+            "upstreams": upstream.upstream_stats(),
+            "route_cache": get_route_cache().stats(),
+        })
 
-    wait_time = (remaining if signal_color == "red" else 0) + green_dur
-    return wait_time
+def calculate_crossing_delay(signal_status, arrival_time_sec):
+    """
+    특정 교차로에서 도착 시간에 따라 대기시간 계산용 함수
+    아래 총 소요시간 계산을 위한 함수임임
+    - signal_status: SignalStatusView API 결과 (signals 포함) + itstId
+    - arrival_time_sec: 누적 도착 시간 (초)
+    - 신호 주기는 SignalCycle 테이블에서 itstId 로 조회 (주기 정보 없으면 계산 스킵)
+    - 신호 상태가 없으면 추정한 주기 위상(offset)으로 예측
+    """
+    green, red, offset = get_signal_cycle_table().lookup_schedule([signal_status.get("itstId")])
+    phase, remaining = scheduled_phases(*signal_phase(signal_status), green, red, offset)
+    return float(crossing_waits(arrival_time_sec, phase[0], remaining[0], green[0], red[0]))
 
 class RouteEstimatedTimeView(APIView):
     permission_classes = [AllowAny]
@@ -545,182 +494,124 @@ class RouteEstimatedTimeView(APIView):
         })
 
     def get_tmap_route(self, startX, startY, endX, endY):
-        url = "https://apis.openapi.sk.com/tmap/routes/pedestrian?version=1"
-        headers = {
-            "appKey": settings.TMAP_API_KEY,
-            "Content-Type": "application/json"
-        }
+        try:
+            tmap_data = fetch_pedestrian_route_cached(startX, startY, endX, endY, option=ROUTE_OPTIONS["recommended"])
+        except requests.RequestException as e:
+            return {"error": f"Tmap API 호출 실패: {str(e)}"}
 
-        body = {
-            "startX": startX,
-            "startY": startY,
-            "endX": endX,
-            "endY": endY,
-            "reqCoordType": "WGS84GEO",
-            "resCoordType": "WGS84GEO",
-            "startName": "출발지",
-            "endName": "도착지",
-            "searchOption": "0"
-        }
+        if "features" not in tmap_data:
+            return {"error": "Tmap features not found"}
 
-        try:
-            response = requests.post(url, headers=headers, json=body, timeout=5)
-            response.raise_for_status()
-            tmap_data = json.loads(response.text.replace('\x00', ''))
+        return extract_route(tmap_data)
 
-            if "features" not in tmap_data:
-                return {"error": "Tmap features not found"}
+    def create_segments(self, all_coords, crossings):
+        # 출발 ~ 각 교차로: 현재 교차로에서 30m 이내로 처음 들어오는 좌표에서 구간을 자름
+        segmenter = RouteSegmenter(all_coords)
+        cut_indices = segmenter.snap_crossings(crossings)
+        descriptions = [cross["description"] for cross in crossings[:len(cut_indices)]] + ["도착지"]
 
-            all_coords = []
-            crossings = []
-            total_time_sec = 0
+        segments = []
+        for segment_number, (segment, description) in enumerate(zip(segmenter.split(cut_indices), descriptions), start=1):
+            segments.append({
+                "segment_number": segment_number,
+                "start": segment["start"],
+                "end": segment["end"],
+                "distance_m": segment["distance_m"],
+                "description": description
+            })
+        return segments
 
-            for feature in tmap_data.get("features", []):
-                geometry = feature.get("geometry", {})
-                properties = feature.get("properties", {})
-                description = properties.get("description", "")
+    def get_signal_status_list(self, crossings):
+        # 교차로 매칭 후 신호 상태는 스냅샷 하나로 일괄 계산
+        return crossing_signal_statuses(crossings)
 
-                if geometry.get("type") == "LineString":
-                    line_coords = geometry.get("coordinates", [])
-                    all_coords.extend(line_coords)
-                    total_time_sec += properties.get("time", 0)
+    def calculate_total_expected_time(self, segments, signal_status_list, user_speed_mps):
+        return expected_time([segment["distance_m"] for segment in segments], signal_status_list, user_speed_mps)
 
-                if geometry.get("type") == "Point" and any(kw in description for kw in ["횡단보도", "건널목", "교차로"]):
-                    point = geometry.get("coordinates")
-                    crossings.append({"lat": point[1], "lng": point[0], "description": description})
+def parse_speed(request):
+    """보행 속도(m/s): speed 파라미터 > 로그인 사용자의 속도 프로필 > 기본값, 잘못된 값이면 None"""
+    try:
+        speed = float(request.query_params.get("speed") or get_speed_profile(request.user)["min_speed"])
+    except ValueError:
+        return None
+    return speed if speed > 0 else None
 
-            return {
-                "all_coords": all_coords,
-                "crossings": crossings,
-                "total_time_sec": total_time_sec
-            }
+class RankedRouteView(APIView):
+    permission_classes = [AllowAny]
 
-        except requests.RequestException as e:
-            return {"error": f"Tmap API 호출 실패: {str(e)}"}
+    def get(self, request):
+        startX = request.query_params.get("startX")
+        startY = request.query_params.get("startY")
+        endX = request.query_params.get("endX")
+        endY = request.query_params.get("endY")
 
-    def create_segments(self, all_coords, crossings):
-        segments = []
-        segment_number = 1
-
-        # 출발 ~ 첫 번째 교차로
-        segment_points = []
-        crossing_idx = 0
-        last_idx = 0
-
-        for i, point in enumerate(all_coords):
-            segment_points.append(point)
-            if crossing_idx < len(crossings):
-                cross = crossings[crossing_idx]
-                dist = haversine(point[1], point[0], cross["lat"], cross["lng"])
-                if dist < 30:
-                    segments.append({
-                        "segment_number": segment_number,
-                        "start": {"lat": segment_points[0][1], "lng": segment_points[0][0]},
-                        "end": {"lat": point[1], "lng": point[0]},
-                        "distance_m": self.calculate_distance(segment_points),
-                        "description": cross["description"]
-                    })
-                    segment_number += 1
-                    segment_points = [point]
-                    crossing_idx += 1
-            last_idx = i
-
-        # 마지막 구간
-        if segment_points:
-            segments.append({
-                "segment_number": segment_number,
-                "start": {"lat": segment_points[0][1], "lng": segment_points[0][0]},
-                "end": {"lat": segment_points[-1][1], "lng": segment_points[-1][0]},
-                "distance_m": self.calculate_distance(segment_points),
-                "description": "도착지"
-            })
+        if not all([startX, startY, endX, endY]):
+            return Response({"error": "Missing coordinates"}, status=400)
 
-        return segments
+        # 비교할 TMAP searchOption 목록 (기본: 추천 + 대안), 예: options=0,4,10,30
+        options = [option.strip() for option in request.query_params.get("options", "").split(",") if option.strip()]
+        options = list(dict.fromkeys(options)) or list(ROUTE_OPTIONS.values())
+        if len(options) > getattr(settings, "ROUTE_RANKING_MAX_OPTIONS", 4):
+            return Response({"error": "Too many 'options'"}, status=400)
 
-    def calculate_distance(self, points):
-        total = 0
-        for i in range(len(points) - 1):
-            total += haversine(points[i][1], points[i][0], points[i+1][1], points[i+1][0])
-        return total
+        speed = parse_speed(request)
+        if speed is None:
+            return Response({"error": "Invalid 'speed' parameter"}, status=400)
 
-    def get_signal_status_list(self, crossings):
-        signal_status_list = []
-        csv_path = Path(__file__).resolve().parent / "data" / "location.csv"
+        # 경로들을 동시에 받아 같은 신호 스냅샷으로 도착 시점 신호를 예측해 신호 대기 반영 소요시간 순으로 정렬
+        results = fetch_routes_with_local_fallback(startX, startY, endX, endY, options)
+        routes, errors = rank_routes(results, speed)
+        if not routes:
+            first_error = errors[0]
+            return Response({"error": first_error["error"], "details": first_error.get("details")}, status=500)
 
-        intersections = []
-        try:
-            with open(csv_path, encoding="utf-8-sig") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    intersections.append({
-                        "itstId": row.get("itstId"),
-                        "name": row.get("itstNm"),
-                        "lat": float(row.get("mapCtptIntLat")),
-                        "lng": float(row.get("mapCtptIntLot"))
-                    })
-        except Exception as e:
-            print(f"[ERROR] 교차로 CSV 로드 실패: {e}")
-            return signal_status_list
-
-        for cross in crossings:
-            min_distance = float("inf")
-            closest = None
-            for intersection in intersections:
-                dist = haversine(cross["lat"], cross["lng"], intersection["lat"], intersection["lng"])
-                if dist < min_distance:
-                    min_distance = dist
-                    closest = intersection
-
-            if closest and min_distance < 30:
-                try:
-                    response = requests.get(
-                        "http://127.0.0.1:8000/map/traffic-lights/signal-status/",
-                        params={"itsId": closest["itstId"]},
-                        timeout=5
-                    )
-                    response.raise_for_status()
-                    signal_status = response.json()
-                    signal_status_list.append(signal_status)
-                except requests.RequestException as e:
-                    signal_status_list.append({
-                        "error": f"Failed to fetch signal status for {closest['name']} (itstId: {closest['itstId']})"
-                    })
-            else:
-                signal_status_list.append({
-                    "error": f"No matching intersection found for crossing at ({cross['lat']}, {cross['lng']})"
-                })
-
-        return signal_status_list
+        return Response({"speed_used": speed, "routes": routes, "errors": errors})
 
-    def calculate_total_expected_time(self, segments, signal_status_list, user_speed_mps):
-        total_time = 0
-        total_distance = 0
-        delays = []
-
-        for i, segment in enumerate(segments):
-            segment_distance = segment["distance_m"]
-            segment_time = segment_distance / user_speed_mps
-            total_distance += segment_distance
-            total_time += segment_time
-
-            if i < len(signal_status_list):
-                signal_status = signal_status_list[i]
-                if "error" not in signal_status:
-                    crossing_delay = calculate_crossing_delay(signal_status, total_time)
-                    delays.append({
-                        "intersection": signal_status.get("intersectionName", "Unknown"),
-                        "delay_sec": round(crossing_delay, 2)
-                    })
-                    total_time += crossing_delay
-                else:
-                    delays.append({
-                        "intersection": "Unknown",
-                        "delay_sec": 0,
-                        "error": signal_status["error"]
-                    })
-
-        return {
-            "total_distance_m": round(total_distance, 2),
-            "adjusted_total_time_sec": round(total_time, 2),
-            "delays": delays
-        }
\ No newline at end of file
+class DepartureTimeView(APIView):
+    """
+    출발 시각 최적화: 지금부터 0 ~ max_offset 초 뒤까지 step 초 간격으로 출발했을 때의 신호 대기를 한 번에 계산해
+    가장 빨리 도착하는 / 가장 덜 기다리는 출발 시각 반환
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        startX = request.query_params.get("startX")
+        startY = request.query_params.get("startY")
+        endX = request.query_params.get("endX")
+        endY = request.query_params.get("endY")
+
+        if not all([startX, startY, endX, endY]):
+            return Response({"error": "Missing coordinates"}, status=400)
+
+        speed = parse_speed(request)
+        if speed is None:
+            return Response({"error": "Invalid 'speed' parameter"}, status=400)
+
+        try:
+            max_offset = float(request.query_params.get("max_offset", 180))
+            step = float(request.query_params.get("step", 1))
+        except ValueError:
+            return Response({"error": "Invalid 'max_offset' or 'step' parameter"}, status=400)
+        if not (
+            0 <= max_offset <= getattr(settings, "DEPARTURE_MAX_OFFSET", 600)
+            and step > 0 and max_offset / step < getattr(settings, "DEPARTURE_MAX_CANDIDATES", 1000)
+        ):
+            return Response({"error": "Invalid 'max_offset' or 'step' parameter"}, status=400)
+
+        option = request.query_params.get("option", ROUTE_OPTIONS["recommended"])
+        result = fetch_routes_with_local_fallback(startX, startY, endX, endY, [option])[option]
+        if "error" in result:
+            return Response(result, status=500)
+        if "features" not in result["data"]:
+            return Response({"error": "Tmap features not found"}, status=500)
+
+        route, distances, statuses = route_signal_inputs(result["data"])
+        offsets = np.arange(0, max_offset + step / 2, step)
+        profile = departure_profile(distances, statuses, speed, offsets)
+        return Response({
+            "speed_used": speed,
+            "search_option": option,
+            "original_tmap_time_sec": route["total_time_sec"],
+            "step_sec": step,
+            **profile,
+        })
@@ -0,0 +1,68 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import SpeedRecommendation
+
+DEFAULT_SPEED = 1.0  # m/s, 사용자 정보가 없을 때 기본 보행 속도
+
+
+def get_age_group(age):
+    # 나이 → age_group 매핑
+    if age < 10:
+        return 0
+    elif age < 20:
+        return 10
+    elif age < 30:
+        return 20
+    elif age < 40:
+        return 30
+    elif age < 50:
+        return 40
+    elif age < 60:
+        return 50
+    return 60
+
+
+def _recommendation_key(age_group, gender):
+    return f"member:speed-recommendation:{age_group}:{gender}"
+
+
+def get_speed_recommendation(age_group, gender):
+    """
+    나이대/성별 SpeedRecommendation 의 (slow, fast), 없으면 None
+    - 사용자와 무관한 기준 데이터라서 (age_group, gender) 별로 캐시
+    """
+    key = _recommendation_key(age_group, gender)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached or None
+
+    recommendation = SpeedRecommendation.objects.filter(age_group=age_group, gender=gender).first()
+    # 추천값이 없는 조합도 빈 튜플로 캐시해서 매번 조회하지 않음
+    cached = (recommendation.slow, recommendation.fast) if recommendation else ()
+    cache.set(key, cached, getattr(settings, "SPEED_RECOMMENDATION_CACHE_TIMEOUT", 3600))
+    return cached or None
+
+
+def get_speed_profile(user):
+    """
+    사용자 보행 속도 프로필 {"min_speed", "max_speed"} (m/s)
+    - 사용자가 설정한 min_speed / max_speed 우선 (request.user 는 인증 시 DB 에서 새로 읽으므로 항상 최신)
+    - 설정이 없으면 나이대/성별 SpeedRecommendation 의 slow / fast 사용
+    """
+    if not getattr(user, "is_authenticated", False):
+        return {"min_speed": DEFAULT_SPEED, "max_speed": DEFAULT_SPEED}
+
+    min_speed = user.min_speed
+    max_speed = user.max_speed
+    if min_speed is None or max_speed is None:
+        recommendation = get_speed_recommendation(get_age_group(user.calculate_age()), user.gender)
+        if recommendation:
+            slow, fast = recommendation
+            min_speed = min_speed if min_speed is not None else slow
+            max_speed = max_speed if max_speed is not None else fast
+
+    return {
+        "min_speed": min_speed if min_speed is not None else DEFAULT_SPEED,
+        "max_speed": max_speed if max_speed is not None else DEFAULT_SPEED,
+    }
@@ -1,3 +1,43 @@
+from datetime import date
+
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from .models import SpeedRecommendation, User
+from .speed import DEFAULT_SPEED, get_age_group, get_speed_profile
+
+
+class SpeedProfileTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email="walker@example.com", password="pw", nickname="walker",
+            birthdate=date(1990, 1, 1), gender=1,
+        )
+        SpeedRecommendation.objects.create(
+            age_group=get_age_group(self.user.calculate_age()), gender=1, slow=0.9, normal=1.1, fast=1.4
+        )
+
+    def test_user_speeds_are_read_fresh(self):
+        self.user.min_speed, self.user.max_speed = 1.0, 1.2
+        self.user.save()
+        self.assertEqual(get_speed_profile(User.objects.get(pk=self.user.pk)), {"min_speed": 1.0, "max_speed": 1.2})
+
+        # 다른 워커에서 수정한 값도 다음 요청의 request.user 에 바로 반영
+        User.objects.filter(pk=self.user.pk).update(min_speed=0.8)
+        self.assertEqual(get_speed_profile(User.objects.get(pk=self.user.pk))["min_speed"], 0.8)
+
+    def test_recommendation_fallback(self):
+        self.assertEqual(get_speed_profile(self.user), {"min_speed": 0.9, "max_speed": 1.4})
+        self.user.max_speed = 2.0
+        self.assertEqual(get_speed_profile(self.user), {"min_speed": 0.9, "max_speed": 2.0})
+
+        # 추천값은 (age_group, gender) 별로 캐시되므로 두 번째 조회는 쿼리 없음
+        with self.assertNumQueries(0):
+            get_speed_profile(self.user)
+
+    def test_missing_recommendation_uses_default(self):
+        self.user.gender = 2
+        self.assertEqual(get_speed_profile(self.user), {"min_speed": DEFAULT_SPEED, "max_speed": DEFAULT_SPEED})
+        with self.assertNumQueries(0):
+            get_speed_profile(self.user)
@@ -4,6 +4,7 @@ from rest_framework import status, permissions
 from rest_framework_simplejwt.tokens import OutstandingToken, BlacklistedToken
 from .serializers import SignupSerializer, LoginSerializer, UserInfoSerializer, UserEditSerializer
 from .models import SpeedRecommendation
+from .speed import get_age_group
 
 class SignupView(APIView):
     def post(self, request):
@@ -80,23 +81,7 @@ class VelocityRecommendationView(APIView):
 
     def get(self, request):
         user = request.user
-        age = user.calculate_age()
-
-        # 나이 → age_group 매핑
-        if age < 10:
-            age_group = 0
-        elif age < 20:
-            age_group = 10
-        elif age < 30:
-            age_group = 20
-        elif age < 40:
-            age_group = 30
-        elif age < 50:
-            age_group = 40
-        elif age < 60:
-            age_group = 50
-        else:
-            age_group = 60
+        age_group = get_age_group(user.calculate_age())
 
         try:
             recommendation = SpeedRecommendation.objects.get(age_group=age_group, gender=user.gender)